@@ -0,0 +1,400 @@
+# Date: 10-18-2026
+# Description: This file contains the columnar analytics of game corpora, KubaRecord record files of finished
+#       games. Each chunk of games is replayed and turned into NumPy columns, one row per move and one row per
+#       game, and the columns are reduced into CorpusStats, fixed size count arrays that merge by addition.
+#       Only one chunk of columns is alive per worker process and at most two chunks per worker are in flight,
+#       so memory is bounded by the chunk size however many games the corpus holds, and chunks are spread over
+#       the cores by byte offsets into the memory-mapped files.
+#
+#           move columns  game, ply, mover (0 W, 1 B), direction (L/R/F/B index), push_length (marbles pushed),
+#                         ejected (0 none, 1 W, 2 B, 3 R), red_captured, plies_to_end (-1 without a winner),
+#                         mover_won (1 won, 0 lost, -1 no winner)
+#           game columns  game, length, first_color, winner_color (-1 none), opening_move (move byte, -1 none),
+#                         red_captures_w, red_captures_b, ejected_w, ejected_b (marbles each color lost)
+#
+#       Example: python KubaAnalytics.py corpus.bin --chunk-games 5000 --workers 8
+
+import argparse
+import array
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy
+
+from KubaGame import KubaGame
+from KubaRecord import DIRECTIONS, decode_move, iter_record_chunks, read_game_records, write_random_games
+from KubaSelfPlay import BACKENDS
+
+COLOR_CODES = {"W": 0, "B": 1}
+EJECTED_CODES = {None: 0, "W": 1, "B": 2, "R": 3}
+MOVE_COLUMNS = (("game", numpy.int64), ("ply", numpy.int32), ("mover", numpy.int8), ("direction", numpy.int8),
+                ("push_length", numpy.int8), ("ejected", numpy.int8), ("red_captured", numpy.int8),
+                ("plies_to_end", numpy.int32), ("mover_won", numpy.int8))
+GAME_COLUMNS = (("game", numpy.int64), ("length", numpy.int32), ("first_color", numpy.int8),
+                ("winner_color", numpy.int8), ("opening_move", numpy.int16), ("red_captures_w", numpy.int16),
+                ("red_captures_b", numpy.int16), ("ejected_w", numpy.int16), ("ejected_b", numpy.int16))
+MAX_PUSH_LENGTH = 7
+
+
+def chunk_columns(path, start=None, end=None, first_game=0, backend="bitboard", validate=False):
+    """
+    Replays the records of a record file between the start and end byte offsets and returns ({move column:
+    array}, {game column: array}), game numbers counting from first_game. Trusted records are replayed with
+    apply_move, validate replays with make_move and raises ValueError for a rejected move. The push length and
+    ejected marble come from each move's MoveRecord, found once by apply_move.
+    """
+    game_class = BACKENDS[backend]
+    move_game = array.array("i")
+    plies = array.array("i")
+    movers = array.array("b")
+    directions = array.array("b")
+    push_lengths = array.array("b")
+    ejected = array.array("b")
+    red_captured = array.array("b")
+    lengths = array.array("i")
+    first_colors = array.array("b")
+    winner_colors = array.array("b")
+    opening_moves = array.array("h")
+    for game_index, record in enumerate(read_game_records(path, start, end)):
+        game = game_class(record.player1, record.player2, quiet=True)
+        colors = {record.player1[0]: COLOR_CODES[record.player1[1]], record.player2[0]: COLOR_CODES[record.player2[1]]}
+        playernames = (record.player1[0], record.player2[0])
+        player_index = record.first_mover
+        for ply, move_byte in enumerate(record.moves):
+            coordinates, direction = decode_move(move_byte)
+            playername = playernames[player_index]
+            if validate:
+                if not game.make_move(playername, coordinates, direction):
+                    raise ValueError("game %d move %d %r rejected" % (first_game + game_index, ply,
+                                                                      (playername, coordinates, direction)))
+                move_record = game.get_last_move_record()
+            else:
+                move_record = game.apply_move(playername, coordinates, direction)
+            move_game.append(game_index)
+            plies.append(ply)
+            movers.append(colors[playername])
+            directions.append(move_byte & 3)
+            # shifted_spaces also holds the empty space the line moves into, unless the last marble was ejected
+            push_lengths.append(len(move_record.shifted_spaces) - (move_record.ejected_marble is None))
+            ejected.append(EJECTED_CODES[move_record.ejected_marble])
+            red_captured.append(move_record.captured_delta)
+            player_index = 1 - player_index
+        winner = game.get_winner()
+        lengths.append(len(record.moves))
+        first_colors.append(colors[playernames[record.first_mover]])
+        winner_colors.append(-1 if winner is None else colors[winner])
+        opening_moves.append(record.moves[0] if record.moves else -1)
+
+    games = len(lengths)
+    move_columns = {"game": numpy.frombuffer(move_game, numpy.int32).astype(numpy.int64),
+                    "ply": numpy.frombuffer(plies, numpy.int32), "mover": numpy.frombuffer(movers, numpy.int8),
+                    "direction": numpy.frombuffer(directions, numpy.int8),
+                    "push_length": numpy.frombuffer(push_lengths, numpy.int8),
+                    "ejected": numpy.frombuffer(ejected, numpy.int8),
+                    "red_captured": numpy.frombuffer(red_captured, numpy.int8)}
+    game_columns = {"game": numpy.arange(first_game, first_game + games, dtype=numpy.int64),
+                    "length": numpy.frombuffer(lengths, numpy.int32),
+                    "first_color": numpy.frombuffer(first_colors, numpy.int8),
+                    "winner_color": numpy.frombuffer(winner_colors, numpy.int8),
+                    "opening_move": numpy.frombuffer(opening_moves, numpy.int16)}
+
+    # the columns that need the end of each game, by gathering the game columns onto the moves
+    local_game = move_columns["game"]
+    move_winner = game_columns["winner_color"][local_game]
+    decided = move_winner >= 0
+    move_columns["plies_to_end"] = numpy.where(decided, game_columns["length"][local_game] - move_columns["ply"],
+                                               -1).astype(numpy.int32)
+    move_columns["mover_won"] = numpy.where(decided, move_columns["mover"] == move_winner, -1).astype(numpy.int8)
+    per_color = local_game * 2 + move_columns["mover"]
+    red_captures = numpy.bincount(per_color, weights=move_columns["red_captured"], minlength=2 * games)
+    game_columns["red_captures_w"] = red_captures[0::2].astype(numpy.int16)
+    game_columns["red_captures_b"] = red_captures[1::2].astype(numpy.int16)
+    for name, ejected_code in (("ejected_w", EJECTED_CODES["W"]), ("ejected_b", EJECTED_CODES["B"])):
+        game_columns[name] = numpy.bincount(local_game, weights=move_columns["ejected"] == ejected_code,
+                                            minlength=games).astype(numpy.int16)
+    move_columns["game"] = local_game + first_game
+    return move_columns, game_columns
+
+
+class CorpusStats:
+    """
+    Aggregate statistics of a corpus, kept as count arrays whose size does not depend on the number of games.
+    add_columns reduces one chunk's columns into the counts with vectorized bincounts, and merge adds the
+    counts of another CorpusStats, such as a worker's, in. The rates and quantiles are read from the counts.
+    """
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.winner_counts = numpy.zeros(3, numpy.int64)  # W wins, B wins, no winner
+        self.first_mover_outcomes = numpy.zeros((2, 3), numpy.int64)  # first mover color x W/B/no winner
+        self.length_counts = numpy.zeros(1, numpy.int64)  # games of each length in moves
+        self.win_length_counts = numpy.zeros(1, numpy.int64)  # won games of each length, the time to win
+        self.opening_games = numpy.zeros((2, 256), numpy.int64)  # first mover color x opening move byte
+        self.opening_moves = numpy.zeros((2, 256), numpy.int64)
+        self.opening_red_captures = numpy.zeros((2, 256), numpy.int64)
+        self.opening_first_mover_wins = numpy.zeros((2, 256), numpy.int64)
+        self.push_counts = numpy.zeros((4, MAX_PUSH_LENGTH + 1), numpy.int64)  # direction x marbles pushed
+        self.ejected_counts = numpy.zeros((2, 4), numpy.int64)  # mover color x nothing/W/B/R ejected
+
+    def add_columns(self, move_columns, game_columns):
+        """Adds the counts of one chunk's move and game columns"""
+        games = len(game_columns["game"])
+        self.games += games
+        self.moves += len(move_columns["game"])
+        winner = game_columns["winner_color"].astype(numpy.int64)
+        outcome = numpy.where(winner < 0, 2, winner)
+        first_color = game_columns["first_color"].astype(numpy.int64)
+        self.winner_counts += numpy.bincount(outcome, minlength=3)
+        self.first_mover_outcomes += numpy.bincount(first_color * 3 + outcome, minlength=6).reshape(2, 3)
+        self.add_length_counts("length_counts", game_columns["length"])
+        self.add_length_counts("win_length_counts", game_columns["length"][winner >= 0])
+
+        opened = game_columns["opening_move"] >= 0
+        opening = (first_color * 256 + game_columns["opening_move"])[opened]
+        red_captures = (game_columns["red_captures_w"].astype(numpy.int64) + game_columns["red_captures_b"])[opened]
+        first_mover_won = (winner == first_color)[opened]
+        self.opening_games += numpy.bincount(opening, minlength=512).reshape(2, 256)
+        self.opening_moves += numpy.bincount(opening, weights=game_columns["length"][opened],
+                                             minlength=512).astype(numpy.int64).reshape(2, 256)
+        self.opening_red_captures += numpy.bincount(opening, weights=red_captures,
+                                                    minlength=512).astype(numpy.int64).reshape(2, 256)
+        self.opening_first_mover_wins += numpy.bincount(opening, weights=first_mover_won,
+                                                        minlength=512).astype(numpy.int64).reshape(2, 256)
+
+        direction = move_columns["direction"].astype(numpy.int64)
+        push_length = move_columns["push_length"].astype(numpy.int64)
+        self.push_counts += numpy.bincount(direction * (MAX_PUSH_LENGTH + 1) + push_length,
+                                           minlength=4 * (MAX_PUSH_LENGTH + 1)).reshape(4, MAX_PUSH_LENGTH + 1)
+        mover = move_columns["mover"].astype(numpy.int64)
+        self.ejected_counts += numpy.bincount(mover * 4 + move_columns["ejected"], minlength=8).reshape(2, 4)
+
+    def add_length_counts(self, name, counts_or_lengths, counted=False):
+        """Adds lengths, or already counted lengths with counted True, to the named length count array"""
+        counts = counts_or_lengths if counted else numpy.bincount(counts_or_lengths)
+        total = getattr(self, name)
+        if len(counts) > len(total):
+            total = numpy.concatenate([total, numpy.zeros(len(counts) - len(total), numpy.int64)])
+        total[:len(counts)] += counts
+        setattr(self, name, total)
+
+    def merge(self, other):
+        """Adds the counts of another CorpusStats"""
+        self.games += other.games
+        self.moves += other.moves
+        for name in ("winner_counts", "first_mover_outcomes", "opening_games", "opening_moves",
+                     "opening_red_captures", "opening_first_mover_wins", "push_counts", "ejected_counts"):
+            getattr(self, name).__iadd__(getattr(other, name))
+        self.add_length_counts("length_counts", other.length_counts, counted=True)
+        self.add_length_counts("win_length_counts", other.win_length_counts, counted=True)
+        return self
+
+    def get_win_rates(self):
+        """Returns {"W": share of games W won, "B": share B won, "none": share without a winner}"""
+        shares = self.winner_counts / max(self.games, 1)
+        return {"W": float(shares[0]), "B": float(shares[1]), "none": float(shares[2])}
+
+    def get_first_mover_win_rates(self):
+        """Returns {first mover color: share of the decided games it started that the first mover won}"""
+        rates = {}
+        for color, color_code in COLOR_CODES.items():
+            decided = self.first_mover_outcomes[color_code, :2].sum()
+            rates[color] = float(self.first_mover_outcomes[color_code, color_code] / decided) if decided else None
+        return rates
+
+    def get_capture_rates_by_opening(self, min_games=1):
+        """
+        Returns {(first mover color, coordinates, direction): (games, red captures per move, first mover win
+        share)} for every opening move played in at least min_games games, most played first.
+        """
+        rates = []
+        for color, color_code in COLOR_CODES.items():
+            for move_byte in numpy.flatnonzero(self.opening_games[color_code] >= max(min_games, 1)):
+                games = int(self.opening_games[color_code, move_byte])
+                coordinates, direction = decode_move(int(move_byte))
+                rates.append(((color, coordinates, direction),
+                              (games, float(self.opening_red_captures[color_code, move_byte]
+                                            / max(self.opening_moves[color_code, move_byte], 1)),
+                               float(self.opening_first_mover_wins[color_code, move_byte] / games))))
+        rates.sort(key=lambda item: -item[1][0])
+        return dict(rates)
+
+    def get_length_quantile(self, quantile, won_only=False):
+        """Returns the game length in moves at the quantile of all games, or of the won games with won_only"""
+        counts = self.win_length_counts if won_only else self.length_counts
+        total = counts.sum()
+        if not total:
+            return None
+        return int(numpy.searchsorted(numpy.cumsum(counts), quantile * total))
+
+    def format_summary(self, top=5):
+        """Returns the statistics as lines of text"""
+        win_rates = self.get_win_rates()
+        first_mover = self.get_first_mover_win_rates()
+        lines = ["%d games, %d moves" % (self.games, self.moves),
+                 "winners: W %.1f%%, B %.1f%%, none %.1f%%" % (100 * win_rates["W"], 100 * win_rates["B"],
+                                                                100 * win_rates["none"]),
+                 "first mover wins: %s" % ", ".join("%s first %s" % (color, "-" if rate is None else
+                                                                     "%.1f%%" % (100 * rate))
+                                                    for color, rate in first_mover.items()),
+                 "game length p10/p50/p90: %s/%s/%s moves, won games p50 %s" % (
+                     self.get_length_quantile(0.1), self.get_length_quantile(0.5), self.get_length_quantile(0.9),
+                     self.get_length_quantile(0.5, won_only=True))]
+        pushes = self.push_counts.sum(axis=0)
+        lines.append("marbles pushed: %s" % ", ".join("%d: %.1f%%" % (length, 100 * count / max(self.moves, 1))
+                                                      for length, count in enumerate(pushes) if count))
+        ejected = self.ejected_counts.sum(axis=0)
+        lines.append("ejections per move: W %.4f, B %.4f, R %.4f" % tuple(ejected[1:] / max(self.moves, 1)))
+        lines.append("most played openings (games, reds captured per move, first mover wins):")
+        for (color, coordinates, direction), (games, capture_rate, win_rate) in list(
+                self.get_capture_rates_by_opening().items())[:top]:
+            lines.append("  %s %s %s: %d, %.4f, %.1f%%" % (color, coordinates, direction, games, capture_rate,
+                                                          100 * win_rate))
+        return "\n".join(lines)
+
+
+def analyze_chunk(task):
+    """Worker entry point, returns the CorpusStats of one (path, start, end, first game, backend, validate) chunk"""
+    stats = CorpusStats()
+    stats.add_columns(*chunk_columns(*task))
+    return stats
+
+
+def iter_corpus_tasks(paths, chunk_games=5000, backend="bitboard", validate=False):
+    """Generates the chunk tasks of the record files in order, numbering the games across the files"""
+    first_game = 0
+    for path in paths:
+        for start, end, games in iter_record_chunks(path, chunk_games):
+            yield path, start, end, first_game, backend, validate
+            first_game += games
+
+
+def iter_corpus_columns(paths, chunk_games=5000, backend="bitboard", validate=False):
+    """Generates the (move columns, game columns) of each chunk of the record files, in this process"""
+    for task in iter_corpus_tasks(paths, chunk_games, backend, validate):
+        yield chunk_columns(*task)
+
+
+def analyze_corpus(paths, chunk_games=5000, workers=None, backend="bitboard", validate=False):
+    """
+    Returns the CorpusStats of the record files. Chunks of chunk_games games are analyzed across workers
+    processes (all cores when None, in this process when 1), with no more than two chunks per worker submitted
+    at once, so neither the tasks nor the results pile up in memory.
+    """
+    stats = CorpusStats()
+    tasks = iter_corpus_tasks(paths, chunk_games, backend, validate)
+    if workers == 1:
+        for task in tasks:
+            stats.merge(analyze_chunk(task))
+        return stats
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for task in tasks:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stats.merge(future.result())
+            pending.add(executor.submit(analyze_chunk, task))
+        for future in pending:
+            stats.merge(future.result())
+    return stats
+
+
+def reference_columns(path):
+    """
+    Independent slow oracle for chunk_columns: replays every record on KubaGame with make_move, finding each
+    push length with find_index_of_EOL_of_contig_pieces and red captures from the captured counts. Returns the
+    move and game columns as lists of row tuples in MOVE_COLUMNS and GAME_COLUMNS order.
+    """
+    move_rows = []
+    game_rows = []
+    for game_index, record in enumerate(read_game_records(path)):
+        game = KubaGame(record.player1, record.player2, quiet=True)
+        colors = {record.player1[0]: COLOR_CODES[record.player1[1]], record.player2[0]: COLOR_CODES[record.player2[1]]}
+        rows = []
+        red_captures = [0, 0]
+        lost = [0, 0]
+        for ply, (playername, coordinates, direction) in enumerate(record.iter_moves()):
+            end_of_line_index = min(max(game.find_index_of_EOL_of_contig_pieces(coordinates, direction), 0), 6)
+            start_index = coordinates[1] if direction in ("L", "R") else coordinates[0]
+            marble_counts = game.get_marble_count()
+            captured = game.get_captured(playername)
+            if not game.make_move(playername, coordinates, direction):
+                raise AssertionError("recorded move rejected")
+            ejected = [color for color, before, after in zip("WBR", marble_counts, game.get_marble_count())
+                       if after < before]
+            red_captured = game.get_captured(playername) - captured
+            red_captures[colors[playername]] += red_captured
+            if ejected and ejected[0] != "R":
+                lost[COLOR_CODES[ejected[0]]] += 1
+            rows.append([game_index, ply, colors[playername], DIRECTIONS.index(direction),
+                         abs(end_of_line_index - start_index) + 1, EJECTED_CODES[ejected[0] if ejected else None],
+                         red_captured])
+        winner = None if game.get_winner() is None else colors[game.get_winner()]
+        for row in rows:
+            row.append(-1 if winner is None else len(rows) - row[1])
+            row.append(-1 if winner is None else int(row[2] == winner))
+            move_rows.append(tuple(row))
+        playernames = (record.player1[0], record.player2[0])
+        game_rows.append((game_index, len(rows), colors[playernames[record.first_mover]],
+                          -1 if winner is None else winner, record.moves[0] if record.moves else -1,
+                          red_captures[0], red_captures[1], lost[0], lost[1]))
+    return move_rows, game_rows
+
+
+def check_and_time(games=400, chunk_games=64, seed=0):
+    """
+    Writes random games to a temporary directory, checks chunk_columns against reference_columns and the
+    chunked, parallel CorpusStats against one chunk, and prints the throughput and the summary. Nothing outside
+    the temporary directory is written or removed.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "kuba_analytics.bin")
+        write_random_games(path, games, seed)
+        move_columns, game_columns = chunk_columns(path)
+        move_rows, game_rows = reference_columns(path)
+        for columns, names, rows in ((move_columns, MOVE_COLUMNS, move_rows), (game_columns, GAME_COLUMNS, game_rows)):
+            if list(zip(*(columns[name].tolist() for name, dtype in names))) != rows:
+                raise AssertionError("columns differ from the reference replay")
+            if any(columns[name].dtype != dtype for name, dtype in names):
+                raise AssertionError("column types differ from the declared types")
+        print("columns of %d games and %d moves match the reference replay" % (games, len(move_rows)))
+
+        whole = CorpusStats()
+        whole.add_columns(move_columns, game_columns)
+        for workers in (1, 2):
+            start = time.perf_counter()
+            stats = analyze_corpus([path], chunk_games, workers)
+            elapsed = time.perf_counter() - start
+            if stats.format_summary(top=20) != whole.format_summary(top=20) or \
+                    stats.length_counts.tolist() != whole.length_counts.tolist():
+                raise AssertionError("chunked statistics differ from one chunk")
+            print("%d workers: %.0f games/s, %.0f moves/s" % (workers, games / elapsed, stats.moves / elapsed))
+        print(whole.format_summary())
+
+
+def main(argv=None):
+    """Command line entry point, prints the statistics of record files, or checks and times without any"""
+    parser = argparse.ArgumentParser(description="Computes columnar statistics of Kuba game record files.")
+    parser.add_argument("paths", nargs="*", help="KubaRecord files, none to run the check")
+    parser.add_argument("--chunk-games", type=int, default=5000, help="games replayed per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, 1 in-process")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="bitboard", help="KubaGame board backend")
+    parser.add_argument("--validate", action="store_true", help="replay with make_move, rejecting illegal moves")
+    parser.add_argument("--top", type=int, default=10, help="openings to list")
+    args = parser.parse_args(argv)
+    if not args.paths:
+        check_and_time()
+        return 0
+    start = time.perf_counter()
+    stats = analyze_corpus(args.paths, args.chunk_games, args.workers, args.backend, args.validate)
+    print(stats.format_summary(args.top))
+    print("%.1f s, %.0f games/s" % (time.perf_counter() - start, stats.games / (time.perf_counter() - start)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
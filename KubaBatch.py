@@ -0,0 +1,328 @@
+# Date: 10-18-2026
+# Description: This file contains KubaBatch, a batched Kuba engine that steps thousands of games at once for policy
+#       evaluation. The boards of N games are held in one NumPy int8 array of shape (N, 7, 7) and every rule of
+#       KubaGame.make_move (whose turn it is, the proceeding space, pushing your own piece off the board, the
+#       previous board state, captured reds and winning) is applied with vectorized array operations over the
+#       whole batch. Running this file checks KubaBatch against KubaGame move by move and times a large batch.
+
+import random
+import time
+
+import numpy as np
+
+from KubaGame import KubaGame
+
+EMPTY = 0  # int8 code of each board space content
+WHITE = 1
+BLACK = 2
+RED = 3
+MARBLE_CODES = {" ": EMPTY, "W": WHITE, "B": BLACK, "R": RED}
+MARBLE_LETTERS = (" ", "W", "B", "R")
+DIRECTIONS = ("L", "R", "F", "B")  # order of the direction axis of legal_move_mask and step
+STARTING_BOARD = np.array([[MARBLE_CODES[space] for space in row] for row in KubaGame(("W", "W"), ("B", "B"))
+                           .get_current_board()], dtype=np.int8)
+POSITIONS = np.arange(7)
+
+
+def board_to_array(board):
+    """Converts a 7x7 board list of " "/W/B/R strings to a (7, 7) int8 array"""
+    return np.array([[MARBLE_CODES[space] for space in row] for row in board], dtype=np.int8)
+
+
+def array_to_board(board_array):
+    """Converts a (7, 7) int8 board array back to a 7x7 board list of " "/W/B/R strings"""
+    return [[MARBLE_LETTERS[space] for space in row] for row in board_array.tolist()]
+
+
+def to_line_view(boards, direction_index):
+    """
+    Returns a (k, 7, 7) view of the passed boards where index [n, line, position] walks each row (L/R) or col
+    (F/B) so that a push in the passed direction moves pieces toward position 6, the edge they fall off.
+    """
+    if direction_index == 0:  # L
+        return boards[:, :, ::-1]
+    if direction_index == 1:  # R
+        return boards
+    if direction_index == 2:  # F
+        return boards.transpose(0, 2, 1)[:, :, ::-1]
+    return boards.transpose(0, 2, 1)  # B
+
+
+def from_line_view(lines, direction_index):
+    """Inverse of to_line_view, returns the (k, 7, 7) row/col boards of the passed line view"""
+    if direction_index == 0:
+        return lines[:, :, ::-1]
+    if direction_index == 1:
+        return lines
+    if direction_index == 2:
+        return lines[:, :, ::-1].transpose(0, 2, 1)
+    return lines.transpose(0, 2, 1)
+
+
+def legal_pushes_along_lines(lines, past_lines, colors):
+    """
+    Returns a (k, 7, 7) bool array of the legal pushes toward position 6 from every space of the line views of
+    k boards, for the passed (k,) mover colors. A push is legal when the space holds the mover's marble, it is
+    not a single piece on the edge pushed outward, the space before it is empty or off the board, a line that
+    runs to the edge does not end with the mover's marble, and the push does not recreate the past board.
+    """
+    occupied = lines != EMPTY
+    legal = lines == colors[:, None, None]
+    legal[:, :, 1:] &= ~occupied[:, :, :-1]  # proceeding space must be empty, position 0 has none
+    legal[:, :, 6] = False  # single pieces on the edge can't be pushed "outward"
+    runs_to_edge = np.logical_and.accumulate(occupied[:, :, ::-1], axis=2)[:, :, ::-1]
+    own_marble_on_edge = (lines[:, :, 6] == colors[:, None])[:, :, None]
+    legal &= ~(runs_to_edge & own_marble_on_edge)  # can't push your own piece off the board
+
+    # A push changes one line and always changes it, so it can only recreate the past board in games where
+    # the boards differ inside exactly one line. There the push must keep the spaces before the 'current piece'
+    # equal, leave the 'current piece' space empty as on the past board, shift the pieces so each matches the
+    # past board one space further along, and keep the spaces after the line equal.
+    different = lines != past_lines
+    line_differences = different.sum(axis=2)
+    total_differences = line_differences.sum(axis=1)
+    games = np.nonzero((total_differences > 0) & (line_differences.max(axis=1) == total_differences))[0]
+    if games.size:
+        line_indexes = line_differences[games].argmax(axis=1)
+        line = lines[games, line_indexes]
+        past_line = past_lines[games, line_indexes]
+        equal = line == past_line
+        equal_before = np.ones_like(equal)
+        equal_before[:, 1:] = np.logical_and.accumulate(equal, axis=1)[:, :-1]
+        equal_from = np.ones((games.size, 9), dtype=bool)  # all spaces equal from the index on
+        equal_from[:, :7] = np.logical_and.accumulate(equal[:, ::-1], axis=1)[:, ::-1]
+        shifted_mismatches = np.zeros((games.size, 7), dtype=np.int64)
+        shifted_mismatches[:, 1:] = np.cumsum(line[:, :-1] != past_line[:, 1:], axis=1)
+        first_empty = np.minimum.accumulate(
+            np.where(line != EMPTY, 7, POSITIONS)[:, ::-1], axis=1)[:, ::-1]
+        last_shifted = np.minimum(first_empty, 6)  # the empty space the line moves into
+        repeats = ((first_empty < 7) & equal_before & (past_line == EMPTY)
+                   & (np.take_along_axis(shifted_mismatches, last_shifted, axis=1) == shifted_mismatches)
+                   & np.take_along_axis(equal_from, first_empty + 1, axis=1))
+        legal[games, line_indexes] &= ~repeats
+    return legal
+
+
+def push_along_lines(lines, line_indexes, positions):
+    """
+    Pushes one line of each of the k passed line views in place, from positions toward position 6. Returns
+    the (k,) int8 codes of the ejected marbles, EMPTY where the line stopped before the edge.
+    """
+    batch_indexes = np.arange(lines.shape[0])
+    line = lines[batch_indexes, line_indexes]
+    ahead_or_empty = (line == EMPTY) & (POSITIONS > positions[:, None])
+    first_empty = np.where(ahead_or_empty, POSITIONS, 7).min(axis=1)
+    ejected = np.where(first_empty == 7, line[:, 6], EMPTY).astype(np.int8)
+    last_shifted = np.minimum(first_empty, 6)
+    previous_space = np.concatenate([np.zeros((line.shape[0], 1), dtype=np.int8), line[:, :-1]], axis=1)
+    shifted = (POSITIONS > positions[:, None]) & (POSITIONS <= last_shifted[:, None])
+    pushed_line = np.where(shifted, previous_space, line)
+    pushed_line[POSITIONS == positions[:, None]] = EMPTY
+    lines[batch_indexes, line_indexes] = pushed_line
+    return ejected
+
+
+class KubaBatch:
+    """
+    N games of Kuba played in lockstep. Colors stand in for players: WHITE and BLACK take turns starting with
+    first_color (a code or an (N,) array of codes) in each game, and captured reds are kept per color. A move
+    is a row, col and direction index into DIRECTIONS. All arrays are private and have getter methods.
+    """
+    def __init__(self, num_games, first_color=WHITE):
+        self._boards = np.repeat(STARTING_BOARD[None], num_games, axis=0)  # the main, current working boards
+        self._past_boards = self._boards.copy()  # for tracking board state reversal moves
+        self._turns = np.empty(num_games, dtype=np.int8)  # color to move in each game
+        self._turns[:] = first_color
+        self._winners = np.zeros(num_games, dtype=np.int8)  # color of the winner, EMPTY if none
+        self._captured = np.zeros((num_games, 2), dtype=np.int16)  # reds captured by WHITE, BLACK
+        self._marble_counts = np.tile(np.array([8, 8, 13], dtype=np.int16), (num_games, 1))  # W/B/R on board
+
+    def get_num_games(self):
+        """Returns the number of games in the batch"""
+        return self._boards.shape[0]
+
+    def get_boards(self):
+        """Getter method for the (N, 7, 7) int8 current boards"""
+        return self._boards
+
+    def get_past_boards(self):
+        """Getter method for the (N, 7, 7) int8 past boards"""
+        return self._past_boards
+
+    def get_turns(self):
+        """Getter method for the (N,) color to move in each game"""
+        return self._turns
+
+    def get_winners(self):
+        """Getter method for the (N,) color of each game's winner, EMPTY if the game is not over"""
+        return self._winners
+
+    def get_captured(self):
+        """Getter method for the (N, 2) reds captured by WHITE and BLACK"""
+        return self._captured
+
+    def get_marble_counts(self):
+        """Getter method for the (N, 3) W/B/R marble counts still on the board"""
+        return self._marble_counts
+
+    def reset(self, game_indexes, first_color=WHITE):
+        """Starts the passed games over from the starting board, for example once they have a winner"""
+        self._boards[game_indexes] = STARTING_BOARD
+        self._past_boards[game_indexes] = STARTING_BOARD
+        self._turns[game_indexes] = first_color
+        self._winners[game_indexes] = EMPTY
+        self._captured[game_indexes] = 0
+        self._marble_counts[game_indexes] = (8, 8, 13)
+
+    def legal_move_mask(self):
+        """
+        Returns an (N, 4, 7, 7) bool array, True at [game, direction, row, col] for every move make_move would
+        accept from the color to move. Games with a winner have no legal moves.
+        """
+        mask = np.empty((self._boards.shape[0], 4, 7, 7), dtype=bool)
+        for direction_index in range(4):
+            legal_lines = legal_pushes_along_lines(to_line_view(self._boards, direction_index),
+                                                   to_line_view(self._past_boards, direction_index), self._turns)
+            mask[:, direction_index] = from_line_view(legal_lines, direction_index)
+        mask[self._winners != EMPTY] = False
+        return mask
+
+    def step(self, rows, cols, directions, legal_mask=None):
+        """
+        Makes one move in each game from the (N,) rows, cols and direction indexes, skipping games whose
+        direction is negative. Illegal moves are rejected the same way make_move rejects them, against the
+        passed legal_move_mask of the current boards if the caller already has one. Returns an (N,) bool array
+        of the accepted moves.
+        """
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        directions = np.asarray(directions)
+        on_board = (directions >= 0) & (directions < 4) & (rows >= 0) & (rows <= 6) & (cols >= 0) & (cols <= 6)
+        accepted = np.zeros(self._boards.shape[0], dtype=bool)
+        candidates = np.nonzero(on_board)[0]
+        if legal_mask is None:
+            legal_mask = self.legal_move_mask()
+        accepted[candidates] = legal_mask[candidates, directions[candidates], rows[candidates],
+                                                      cols[candidates]]
+
+        for direction_index in range(4):
+            games = np.nonzero(accepted & (directions == direction_index))[0]
+            if games.size == 0:
+                continue
+            boards = self._boards[games]
+            self._past_boards[games] = boards
+            lines = np.ascontiguousarray(to_line_view(boards, direction_index))
+            if direction_index < 2:  # L/R push along the row, position counts toward the edge
+                line_indexes = rows[games]
+                positions = cols[games] if direction_index == 1 else 6 - cols[games]
+            else:
+                line_indexes = cols[games]
+                positions = rows[games] if direction_index == 3 else 6 - rows[games]
+            ejected = push_along_lines(lines, line_indexes, positions)
+            self._boards[games] = from_line_view(lines, direction_index)
+            self.record_ejected_marbles(games, ejected)
+
+        movers = self._turns[accepted]
+        self._turns[accepted] = np.where(movers == WHITE, BLACK, WHITE)
+        self.winner_check(np.nonzero(accepted)[0], movers)
+        return accepted
+
+    def record_ejected_marbles(self, games, ejected):
+        """Updates the marble counts and the mover's captured reds for the marbles ejected in the passed games"""
+        ejected_games = ejected != EMPTY
+        np.subtract.at(self._marble_counts, (games[ejected_games], ejected[ejected_games] - 1), 1)
+        red_games = games[ejected == RED]
+        np.add.at(self._captured, (red_games, self._turns[red_games] - 1), 1)
+
+    def winner_check(self, games, movers):
+        """Sets the mover as winner in the passed games where they captured 13 reds or ejected every opponent marble"""
+        captured_all_reds = self._captured[games, movers - 1] == 13
+        opponent_count = np.where(movers == WHITE, self._marble_counts[games, 1], self._marble_counts[games, 0])
+        won = captured_all_reds | (opponent_count == 0)
+        self._winners[games[won]] = movers[won]
+
+
+def differential_check(num_games=200, max_moves=300, seed=0):
+    """
+    Plays the same moves on num_games quiet KubaGames and one KubaBatch. Every turn, each game's legal move
+    mask must list exactly KubaGame.legal_moves, and a random attempted move (biased toward moves along the
+    last move's line, so board state reversals come up) must be accepted or rejected by step exactly when
+    make_move accepts or rejects it, with the same boards, turns, captured reds and winners afterward.
+    """
+    rng = random.Random(seed)
+    first_colors = np.array([rng.choice((WHITE, BLACK)) for _ in range(num_games)], dtype=np.int8)
+    batch = KubaBatch(num_games, first_colors)
+    games = [KubaGame(("W", "W"), ("B", "B"), quiet=True) for _ in range(num_games)]
+    last_moves = [None] * num_games
+    for move_number in range(max_moves):
+        mask = batch.legal_move_mask()
+        rows = np.zeros(num_games, dtype=np.int64)
+        cols = np.zeros(num_games, dtype=np.int64)
+        directions = np.full(num_games, -1, dtype=np.int64)
+        expected = np.zeros(num_games, dtype=bool)
+        for index, game in enumerate(games):
+            mover = MARBLE_LETTERS[batch.get_turns()[index]]
+            legal_moves = set(game.legal_moves(mover))
+            mask_moves = {((row, col), DIRECTIONS[direction])
+                          for direction, row, col in zip(*np.nonzero(mask[index]))}
+            if legal_moves != mask_moves:
+                raise AssertionError("game %d move %d: legal move mask differs from KubaGame" % (index, move_number))
+            if game.get_winner() is not None:
+                continue
+            board = game.get_current_board()
+            own_spaces = [(row, col) for row in range(7) for col in range(7) if board[row][col] == mover]
+            last_move = last_moves[index]
+            if last_move is not None and rng.random() < 0.5:
+                # a push back along the line of the last move is the only way to recreate the past board
+                (last_row, last_col), last_direction = last_move
+                if last_direction in ("L", "R"):
+                    own_spaces = [(last_row, col) for col in range(7) if board[last_row][col] == mover] or own_spaces
+                else:
+                    own_spaces = [(row, last_col) for row in range(7) if board[row][last_col] == mover] or own_spaces
+            coordinates = rng.choice(own_spaces)
+            direction = rng.randrange(4)
+            rows[index], cols[index], directions[index] = coordinates[0], coordinates[1], direction
+            expected[index] = game.make_move(mover, coordinates, DIRECTIONS[direction])
+            if expected[index]:
+                last_moves[index] = (coordinates, DIRECTIONS[direction])
+
+        accepted = batch.step(rows, cols, directions)
+        if not np.array_equal(accepted, expected):
+            raise AssertionError("move %d: step accepted moves differ from make_move" % move_number)
+        for index, game in enumerate(games):
+            if (array_to_board(batch.get_boards()[index]) != game.get_current_board()
+                    or array_to_board(batch.get_past_boards()[index]) != game.get_past_board()
+                    or tuple(batch.get_captured()[index]) != (game.get_captured("W"), game.get_captured("B"))
+                    or tuple(batch.get_marble_counts()[index]) != game.get_marble_count()
+                    or MARBLE_LETTERS[batch.get_winners()[index]].strip() != (game.get_winner() or "")
+                    or MARBLE_LETTERS[batch.get_turns()[index]] != game.get_current_turn() and accepted[index]):
+                raise AssertionError("game %d move %d: state differs from KubaGame" % (index, move_number))
+        if all(game.get_winner() is not None for game in games):
+            break
+    print("KubaBatch matches KubaGame in", num_games, "games")
+
+
+def benchmark(num_games=10000, moves=100, seed=0):
+    """Plays random legal moves in num_games batched games and prints the batch moves per second"""
+    rng = np.random.default_rng(seed)
+    batch = KubaBatch(num_games)
+    played = 0
+    start = time.perf_counter()
+    for _ in range(moves):
+        mask = batch.legal_move_mask()
+        flat_mask = mask.reshape(num_games, -1)
+        scores = np.where(flat_mask, rng.random(flat_mask.shape), -1.0)  # a random legal move per game
+        directions, rows, cols = np.unravel_index(scores.argmax(axis=1), (4, 7, 7))
+        directions = np.where(flat_mask.any(axis=1), directions, -1)
+        played += batch.step(rows, cols, directions, mask).sum()
+        finished = np.nonzero(batch.get_winners() != EMPTY)[0]
+        if finished.size:
+            batch.reset(finished)
+    elapsed = time.perf_counter() - start
+    print("%d games x %d steps: %d moves in %.2f s, %.0f moves/s" % (num_games, moves, played, elapsed,
+                                                                    played / elapsed))
+
+
+if __name__ == '__main__':
+    differential_check()
+    benchmark()
@@ -0,0 +1,230 @@
+# Date: 10-18-2026
+# Description: This file contains the benchmark suite for the KubaGame hot paths. It times make_move for an
+#       accepted move, a rejected move and a move rejected by the previous board state rule, move_the_pieces,
+#       find_index_of_EOL_of_contig_pieces, get_marble_count, and fork against deepcopy and pickle of the game
+#       from fixed opening, midgame and endgame positions, plus complete random games, on each board backend.
+#       Results are written as JSON, and a saved result file can be passed as a baseline to flag regressions.
+#       Example: python KubaBenchmark.py --output baseline.json
+#                python KubaBenchmark.py --compare baseline.json --threshold 0.10
+
+import argparse
+import copy
+import json
+import pickle
+import platform
+import statistics
+import sys
+import time
+
+from KubaBitboard import random_move_script, time_backend
+from KubaSelfPlay import BACKENDS
+
+# Fixed positions, each with the past board (the board before the last move), the current board, the player to
+# move and the reds each player has captured. playerA plays W and playerB plays B. In the midgame position
+# playerB has just pushed col 1 forward, so playerA pushing (2, 1) backward would recreate the past board.
+POSITIONS = {
+    "opening": {
+        "past_board": ["WW   BB", "WW R BB", "  RRR  ", " RRRRR ", "  RRR  ", "BB R WW", "BB   WW"],
+        "current_board": ["WW   BB", "WW R BB", "  RRR  ", " RRRRR ", "  RRR  ", "BB R WW", "BB   WW"],
+        "turn": "playerA",
+        "captured": (0, 0),
+    },
+    "midgame": {
+        "past_board": ["       ", "  RBB B", "  WRRBW", " WRRRRW", "WRRRW  ", "BRRR   ", " BB  W "],
+        "current_board": ["       ", "  RBB B", " WWRRBW", " RRRRRW", "WRRRW  ", "BBRR   ", "  B  W "],
+        "turn": "playerA",
+        "captured": (0, 0),
+    },
+    "endgame": {
+        "past_board": ["       ", "       ", "WRB    ", " RRW   ", "    W  ", "  R  W ", "      W"],
+        "current_board": ["       ", "       ", "RB     ", " RRW   ", "    W  ", "  R  W ", "      W"],
+        "turn": "playerA",
+        "captured": (4, 5),
+    },
+}
+
+
+def load_position(game_class, name):
+    """Returns a quiet game of game_class set up in the named position"""
+    position = POSITIONS[name]
+    game = game_class(("playerA", "W"), ("playerB", "B"), quiet=True)
+    game.replace_past_board([list(row) for row in position["past_board"]])
+    game.replace_current_board([list(row) for row in position["current_board"]])
+    game.set_current_turn(position["turn"])
+    for playername, captured in zip(("playerA", "playerB"), position["captured"]):
+        for _ in range(captured):
+            game.update_captured(playername)
+    return game
+
+
+def find_moves(game, playername):
+    """
+    Returns (accepted, rejected, repetition) moves of the player for the benchmarks: the first legal move that
+    pushes nothing off the board, the first own marble move make_move rejects for its proceeding space or for
+    pushing an own marble off, and the first move rejected only by the previous board state rule. Any of them
+    is None if the position has no such move.
+    """
+    legal_moves = game.legal_moves(playername)
+    accepted = rejected = repetition = None
+    for coordinates in game.get_marble_spaces(game.get_player_color(playername)):
+        for direction in ("L", "R", "F", "B"):
+            move = (coordinates, direction)
+            pushed_line = game.get_pushed_line(coordinates, direction)
+            if move in legal_moves:
+                if accepted is None and not pushed_line[1]:
+                    accepted = move
+            elif pushed_line is None or not game.check_end_of_line_of_contig_pieces(playername, coordinates,
+                                                                                   direction):
+                if rejected is None:
+                    rejected = move
+            elif repetition is None:
+                repetition = move
+    return accepted, rejected, repetition
+
+
+def time_calls(function, calls, rounds):
+    """Times rounds of calls calls of the no argument function, returns the per call times in microseconds"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        timings.append((time.perf_counter() - start) / calls * 1e6)
+    return timings
+
+
+def time_make_move_accepted(game, move, calls, rounds):
+    """
+    Times make_move of an accepted move. Each call needs the position before the move, so every round first
+    makes calls deep copies of the game outside the timed loop.
+    """
+    playername = game.get_current_turn()
+    timings = []
+    for _ in range(rounds):
+        games = [copy.deepcopy(game) for _ in range(calls)]
+        start = time.perf_counter()
+        for game_copy in games:
+            game_copy.make_move(playername, move[0], move[1])
+        timings.append((time.perf_counter() - start) / calls * 1e6)
+    return timings
+
+
+def position_benchmarks(game_class, name, calls, rounds):
+    """Returns {benchmark name: per call timings} for the named position on game_class"""
+    game = load_position(game_class, name)
+    playername = game.get_current_turn()
+    accepted, rejected, repetition = find_moves(game, playername)
+    benchmarks = {"get_marble_count": time_calls(game.get_marble_count, calls, rounds)}
+    if accepted is not None:
+        coordinates, direction = accepted
+        benchmarks["make_move_accepted"] = time_make_move_accepted(game, accepted, calls, rounds)
+        benchmarks["move_the_pieces"] = time_calls(lambda: game.move_the_pieces(playername, coordinates, direction),
+                                                   calls, rounds)
+        benchmarks["find_index_of_EOL"] = time_calls(
+            lambda: game.find_index_of_EOL_of_contig_pieces(coordinates, direction), calls, rounds)
+    if rejected is not None:
+        benchmarks["make_move_rejected"] = time_calls(lambda: game.make_move(playername, rejected[0], rejected[1]),
+                                                      calls, rounds)
+    if repetition is not None:
+        benchmarks["make_move_repetition"] = time_calls(
+            lambda: game.make_move(playername, repetition[0], repetition[1]), calls, rounds)
+    # last, forking leaves the game sharing its boards
+    benchmarks["deepcopy"] = time_calls(lambda: copy.deepcopy(game), calls, rounds)
+    benchmarks["fork"] = time_calls(game.fork, calls, rounds)
+    benchmarks["pickle"] = time_calls(lambda: pickle.dumps(game), calls, rounds)
+    benchmarks["pickle_fork"] = time_calls(lambda: pickle.dumps(game.fork()), calls, rounds)
+    return benchmarks
+
+
+def random_game_benchmark(game_class, games, rounds, seed=0):
+    """Times replaying complete random games of attempted moves, returns the per attempted move timings"""
+    scripts = [random_move_script(seed + game_number, max_moves=1000) for game_number in range(games)]
+    attempted_moves = sum(len(script) for script in scripts)
+    return [time_backend(game_class, scripts, render=False)[0] / attempted_moves * 1e6 for _ in range(rounds)]
+
+
+def run_benchmarks(backends, calls=2000, rounds=5, games=5, name_filter=None):
+    """
+    Runs every benchmark on the passed backend names and returns {"backend/benchmark/position": result}, each
+    result with the median and min microseconds per call over the rounds.
+    """
+    results = {}
+    for backend in backends:
+        game_class = BACKENDS[backend]
+        timings = {}
+        for position_name in POSITIONS:
+            for benchmark_name, position_timings in position_benchmarks(game_class, position_name, calls,
+                                                                        rounds).items():
+                timings["%s/%s/%s" % (backend, benchmark_name, position_name)] = position_timings
+        timings["%s/random_games/all" % backend] = random_game_benchmark(game_class, games, rounds)
+        for key, key_timings in timings.items():
+            if name_filter is None or name_filter in key:
+                results[key] = {"median_us": statistics.median(key_timings), "min_us": min(key_timings),
+                                "rounds": len(key_timings)}
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns a list of (key, baseline min, current min, ratio, status) for the benchmarks in both result sets.
+    The fastest round is compared because it is the least disturbed by other load on the machine. status is
+    "regression" when the current time is more than threshold slower, "improvement" when it is more than
+    threshold faster, otherwise "ok".
+    """
+    rows = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        baseline_min = baseline[key]["min_us"]
+        current_min = results[key]["min_us"]
+        ratio = current_min / baseline_min
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((key, baseline_min, current_min, ratio, status))
+    return rows
+
+
+def main(argv=None):
+    """Command line entry point, runs the benchmarks, writes or prints the JSON and compares with a baseline"""
+    parser = argparse.ArgumentParser(description="Times the KubaGame hot paths.")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS),
+                        help="backend to time, may be repeated, all backends by default")
+    parser.add_argument("--calls", type=int, default=2000, help="calls per timed round")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds, the median and min are reported")
+    parser.add_argument("--games", type=int, default=5, help="complete random games per round")
+    parser.add_argument("--filter", default=None, help="only report benchmarks whose name contains this")
+    parser.add_argument("--output", default=None, help="JSON file to write, printed when not given")
+    parser.add_argument("--compare", default=None, help="baseline JSON file written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown flagged as regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.backend or sorted(BACKENDS), args.calls, args.rounds, args.games, args.filter)
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "calls": args.calls, "rounds": args.rounds,
+                 "games": args.games},
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        rows = compare(results, baseline, args.threshold)
+        for key, baseline_min, current_min, ratio, status in rows:
+            print("%-50s %10.2f us %10.2f us %6.2fx  %s" % (key, baseline_min, current_min, ratio, status))
+        if any(row[4] == "regression" for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
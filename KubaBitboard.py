@@ -0,0 +1,532 @@
+# Date: 10-17-2026
+# Description: This file contains an alternate board backend for KubaGame that stores the board as three integer
+#       bitboards, one per marble color (W, B, R), over the 49 cells of the 7x7 board. Bit (row * 7 + col) is set
+#       when that color occupies the cell. Pushes, edge ejections and captures are done with shifts and masks
+#       instead of walking the nested board lists. KubaBitboardGame keeps the public KubaGame methods and results,
+#       so it can be used anywhere a KubaGame is used. Running this file benchmarks both backends.
+
+import os
+import random
+import sys
+import time
+
+from KubaGame import KubaGame, MoveRecord
+
+BOARD_SIZE = 7
+FULL_BOARD_MASK = (1 << (BOARD_SIZE * BOARD_SIZE)) - 1
+COLOR_ORDER = ("W", "B", "R")  # bitboard index of each color, same order as get_marble_count
+COLOR_INDEX = {"W": 0, "B": 1, "R": 2}
+RED_INDEX = 2
+DIRECTION_STEPS = {"L": -1, "R": 1, "F": -BOARD_SIZE, "B": BOARD_SIZE}  # bit offset of one space in each direction
+OPPOSITE_DIRECTIONS = {"L": "R", "R": "L", "F": "B", "B": "F"}
+
+
+def cell_index(row, col):
+    """Returns the bit index of the passed row and col"""
+    return row * BOARD_SIZE + col
+
+
+def _build_rays():
+    """
+    Builds, for every direction and cell, the mask of the cells strictly beyond that cell in the direction of
+    movement up to the edge of the board, and the bit of the edge cell a push in that direction would eject.
+    """
+    row_col_changes = {"L": (0, -1), "R": (0, 1), "F": (-1, 0), "B": (1, 0)}
+    rays = {}
+    edge_bits = {}
+    for direction, (row_change, col_change) in row_col_changes.items():
+        rays[direction] = []
+        edge_bits[direction] = []
+        for cell in range(BOARD_SIZE * BOARD_SIZE):
+            row = cell // BOARD_SIZE + row_change
+            col = cell % BOARD_SIZE + col_change
+            ray = 0
+            edge_bit = 1 << cell  # a cell on the edge is its own edge cell
+            while 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE:
+                edge_bit = 1 << cell_index(row, col)
+                ray |= edge_bit
+                row += row_change
+                col += col_change
+            rays[direction].append(ray)
+            edge_bits[direction].append(edge_bit)
+    return rays, edge_bits
+
+
+RAYS, EDGE_BITS = _build_rays()
+
+
+def nearest_bit_index(bits, step):
+    """Returns the index of the set bit in bits closest to the pushing piece for a move with the passed step"""
+    if step > 0:
+        return (bits & -bits).bit_length() - 1  # lowest set bit
+    return bits.bit_length() - 1  # highest set bit
+
+
+def board_to_bitboards(board):
+    """Converts a 7x7 board list of " "/W/B/R strings to a (W, B, R) tuple of bitboards"""
+    bitboards = [0, 0, 0]
+    for row_index, row in enumerate(board):
+        for col_index, space in enumerate(row):
+            if space in COLOR_INDEX:
+                bitboards[COLOR_INDEX[space]] |= 1 << cell_index(row_index, col_index)
+    return tuple(bitboards)
+
+
+def bitboards_to_board(bitboards):
+    """Converts a (W, B, R) tuple of bitboards back to a 7x7 board list of " "/W/B/R strings"""
+    board = [[" "] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+    for color_index, bitboard in enumerate(bitboards):
+        color = COLOR_ORDER[color_index]
+        while bitboard:
+            cell = (bitboard & -bitboard).bit_length() - 1
+            board[cell // BOARD_SIZE][cell % BOARD_SIZE] = color
+            bitboard &= bitboard - 1  # clears the lowest set bit
+    return board
+
+
+def push_bitboards(bitboards, cell, direction):
+    """
+    Pushes the contiguous line of marbles starting at the passed cell one space in the passed direction.
+    Returns the new (W, B, R) bitboards and the color index of the marble pushed off the edge of the board,
+    or None if no marble was ejected. The move is assumed to have already been validated.
+    """
+    step = DIRECTION_STEPS[direction]
+    occupied = bitboards[0] | bitboards[1] | bitboards[2]
+    ray = RAYS[direction][cell]
+    empty_spaces_ahead = ray & ~occupied
+    if empty_spaces_ahead:
+        # the line stops before the first empty space, which the last piece of the line moves into
+        first_empty = nearest_bit_index(empty_spaces_ahead, step)
+        line_mask = ((ray ^ RAYS[direction][first_empty]) & ~(1 << first_empty)) | (1 << cell)
+        edge_bit = 0
+    else:
+        # the line runs to the edge of the board, the piece on the edge is pushed off
+        line_mask = ray | (1 << cell)
+        edge_bit = EDGE_BITS[direction][cell]
+
+    ejected_color_index = None
+    post_movement_bitboards = []
+    for color_index, bitboard in enumerate(bitboards):
+        if bitboard & edge_bit:
+            ejected_color_index = color_index
+        moving = bitboard & line_mask & ~edge_bit
+        if step > 0:
+            moving <<= step
+        else:
+            moving >>= -step
+        post_movement_bitboards.append((bitboard & ~line_mask) | moving)
+    return tuple(post_movement_bitboards), ejected_color_index
+
+
+def shifted_spaces_and_contents(bitboards, cell, direction):
+    """
+    Returns the list of (row, col) spaces a push from the passed cell changes, up to the empty space the line
+    moves into or the edge space, and the " "/W/B/R contents of those spaces before the push.
+    """
+    step = DIRECTION_STEPS[direction]
+    occupied = bitboards[0] | bitboards[1] | bitboards[2]
+    empty_spaces_ahead = RAYS[direction][cell] & ~occupied
+    if empty_spaces_ahead:
+        last_cell = nearest_bit_index(empty_spaces_ahead, step)
+    else:
+        last_cell = EDGE_BITS[direction][cell].bit_length() - 1
+    shifted_spaces = []
+    contents = []
+    for shifted_cell in range(cell, last_cell + step, step):
+        bit = 1 << shifted_cell
+        shifted_spaces.append((shifted_cell // BOARD_SIZE, shifted_cell % BOARD_SIZE))
+        if bitboards[0] & bit:
+            contents.append("W")
+        elif bitboards[1] & bit:
+            contents.append("B")
+        elif bitboards[2] & bit:
+            contents.append("R")
+        else:
+            contents.append(" ")
+    return shifted_spaces, contents
+
+
+class KubaBitboardGame(KubaGame):
+    """
+    A KubaGame that stores the current and past boards as (W, B, R) tuples of integer bitboards. All of the board
+    checks and the movement of the pieces are done with shifts and masks. The getter and setter methods still
+    accept and return 7x7 board lists so the results are the same as KubaGame.
+    """
+    def __init__(self, player1, player2, superko=False, quiet=False, renderer=None, check_counters=False,
+                 recorder=None, instrumentation=None):
+        super().__init__(player1, player2, superko, quiet, renderer, check_counters, recorder, instrumentation)
+        self._past_bitboards = board_to_bitboards(self._past_board)  # for tracking board state reversal moves
+        self._bitboards = board_to_bitboards(self._starting_board)  # the main, current working board
+        del self._past_board  # the board lists are only kept as bitboards from here on
+        del self._starting_board
+        del self._row_occupancy  # the OR of the bitboards is the occupancy of every row and col
+        del self._col_occupancy
+
+    def get_current_bitboards(self):
+        """Getter method for private variable bitboards"""
+        return self._bitboards
+
+    def get_past_bitboards(self):
+        """Getter method for private variable past bitboards"""
+        return self._past_bitboards
+
+    def get_current_board(self):
+        """Returns a 7x7 board list built from the current bitboards"""
+        return bitboards_to_board(self._bitboards)
+
+    def replace_current_board(self, replacement_board):
+        """'Setter' method to replace the current bitboards with a passed board list"""
+        self._bitboards = board_to_bitboards(replacement_board)
+        self._move_records = []  # the records no longer describe these boards
+        self._board_hash = self.compute_board_hash(replacement_board)
+        self.reset_position_history()
+        self._marble_counts = list(self.count_marbles_on_board())
+
+    def get_past_board(self):
+        """Returns a 7x7 board list built from the past bitboards"""
+        return bitboards_to_board(self._past_bitboards)
+
+    def replace_past_board(self, replacement_board):
+        """'Setter' method to replace the past bitboards with a passed board list"""
+        self._past_bitboards = board_to_bitboards(replacement_board)
+        self._move_records = []  # the records no longer describe these boards
+        self._past_board_hash = self.compute_board_hash(replacement_board)
+        self.reset_position_history()
+
+    def get_marble(self, coordinates):
+        """Returns the contents of a given board space, either B/W/R for a marble, or X for empty space"""
+        bit = 1 << cell_index(coordinates[0], coordinates[1])
+        for color_index, bitboard in enumerate(self._bitboards):
+            if bitboard & bit:
+                return COLOR_ORDER[color_index]
+        return "X"  # returns "X" for a board space that is empty
+
+    def count_marbles_on_board(self):
+        """Returns a tuple with the count of the marbles on the board, in W/B/R order, from bitboard popcounts"""
+        return tuple(bitboard.bit_count() for bitboard in self._bitboards)
+
+    def get_marble_spaces(self, color):
+        """Returns a list of the (row, col) coordinates of every marble of the passed W/B/R color, row by row"""
+        bitboard = self._bitboards[COLOR_INDEX[color]]
+        spaces = []
+        while bitboard:
+            spaces.append(divmod((bitboard & -bitboard).bit_length() - 1, BOARD_SIZE))
+            bitboard &= bitboard - 1  # clears the lowest set bit
+        return spaces
+
+    def find_index_of_EOL_of_contig_pieces(self, coordinates, direction):
+        """
+        Same result as KubaGame.find_index_of_EOL_of_contig_pieces, -1 or 7 when the contiguous line runs to
+        the edge of the board, found from the first empty space ahead of the 'current piece' in one mask.
+        """
+        cell = cell_index(coordinates[0], coordinates[1])
+        step = DIRECTION_STEPS[direction]
+        change_amount = 1 if step > 0 else -1
+        if direction == "R" or direction == "L":
+            current_index = coordinates[1]
+        else:
+            current_index = coordinates[0]
+
+        occupied = self._bitboards[0] | self._bitboards[1] | self._bitboards[2]
+        if not occupied & (1 << cell):
+            return current_index - change_amount  # an empty 'current piece' is its own (empty) line
+        empty_spaces_ahead = RAYS[direction][cell] & ~occupied
+        if not empty_spaces_ahead:
+            return -1 if change_amount < 0 else BOARD_SIZE  # same out of bounds index as the list walk
+        first_empty = nearest_bit_index(empty_spaces_ahead, step)
+        if direction == "R" or direction == "L":
+            return first_empty % BOARD_SIZE - change_amount
+        return first_empty // BOARD_SIZE - change_amount
+
+    def check_piece_matches_player(self, playername, coordinates):
+        """Checks that the 'current piece' bit is set on the current player's color bitboard"""
+        color_index = COLOR_INDEX.get(self.get_player_color(playername))
+        if color_index is None:
+            return False
+        return bool(self._bitboards[color_index] & (1 << cell_index(coordinates[0], coordinates[1])))
+
+    def check_proceeding_space(self, coordinates, direction):
+        """
+        Checks that the space "before" the 'current piece' is either an empty space or is the edge of the board,
+        and that a single piece on the edge is not being pushed "outward", otherwise returns false.
+        """
+        cell = cell_index(coordinates[0], coordinates[1])
+        if not RAYS[direction][cell]:
+            return False  # piece on the edge pushed outward
+        step = DIRECTION_STEPS[direction]
+        if not RAYS[OPPOSITE_DIRECTIONS[direction]][cell]:
+            return True  # piece on the edge pushed "into" the board
+        occupied = self._bitboards[0] | self._bitboards[1] | self._bitboards[2]
+        return not occupied & (1 << (cell - step))
+
+    def check_end_of_line_of_contig_pieces(self, playername, coordinates, direction):
+        """
+        Checks that a line of pieces running to the edge of the board does not end with a piece of the current
+        player's color, which would push their own piece off the board.
+        """
+        cell = cell_index(coordinates[0], coordinates[1])
+        ray = RAYS[direction][cell]
+        occupied = self._bitboards[0] | self._bitboards[1] | self._bitboards[2]
+        if not ray or ray & ~occupied:
+            return True  # the line stops before the edge, or the 'current piece' is the edge piece
+        color_index = COLOR_INDEX.get(self.get_player_color(playername))
+        if color_index is None:
+            return True
+        return not self._bitboards[color_index] & EDGE_BITS[direction][cell]
+
+    def check_and_record_captured_red(self, playername, coordinates_of_captured_piece):
+        """Checks whether the piece at the passed coordinates is R, if so updates the player 'captured_red'"""
+        bit = 1 << cell_index(coordinates_of_captured_piece[0], coordinates_of_captured_piece[1])
+        if self._bitboards[RED_INDEX] & bit:
+            self.update_captured(playername)
+
+    def move_the_pieces(self, playername, coordinates, direction):
+        """
+        Pushes the pieces on a copy of the current bitboards, records a captured red, and returns the post_move
+        board as a board list like KubaGame.move_the_pieces.
+        """
+        post_movement_bitboards, ejected_color_index = push_bitboards(
+            self._bitboards, cell_index(coordinates[0], coordinates[1]), direction)
+        if ejected_color_index == RED_INDEX:
+            self.update_captured(playername)
+        return bitboards_to_board(post_movement_bitboards)
+
+    def rebuild_occupancy(self):
+        """The OR of the three bitboards is the occupancy of every row and col, nothing to rebuild"""
+        pass
+
+    def update_line_occupancy(self, coordinates, direction):
+        """The OR of the three bitboards is the occupancy of every row and col, nothing to update"""
+        pass
+
+    def get_pushed_line(self, coordinates, direction):
+        """
+        Same result as KubaGame.get_pushed_line, None if the move breaks the proceeding space rule, otherwise the
+        index of the 'end of line' piece along the line and whether that piece is pushed off the board.
+        """
+        if not self.check_proceeding_space(coordinates, direction):
+            return None
+        end_of_line_index = self.find_index_of_EOL_of_contig_pieces(coordinates, direction)
+        if end_of_line_index < 0:
+            return (0, True)
+        if end_of_line_index > 6:
+            return (6, True)
+        return (end_of_line_index, False)
+
+    def check_push_repeats_past_board(self, coordinates, direction, end_of_line_index, ejected):
+        """
+        Checks whether a push would return the bitboards to the past bitboards, which is an exact compare of
+        three integers, or with superko looks up the board hash after the push in the board state history.
+        """
+        if ejected:
+            return False  # a marble leaving the board can never return to it
+        cell = cell_index(coordinates[0], coordinates[1])
+        if self._superko:
+            shifted_spaces, before = shifted_spaces_and_contents(self._bitboards, cell, direction)
+            post_movement_hash = self._board_hash ^ self.get_hash_delta(shifted_spaces, before, [" "] + before[:-1])
+            return post_movement_hash in self._position_history
+        return push_bitboards(self._bitboards, cell, direction)[0] == self._past_bitboards
+
+    def iter_legal_moves(self, playername):
+        """
+        Lazily generates every (coordinates, direction) move that make_move would accept from the passed player,
+        visiting only the set bits of the player's color bitboard.
+        """
+        if self.get_winner() is not None:
+            return
+        if playername != self.get_player_name(playername):
+            return
+        if self.get_current_turn() is not None and self.get_current_turn() != playername:
+            return
+        color_index = COLOR_INDEX.get(self.get_player_color(playername))
+        if color_index is None:
+            return
+        player_bitboard = self._bitboards[color_index]
+        occupied = self._bitboards[0] | self._bitboards[1] | self._bitboards[2]
+        remaining = player_bitboard
+        while remaining:
+            cell = (remaining & -remaining).bit_length() - 1
+            remaining &= remaining - 1  # clears the lowest set bit
+            coordinates = (cell // BOARD_SIZE, cell % BOARD_SIZE)
+            for direction in ("L", "R", "F", "B"):
+                ray = RAYS[direction][cell]
+                if not ray:
+                    continue  # single pieces on the edge can't be pushed "outward"
+                behind = RAYS[OPPOSITE_DIRECTIONS[direction]][cell]
+                if behind and occupied & (1 << (cell - DIRECTION_STEPS[direction])):
+                    continue  # space "before" the current piece is not empty
+                if not ray & ~occupied:
+                    if player_bitboard & EDGE_BITS[direction][cell]:
+                        continue  # can't push your own piece off the board
+                    yield coordinates, direction  # an ejection can never recreate the past board
+                elif not self.check_push_repeats_past_board(coordinates, direction, None, False):
+                    yield coordinates, direction
+
+    def apply_move(self, playername, coordinates, direction):
+        """Makes an already validated move on the bitboards and returns a MoveRecord that undo_move takes back"""
+        post_movement_bitboards, ejected_color_index = push_bitboards(
+            self._bitboards, cell_index(coordinates[0], coordinates[1]), direction)
+        return self.apply_pushed_bitboards(playername, coordinates, direction, post_movement_bitboards,
+                                           ejected_color_index)
+
+    def apply_pushed_bitboards(self, playername, coordinates, direction, post_movement_bitboards,
+                               ejected_color_index):
+        """
+        Records a push already made by push_bitboards. The current bitboards become the past bitboards, which
+        tuples make free, and the MoveRecord keeps the replaced past bitboards in past_board_before for undo_move.
+        """
+        if self._shared_state:
+            self.unshare_state()
+        shifted_spaces, before = shifted_spaces_and_contents(
+            self._bitboards, cell_index(coordinates[0], coordinates[1]), direction)
+        after = [" "] + before[:-1]
+        hashes_before = self.update_position_hashes(self.get_hash_delta(shifted_spaces, before, after))
+        ejected_marble = None if ejected_color_index is None else COLOR_ORDER[ejected_color_index]
+        captured_delta = self.record_ejected_marble(playername, ejected_marble)
+
+        record = MoveRecord(playername, coordinates, direction, shifted_spaces, before, after, ejected_marble,
+                            captured_delta, self.get_current_turn(), self.get_winner(), self._past_bitboards,
+                            hashes_before)
+        self._move_records.append(record)
+        self._past_bitboards = self._bitboards  # tuples are immutable, no copies needed
+        self._bitboards = post_movement_bitboards
+        self.set_current_turn(playername)
+        self.set_next_turn()  # sets turn too next player
+        self.winner_check(playername)  # checks for winner, sets if winner
+        if self._check_counters:
+            self.check_marble_counts()
+        return record
+
+    def undo_move(self, record):
+        """Takes back the move of the passed MoveRecord, which must be the last move applied"""
+        if self._shared_state:
+            self.unshare_state()
+        self._bitboards = self._past_bitboards
+        self._past_bitboards = record.past_board_before
+        self.take_back_ejected_marble(record)
+        self._move_records.pop()
+        self.restore_position_hashes(record.hashes_before)
+        self._current_turn = record.turn_before
+        self._winner = record.winner_before
+        if self._check_counters:
+            self.check_marble_counts()
+
+    def unshare_state(self):
+        """Called before the first change after a fork, the bitboard tuples are immutable, only counters are copied"""
+        self._marble_counts = self._marble_counts[:]
+        if self._position_history is not None:
+            self._position_history = dict(self._position_history)
+        self._shared_state = False
+
+    def make_move(self, playername, coordinates, direction):
+        """
+        Same validation chain and results as KubaGame.make_move, with the pieces pushed on the bitboards and the
+        previous board state check done by comparing three integers instead of two nested board lists.
+        """
+        if self._instrumentation is not None:
+            return self._instrumentation.make_move(self, playername, coordinates, direction)
+        if self.check_valid_player_name_direction_coordinates(playername, coordinates, direction):
+            if self.get_winner() is None:
+                if self.get_current_turn() is None:  # for the inital move of the game as either player can start
+                    self.set_current_turn(playername)
+                if self.get_current_turn() == self.get_player_name(playername):  # check it is player's turn
+                    if self.check_piece_matches_player(playername, coordinates):  # checks piece is player's
+                        if self.check_proceeding_space(coordinates, direction):  # checks for edge/space "before" piece
+                            if self.check_end_of_line_of_contig_pieces(playername, coordinates, direction):
+                                post_movement_bitboards, ejected_color_index = push_bitboards(
+                                    self._bitboards, cell_index(coordinates[0], coordinates[1]), direction)
+                                if self._superko:  # any earlier board state check
+                                    if self.check_push_repeats_past_board(coordinates, direction, None,
+                                                                          ejected_color_index is not None):
+                                        return False
+                                elif post_movement_bitboards == self._past_bitboards:  # previous board state check
+                                    return False
+                                self.apply_pushed_bitboards(playername, coordinates, direction,
+                                                            post_movement_bitboards, ejected_color_index)
+                                self.trim_move_records()
+                                if self._recorder is not None:
+                                    self._recorder(playername, coordinates, direction)
+                                if not self._quiet:
+                                    self.print_board(self.get_current_board())  # boards are only built to render
+                                return True
+                        return False
+                    return False
+                return False
+            return False
+        return False
+
+
+def random_move_script(seed, max_moves=200):
+    """
+    Plays a random game on a list-backed KubaGame and returns every attempted (playername, coordinates, direction)
+    move, accepted or rejected, so the same attempts can be replayed against each backend.
+    """
+    rng = random.Random(seed)
+    game = KubaGame(("playerA", "W"), ("playerB", "B"))
+    players = ("playerA", "playerB")
+    script = []
+    with open(os.devnull, "w") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            accepted = 0
+            playername = players[rng.randrange(2)]
+            while accepted < max_moves and game.get_winner() is None and len(script) < max_moves * 20:
+                color = game.get_player_color(playername)
+                board = game.get_current_board()
+                own_spaces = [(row, col) for row in range(7) for col in range(7) if board[row][col] == color]
+                move = (playername, rng.choice(own_spaces), rng.choice("LRFB"))
+                script.append(move)
+                if game.make_move(*move):
+                    accepted += 1
+                    playername = game.get_current_turn()
+        finally:
+            sys.stdout = stdout
+    return script
+
+
+def time_backend(game_class, scripts, render=True):
+    """
+    Replays every move script on a fresh game of game_class, returns (seconds, results) with stdout discarded.
+    With render False the games are quiet so only the game logic is timed.
+    """
+    results = []
+    elapsed = 0.0
+    with open(os.devnull, "w") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            for script in scripts:
+                game = game_class(("playerA", "W"), ("playerB", "B"), quiet=not render)
+                start = time.perf_counter()
+                for move in script:
+                    results.append(game.make_move(*move))
+                elapsed += time.perf_counter() - start
+                results.append((game.get_current_board(), game.get_marble_count(), game.get_winner(),
+                                game.get_captured("playerA"), game.get_captured("playerB")))
+        finally:
+            sys.stdout = stdout
+    return elapsed, results
+
+
+def benchmark(games=20, max_moves=200, seed=0):
+    """
+    Replays the same random games on KubaGame and KubaBitboardGame, checks that every make_move result and
+    final board match, and prints the time per attempted move and the speedup of the bitboard backend.
+    """
+    scripts = [random_move_script(seed + game_number, max_moves) for game_number in range(games)]
+    attempted_moves = sum(len(script) for script in scripts)
+    print("Attempted moves:", attempted_moves, "in", games, "games")
+    for render in (True, False):
+        list_seconds, list_results = time_backend(KubaGame, scripts, render)
+        bitboard_seconds, bitboard_results = time_backend(KubaBitboardGame, scripts, render)
+        if list_results != bitboard_results:
+            raise AssertionError("KubaBitboardGame results differ from KubaGame")
+        print("With print_board:" if render else "Game logic only:")
+        print("    KubaGame:         %.2f us/move" % (list_seconds / attempted_moves * 1e6))
+        print("    KubaBitboardGame: %.2f us/move" % (bitboard_seconds / attempted_moves * 1e6))
+        print("    Speedup:          %.2fx" % (list_seconds / bitboard_seconds))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,630 @@
+# Date: 10-18-2026
+# Description: This file contains the opening book and the endgame tablebases, built offline and stored as
+#       sorted, hash-indexed binary files that bot processes open with mmap. Nothing is parsed at load time: a
+#       file is a header followed by fixed size records sorted by their 64 bit key, and a probe is a binary
+#       search over the mapped records, O(log n), with the pages shared between every process that maps them.
+#
+#           header    4 magic bytes (b"KUBO" book, b"KUBT" tablebase), uint8 version, uint32 LE record count
+#           book      uint64 key, uint8 move byte, uint8 depth searched, int32 score for the player to move
+#           tablebase uint64 key, uint8 result (0 draw, 1 win, 2 loss), uint8 move byte, uint16 plies to the end
+#
+#       Move bytes are KubaRecord's encode_move, 255 for none. The book holds the KubaSearch move of every
+#       position within a few plies of the starting board, searched across worker processes, keyed by search_key
+#       with the color to move. The tablebases are solved by retrograde analysis for every board with at most
+#       max_marbles marbles in all, W, B and R counted together, and at most max_reds reds. The previous board
+#       state ban is part of the solved state: a state is the board, the color to move and the one push the ban
+#       forbids, if any. Reds captured are left out, so the tablebase is only probed when neither player can still
+#       capture 13 reds.
+#
+#       The tablebases are much smaller than two or three marbles per side. The default max_marbles of 3 covers
+#       1v1 with one red, 2v1 and 1v2, about 30 s to build on one core. Every board is built as a tuple of Python
+#       ints and indexed through a dict, the pushes of each board are generated in a Python loop, and the solved
+#       values of the smaller materials are a dict pickled into every worker task. 2v2 has 1.27M boards and 2v2
+#       with one red 57M, out of reach without ranking boards combinatorially, generating the pushes with NumPy
+#       and reading the smaller materials from the mapped file.
+#       KubaProbe(book_path, tablebase_path).probe(game, playername) is the KubaGame-level probe API.
+#       Example: python KubaBook.py build-tablebase --max-marbles 3 --output kuba.tb
+#                python KubaBook.py build-book --plies 2 --depth 3 --output kuba.book
+
+import argparse
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from KubaGame import ZOBRIST_TURN_KEYS
+from KubaBitboard import KubaBitboardGame, RAYS, OPPOSITE_DIRECTIONS, DIRECTION_STEPS, push_bitboards, \
+    bitboards_to_board
+from KubaRecord import encode_move, decode_move
+from KubaSearch import KubaSearch, WIN_SCORE, search_key
+from KubaSymmetry import position_bitboards
+
+BOOK_MAGIC = b"KUBO"
+TABLEBASE_MAGIC = b"KUBT"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sBI")
+BOOK_RECORD = struct.Struct("<QBBi")
+TABLEBASE_RECORD = struct.Struct("<QBBH")
+NO_MOVE = 255
+DRAW, WIN, LOSS = 0, 1, 2
+RESULT_NAMES = {DRAW: "draw", WIN: "win", LOSS: "loss"}
+DIRECTIONS = ("L", "R", "F", "B")
+COLORS = ("W", "B")
+RED_INDEX = 2
+TOTAL_REDS = 13
+BOARD_CELLS = 49
+
+
+class SortedRecordFile:
+    """
+    Read-only memory-mapped record file. find binary searches the records for a key and returns the unpacked
+    record or None. The mapping is shared by the operating system between every process that opens the file.
+    """
+    def __init__(self, path, magic, record_struct):
+        self._file = open(path, "rb")
+        self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, version, self._count = FILE_HEADER.unpack_from(self._mapped)
+        if file_magic != magic or version != FILE_VERSION:
+            raise ValueError("%s is not a version %d %r file" % (path, FILE_VERSION, magic))
+        self._record_struct = record_struct
+        if FILE_HEADER.size + self._count * record_struct.size > len(self._mapped):
+            raise ValueError("%s is truncated" % path)
+
+    def get_count(self):
+        """Getter method for the number of records"""
+        return self._count
+
+    def find(self, key):
+        """Returns the record with the key, or None"""
+        mapped = self._mapped
+        record_struct = self._record_struct
+        low = 0
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            record = record_struct.unpack_from(mapped, FILE_HEADER.size + middle * record_struct.size)
+            if record[0] < key:
+                low = middle + 1
+            elif record[0] > key:
+                high = middle
+            else:
+                return record
+        return None
+
+    def close(self):
+        """Unmaps and closes the file"""
+        self._mapped.close()
+        self._file.close()
+
+
+def write_record_file(path, magic, record_struct, records):
+    """Writes the records sorted by key, through a temporary file, raises ValueError for a repeated key"""
+    records = sorted(records)
+    for previous, record in zip(records, records[1:]):
+        if previous[0] == record[0]:
+            raise ValueError("key %d is in the records twice" % record[0])
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temp_path, "wb") as record_file:
+        record_file.write(FILE_HEADER.pack(magic, FILE_VERSION, len(records)))
+        for record in records:
+            record_file.write(record_struct.pack(*record))
+    os.replace(temp_path, path)
+
+
+class ProbeResult:
+    """A book or tablebase hit: the move for the player, its score like KubaSearch's, the depth and the source"""
+    __slots__ = ("move", "score", "depth", "result", "source")
+
+    def __init__(self, move, score, depth, result, source):
+        self.move = move  # (coordinates, direction), or None
+        self.score = score  # for the player to move, WIN_SCORE less the plies for a tablebase win
+        self.depth = depth  # depth searched for the book, plies to the end of the game for the tablebase
+        self.result = result  # "win", "loss" or "draw" for the tablebase, None for the book
+        self.source = source  # "book" or "tablebase"
+
+
+# Opening book
+
+def book_key(game, playername):
+    """Returns the book key of the position for the player to move, search_key with the color to move"""
+    key = search_key(game)
+    if game.get_current_turn() is None:  # before the first move either player may move, the key says which
+        key ^= ZOBRIST_TURN_KEYS[game.get_player_color(playername)]
+    return key
+
+
+def book_positions(plies, game_class=KubaBitboardGame):
+    """
+    Returns [(moves from the start, playername to move)] for every distinct position up to plies moves from the
+    starting board, both players being able to make the first move.
+    """
+    positions = {}
+    game = game_class(("playerA", "W"), ("playerB", "B"), quiet=True)
+
+    def visit(moves):
+        playername = game.get_current_turn()
+        movers = [playername] if playername is not None else [game.get_player1_name(), game.get_player2_name()]
+        for mover in movers:
+            positions.setdefault(book_key(game, mover), (list(moves), mover))
+        if len(moves) == plies or game.get_winner() is not None:
+            return
+        for mover in movers:
+            for coordinates, direction in game.legal_moves(mover):
+                record = game.apply_move(mover, coordinates, direction)
+                moves.append((mover, coordinates, direction))
+                try:
+                    visit(moves)
+                finally:
+                    moves.pop()
+                    game.undo_move(record)
+
+    visit([])
+    return list(positions.values())
+
+
+def search_book_position(task):
+    """Worker entry point, replays the moves of one position and returns its book record"""
+    moves, playername, max_depth, time_limit = task
+    game = KubaBitboardGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+    for move in moves:
+        game.apply_move(*move)
+    result = KubaSearch(time_limit=time_limit, max_depth=max_depth).choose_move(game, playername)
+    move_byte = NO_MOVE if result.move is None else encode_move(*result.move)
+    return book_key(game, playername), move_byte, result.depth, result.score
+
+
+def build_book(path, plies=2, max_depth=3, time_limit=None, workers=None):
+    """
+    Searches every position within plies of the starting board with KubaSearch to max_depth (or for
+    time_limit seconds) across workers processes (all cores when None, in this process when 1) and writes the
+    book. Returns the number of positions.
+    """
+    tasks = [(moves, playername, max_depth, time_limit) for moves, playername in book_positions(plies)]
+    if workers == 1:
+        records = [search_book_position(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(search_book_position, tasks, chunksize=4))
+    write_record_file(path, BOOK_MAGIC, BOOK_RECORD, records)
+    return len(records)
+
+
+# Endgame tablebases
+
+def tablebase_key(bitboards, color_index, banned_move):
+    """Returns the tablebase key of a board, the color to move and the move byte the ban forbids or NO_MOVE"""
+    data = struct.pack("<QQQBB", bitboards[0], bitboards[1], bitboards[2], color_index, banned_move)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def generate_pushes(bitboards, color_index):
+    """
+    Returns the (move byte, resulting bitboards, ejected color index or None) of every push the color may make
+    on the board under every rule but the previous board state ban, in cell then L/R/F/B order.
+    """
+    occupied = bitboards[0] | bitboards[1] | bitboards[2]
+    pushes = []
+    own = bitboards[color_index]
+    while own:
+        cell = (own & -own).bit_length() - 1
+        own &= own - 1  # clears the lowest set bit
+        for direction_index, direction in enumerate(DIRECTIONS):
+            if not RAYS[direction][cell]:
+                continue  # single pieces on the edge can't be pushed "outward"
+            if RAYS[OPPOSITE_DIRECTIONS[direction]][cell] and occupied >> (cell - DIRECTION_STEPS[direction]) & 1:
+                continue  # space "before" the current piece is not empty
+            result, ejected_color_index = push_bitboards(bitboards, cell, direction)
+            if ejected_color_index == color_index:
+                continue  # can't push your own piece off the board
+            pushes.append((cell << 2 | direction_index, result, ejected_color_index))
+    return pushes
+
+
+def enumerate_boards(material):
+    """Returns every (W, B, R) bitboards with the (white, black, red) marble counts of material"""
+    white_count, black_count, red_count = material
+    boards = []
+    cells = range(BOARD_CELLS)
+    for white_cells in itertools.combinations(cells, white_count):
+        white = sum(1 << cell for cell in white_cells)
+        black_choices = [cell for cell in cells if not white >> cell & 1]
+        for black_cells in itertools.combinations(black_choices, black_count):
+            black = sum(1 << cell for cell in black_cells)
+            red_choices = [cell for cell in black_choices if not black >> cell & 1]
+            for red_cells in itertools.combinations(red_choices, red_count):
+                boards.append((white, black, sum(1 << cell for cell in red_cells)))
+    return boards
+
+
+def tablebase_materials(max_marbles, max_reds):
+    """Returns the (white, black, red) materials of the tablebase, smaller totals first"""
+    materials = [(white, black, red) for white in range(1, max_marbles) for black in range(1, max_marbles)
+                 for red in range(max_reds + 1) if white + black + red <= max_marbles]
+    return sorted(materials, key=lambda material: (sum(material), material))
+
+
+def solve_material(task):
+    """
+    Worker entry point, solves one material by retrograde analysis. lower_values is {(bitboards, color index):
+    (result, plies)} of the unbanned states of every smaller material, which pushes that eject a marble lead
+    to. Returns (the tablebase records, {(bitboards, color index): (result, plies)} of the unbanned states).
+
+    A state is (board, color to move, banned move slot), slot max_moves meaning no ban. The values are found
+    by iterating every state at once with NumPy until nothing changes: a state is won when a legal push leads
+    to a lost state, lost when every legal push leads to a won state, and drawn when neither ever holds.
+    """
+    material, lower_values = task
+    boards = enumerate_boards(material)
+    board_index = {board: index for index, board in enumerate(boards)}
+    max_moves = 4 * max(material[0], material[1])
+    states = len(boards)
+    kinds = numpy.zeros((states, 2, max_moves), numpy.int8)  # 0 no move, 1 push inside this material, 2 known
+    children = numpy.zeros((states, 2, max_moves), numpy.int64)  # flat state index of kind 1 children
+    known_results = numpy.zeros((states, 2, max_moves), numpy.int8)  # kind 2 child results, 1 win -1 loss
+    known_plies = numpy.zeros((states, 2, max_moves), numpy.int32)
+    move_bytes = numpy.full((states, 2, max_moves), NO_MOVE, numpy.uint8)
+    pending = []  # (board, color, slot, child board) of the pushes that keep the material
+    slots_by_result = [{}, {}]  # per color, {(board, resulting board): slot}
+
+    for index, board in enumerate(boards):
+        for color_index in (0, 1):
+            for slot, (move_byte, result, ejected_color_index) in enumerate(generate_pushes(board, color_index)):
+                move_bytes[index, color_index, slot] = move_byte
+                if ejected_color_index is None:
+                    kinds[index, color_index, slot] = 1
+                    child_index = board_index[result]
+                    pending.append((index, color_index, slot, child_index))
+                    slots_by_result[color_index][(index, child_index)] = slot
+                    continue
+                kinds[index, color_index, slot] = 2
+                if ejected_color_index != RED_INDEX and not result[ejected_color_index]:
+                    known_results[index, color_index, slot] = -1  # the last opponent marble, the child is lost
+                    continue
+                child_result, child_plies = lower_values[(result, 1 - color_index)]
+                known_results[index, color_index, slot] = child_result
+                known_plies[index, color_index, slot] = child_plies
+    for index, color_index, slot, child_index in pending:
+        # after the push the opponent may not push the board back, the child's banned slot is that push
+        banned_slot = slots_by_result[1 - color_index].get((child_index, index), max_moves)
+        children[index, color_index, slot] = (child_index * 2 + 1 - color_index) * (max_moves + 1) + banned_slot
+
+    results = numpy.zeros((states, 2, max_moves + 1), numpy.int8)
+    plies = numpy.zeros((states, 2, max_moves + 1), numpy.int32)
+    has_move = kinds != 0
+    inside = kinds == 1
+    slot_numbers = numpy.arange(max_moves)
+    big = numpy.iinfo(numpy.int32).max
+    while True:
+        child_results = numpy.where(inside, results.reshape(-1)[children], known_results)
+        child_plies = numpy.where(inside, plies.reshape(-1)[children], known_plies)
+        new_results = numpy.zeros_like(results)
+        new_plies = numpy.zeros_like(plies)
+        for banned_slot in range(max_moves + 1):
+            legal = has_move & (slot_numbers != banned_slot)
+            losing_children = legal & (child_results == -1)
+            won = losing_children.any(axis=2)
+            won_plies = numpy.where(losing_children, child_plies, big).min(axis=2) + 1
+            lost = legal.any(axis=2) & ~(legal & (child_results != 1)).any(axis=2)
+            lost_plies = numpy.where(legal, child_plies, -1).max(axis=2) + 1
+            new_results[:, :, banned_slot] = numpy.where(won, 1, numpy.where(lost, -1, 0))
+            new_plies[:, :, banned_slot] = numpy.where(won, won_plies, numpy.where(lost, lost_plies, 0))
+        if numpy.array_equal(new_results, results) and numpy.array_equal(new_plies, plies):
+            break
+        results = new_results
+        plies = new_plies
+
+    child_results = numpy.where(inside, results.reshape(-1)[children], known_results)
+    child_plies = numpy.where(inside, plies.reshape(-1)[children], known_plies)
+    records = []
+    unbanned_values = {}
+    for banned_slot in range(max_moves, -1, -1):  # unbanned first, banned states are only kept where they differ
+        legal = has_move & (slot_numbers != banned_slot)
+        win_choice = numpy.where(legal & (child_results == -1), child_plies, big).argmin(axis=2)
+        loss_choice = numpy.where(legal, child_plies, -1).argmax(axis=2)
+        draw_choice = (legal & (child_results == 0)).argmax(axis=2)
+        state_results = results[:, :, banned_slot]
+        choice = numpy.where(state_results == 1, win_choice, numpy.where(state_results == -1, loss_choice,
+                                                                         draw_choice))
+        chosen_bytes = numpy.take_along_axis(move_bytes, choice[:, :, None], axis=2)[:, :, 0]
+        chosen_bytes = numpy.where(legal.any(axis=2), chosen_bytes, NO_MOVE)
+        if banned_slot == max_moves:
+            unbanned_bytes = chosen_bytes
+        for index, board in enumerate(boards):
+            for color_index in (0, 1):
+                if banned_slot < max_moves and not has_move[index, color_index, banned_slot]:
+                    continue
+                result = int(state_results[index, color_index])
+                state_plies = int(plies[index, color_index, banned_slot])
+                move_byte = int(chosen_bytes[index, color_index])
+                file_result = WIN if result == 1 else LOSS if result == -1 else DRAW
+                if banned_slot == max_moves:
+                    unbanned_values[(board, color_index)] = (result, state_plies)
+                    records.append((tablebase_key(board, color_index, NO_MOVE), file_result, move_byte,
+                                    state_plies))
+                    continue
+                banned_move = int(move_bytes[index, color_index, banned_slot])
+                # kept when the ban changes the value, or forbids the unbanned best move
+                if (result, state_plies) != unbanned_values[(board, color_index)] or \
+                        banned_move == unbanned_bytes[index, color_index]:
+                    records.append((tablebase_key(board, color_index, banned_move), file_result, move_byte,
+                                    state_plies))
+    return records, unbanned_values
+
+
+def build_tablebase(path, max_marbles=3, max_reds=1, workers=None):
+    """
+    Solves every material with at most max_marbles marbles, W, B and R counted together, and max_reds reds,
+    smallest totals first and the materials of one total across workers processes (in this process when 1),
+    and writes the tablebase. Returns the number of records. Beyond 3 or 4 marbles the boards no longer fit
+    this design's Python tuples and dicts, see the top of the file.
+    """
+    materials = tablebase_materials(max_marbles, max_reds)
+    lower_values = {}
+    records = []
+    for total in sorted({sum(material) for material in materials}):
+        tasks = [(material, lower_values) for material in materials if sum(material) == total]
+        if workers == 1 or len(tasks) == 1:
+            solved = [solve_material(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                solved = list(executor.map(solve_material, tasks))
+        for material_records, unbanned_values in solved:
+            records.extend(material_records)
+            lower_values.update(unbanned_values)
+    write_record_file(path, TABLEBASE_MAGIC, TABLEBASE_RECORD, records)
+    return len(records)
+
+
+# KubaGame-level probes
+
+class KubaProbe:
+    """
+    Opens an opening book and/or a tablebase file for probing games. probe returns the ProbeResult for the
+    player to move, from the tablebase when the position is in it, otherwise from the book, or None.
+    """
+    def __init__(self, book_path=None, tablebase_path=None):
+        self._book = SortedRecordFile(book_path, BOOK_MAGIC, BOOK_RECORD) if book_path else None
+        self._tablebase = SortedRecordFile(tablebase_path, TABLEBASE_MAGIC, TABLEBASE_RECORD) \
+            if tablebase_path else None
+
+    def probe(self, game, playername=None):
+        """Returns the ProbeResult of the game for playername (default the current turn), or None"""
+        playername = playername or game.get_current_turn()
+        if playername is None or game.get_winner() is not None:
+            return None
+        return self.probe_tablebase(game, playername) or self.probe_book(game, playername)
+
+    def probe_book(self, game, playername):
+        """Returns the book ProbeResult of the game for playername, or None"""
+        if self._book is None:
+            return None
+        record = self._book.find(book_key(game, playername))
+        if record is None:
+            return None
+        move = None if record[1] == NO_MOVE else decode_move(record[1])
+        return ProbeResult(move, record[3], record[2], None, "book")
+
+    def probe_tablebase(self, game, playername):
+        """
+        Returns the tablebase ProbeResult of the game for playername, or None if the position is not in the
+        tablebase or a player could still win by capturing reds.
+        """
+        if self._tablebase is None:
+            return None
+        current, past = position_bitboards(game)
+        reds = current[RED_INDEX].bit_count()
+        if reds and any(game.get_captured(player) + reds >= TOTAL_REDS
+                        for player in (game.get_player1_name(), game.get_player2_name())):
+            return None
+        color_index = COLORS.index(game.get_player_color(playername))
+        banned_move = NO_MOVE
+        for move_byte, result, ejected_color_index in generate_pushes(current, color_index):
+            if result == past:
+                banned_move = move_byte
+                break
+        record = None
+        if banned_move != NO_MOVE:
+            record = self._tablebase.find(tablebase_key(current, color_index, banned_move))
+        if record is None:
+            record = self._tablebase.find(tablebase_key(current, color_index, NO_MOVE))
+        if record is None:
+            return None
+        result, move_byte, record_plies = record[1:]
+        score = WIN_SCORE - record_plies if result == WIN else -(WIN_SCORE - record_plies) if result == LOSS else 0
+        move = None if move_byte == NO_MOVE else decode_move(move_byte)
+        return ProbeResult(move, score, record_plies, RESULT_NAMES[result], "tablebase")
+
+    def close(self):
+        """Closes the files"""
+        for record_file in (self._book, self._tablebase):
+            if record_file is not None:
+                record_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_tablebase_position(bitboards, color_index, captured=(5, 5)):
+    """Returns a quiet KubaBitboardGame with the board, the color to move and captured reds, with no past move"""
+    game = KubaBitboardGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+    board = bitboards_to_board(bitboards)
+    game.replace_past_board([row[:] for row in board])  # no push can recreate the board itself, so no ban
+    game.replace_current_board(board)
+    game.set_current_turn(("playerA", "playerB")[color_index])
+    for playername, count in zip(("playerA", "playerB"), captured):
+        for _ in range(count):
+            game.update_captured(playername)
+    return game
+
+
+def forced_win_within(game, plies):
+    """
+    Returns True if the player to move can force a win within the passed plies, counting both players' pushes,
+    by an exhaustive search with the game's own legal_moves, apply_move and undo_move.
+    """
+    if plies <= 0:
+        return False
+    playername = game.get_current_turn()
+    for coordinates, direction in game.legal_moves(playername):
+        record = game.apply_move(playername, coordinates, direction)
+        won = game.get_winner() == playername or forced_loss_within(game, plies - 1)
+        game.undo_move(record)
+        if won:
+            return True
+    return False
+
+
+def forced_loss_within(game, plies):
+    """
+    Returns True if the player to move has a legal push and every legal push lets the opponent force a win
+    within the rest of the passed plies. A player with no legal push is not lost, the tablebase scores a draw.
+    """
+    if plies <= 1:
+        return False
+    playername = game.get_current_turn()
+    moves = game.legal_moves(playername)
+    if not moves:
+        return False
+    for coordinates, direction in moves:
+        record = game.apply_move(playername, coordinates, direction)
+        lost = forced_win_within(game, plies - 1)
+        game.undo_move(record)
+        if not lost:
+            return False
+    return True
+
+
+def check_tablebase(path, max_marbles, max_reds, positions=300, search_plies=5):
+    """
+    Checks sampled tablebase positions against the game's own rules, about positions of each result per
+    material. Won and lost positions are rare, so twenty times as many boards are probed as are checked. Won
+    positions are played out with the tablebase moves for both players through make_move, and every move must
+    be accepted and the winner must win in exactly the probed plies. Every result within search_plies is also
+    checked by an exhaustive search that doesn't use the tablebase: a win or a loss in d plies must be forced
+    within d plies and not within d - 2, and a draw must have no forced win or loss within search_plies.
+    Returns the probes per second.
+    """
+    played = probes = 0
+    searched = {"win": 0, "loss": 0, "draw": 0}
+    probe_seconds = 0.0
+    with KubaProbe(tablebase_path=path) as prober:
+        for material in tablebase_materials(max_marbles, max_reds):
+            boards = enumerate_boards(material)
+            sampled = {"win": 0, "loss": 0, "draw": 0}
+            for board in boards[::max(1, len(boards) * len(COLORS) // (20 * positions))]:
+                for color_index in (0, 1):
+                    game = load_tablebase_position(board, color_index)
+                    start = time.perf_counter()
+                    result = prober.probe(game)
+                    probe_seconds += time.perf_counter() - start
+                    probes += 1
+                    if result is None or sampled[result.result] * len(RESULT_NAMES) >= positions:
+                        continue
+                    sampled[result.result] += 1
+                    if result.result == "draw":
+                        if forced_win_within(game, search_plies) or forced_loss_within(game, search_plies):
+                            raise AssertionError("drawn position of %r decided within %d plies"
+                                                 % (material, search_plies))
+                        searched["draw"] += 1
+                        continue
+                    if result.depth <= search_plies:
+                        forced = forced_win_within if result.result == "win" else forced_loss_within
+                        if not forced(game, result.depth) or forced(game, result.depth - 2):
+                            raise AssertionError("%s of %r not forced in exactly %d plies"
+                                                 % (result.result, material, result.depth))
+                        searched[result.result] += 1
+                    if result.result != "win":
+                        continue
+                    winner = game.get_current_turn()
+                    for _ in range(result.depth):
+                        playername = game.get_current_turn()
+                        move = prober.probe(game).move
+                        if not game.make_move(playername, move[0], move[1]):
+                            raise AssertionError("tablebase move %r rejected" % (move,))
+                    if game.get_winner() != winner:
+                        raise AssertionError("won position of %r not won in %d plies" % (material, result.depth))
+                    played += 1
+    print("%d won positions played out as probed" % played)
+    print("%d wins, %d losses and %d draws confirmed by a %d ply search"
+          % (searched["win"], searched["loss"], searched["draw"], search_plies))
+    return probes / probe_seconds
+
+
+def check_and_time(max_marbles=3, max_reds=1):
+    """
+    Builds a small tablebase and book in a temporary directory, checks them and prints their sizes, build times
+    and probe speeds. Nothing outside the temporary directory is written or removed.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        tablebase_path = os.path.join(directory, "kuba_check.tb")
+        book_path = os.path.join(directory, "kuba_check.book")
+        start = time.perf_counter()
+        records = build_tablebase(tablebase_path, max_marbles, max_reds, workers=1)
+        print("tablebase: %d records, %d bytes, built in %.1f s" % (records, os.path.getsize(tablebase_path),
+                                                                    time.perf_counter() - start))
+        print("tablebase probes: %.0f/s" % check_tablebase(tablebase_path, max_marbles, max_reds))
+
+        start = time.perf_counter()
+        records = build_book(book_path, plies=1, max_depth=2, workers=1)
+        print("book: %d positions, %d bytes, built in %.1f s" % (records, os.path.getsize(book_path),
+                                                                 time.perf_counter() - start))
+        with KubaProbe(book_path=book_path) as prober:
+            game = KubaBitboardGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+            result = prober.probe(game, "playerA")
+            expected = KubaSearch(time_limit=None, max_depth=2).choose_move(game, "playerA")
+            if result is None or result.move != expected.move or result.score != expected.score:
+                raise AssertionError("book move differs from the search")
+            if not game.make_move("playerA", result.move[0], result.move[1]):
+                raise AssertionError("book move rejected")
+            if prober.probe(game) is None:
+                raise AssertionError("position after a book move is missing")
+            calls = 10000
+            start = time.perf_counter()
+            for _ in range(calls):
+                prober.probe_book(game, "playerB")
+            print("book probes: %.0f/s" % (calls / (time.perf_counter() - start)))
+
+
+def main(argv=None):
+    """Command line entry point, builds a book or tablebase, or probes the starting position"""
+    parser = argparse.ArgumentParser(description="Builds Kuba opening books and endgame tablebases.")
+    subparsers = parser.add_subparsers(dest="command")
+    book_parser = subparsers.add_parser("build-book", help="search the positions near the starting board")
+    book_parser.add_argument("--plies", type=int, default=2, help="moves from the starting board")
+    book_parser.add_argument("--depth", type=int, default=3, help="search depth of each position")
+    book_parser.add_argument("--time", type=float, default=None, help="seconds per position instead of the depth")
+    book_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    book_parser.add_argument("--output", default="kuba.book", help="book file to write")
+    tablebase_parser = subparsers.add_parser("build-tablebase", help="solve the low material endgames")
+    tablebase_parser.add_argument("--max-marbles", type=int, default=3, help="most marbles, W, B and R together")
+    tablebase_parser.add_argument("--max-reds", type=int, default=1, help="most reds on the board")
+    tablebase_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    tablebase_parser.add_argument("--output", default="kuba.tb", help="tablebase file to write")
+    subparsers.add_parser("check", help="build small files in a temporary directory, check and time them")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "build-book":
+        max_depth = args.depth if args.time is None else 64
+        count = build_book(args.output, args.plies, max_depth, args.time, args.workers)
+    elif args.command == "build-tablebase":
+        count = build_tablebase(args.output, args.max_marbles, args.max_reds, args.workers)
+    else:
+        check_and_time()
+        return 0
+    print("%d records written to %s in %.1f s" % (count, args.output, time.perf_counter() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,309 @@
+# Date: 10-18-2026
+# Description: This file contains CompactKubaGame, a memory-compact Kuba game for keeping large numbers of
+#       sessions in memory. It plays by the same rules as KubaGame.make_move, but the instance has __slots__
+#       instead of a __dict__, the board is a 49 byte bytearray of " "/W/B/R characters, and the past board is
+#       kept as a diff: the spaces the last move changed and what they held before it. to_bytes and from_bytes
+#       snapshot the whole game into a few dozen bytes. There is no rendering, these games are always quiet.
+#       Running this file checks CompactKubaGame against KubaGame and measures the footprint of both.
+
+import random
+import struct
+import tracemalloc
+
+from KubaGame import KubaGame
+
+STARTING_BOARD = b"WW   BBWW R BB  RRR   RRRRR   RRR  BB R WWBB   WW"  # row by row, 7 spaces per row
+EMPTY = 32  # byte of " "
+WHITE, BLACK, RED = 87, 66, 82  # bytes of "W", "B", "R"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<B49sBBBBB")  # version, board, turn, winner, captured x2, past diff length
+
+
+class CompactKubaGame:
+    """
+    Kuba game with the same make_move rules and results as KubaGame, in a fraction of the memory. The current
+    turn and winner are kept as 0 (None), 1 (player1) or 2 (player2), and the marble count is counted from the
+    board bytes when asked for.
+    """
+    __slots__ = ("_player1_name", "_player1_color", "_player2_name", "_player2_color", "_board", "_past_spaces",
+                 "_past_values", "_current_turn", "_winner", "_player1_red_captured", "_player2_red_captured")
+
+    def __init__(self, player1, player2):
+        self._player1_name = player1[0]  # Paring the user name and color from each tuple
+        self._player1_color = player1[1]
+        self._player2_name = player2[0]
+        self._player2_color = player2[1]
+        self._board = bytearray(STARTING_BOARD)  # the main, current working board, index row * 7 + col
+        self._past_spaces = b""  # board indexes the last move changed, the past board differs only there
+        self._past_values = b""  # what those spaces held on the past board
+        self._current_turn = 0
+        self._winner = 0
+        self._player1_red_captured = 0
+        self._player2_red_captured = 0
+
+    def get_player1_name(self):
+        """Returns private player 1 name variable"""
+        return self._player1_name
+
+    def get_player2_name(self):
+        """Returns private player 2 name variable"""
+        return self._player2_name
+
+    def get_player_number(self, playername):
+        """Returns 1 or 2 for the passed playername, 0 if it is neither player"""
+        if playername == self._player1_name:
+            return 1
+        if playername == self._player2_name:
+            return 2
+        return 0
+
+    def get_player_name_of_number(self, player_number):
+        """Returns the playername of player number 1 or 2, None for 0"""
+        return (None, self._player1_name, self._player2_name)[player_number]
+
+    def get_player_color(self, playername):
+        """Returns the W/B color of the passed playername"""
+        if playername == self._player1_name:
+            return self._player1_color
+        if playername == self._player2_name:
+            return self._player2_color
+
+    def get_winner(self):
+        """Returns the winner's playername or None"""
+        return self.get_player_name_of_number(self._winner)
+
+    def get_current_turn(self):
+        """Returns the playername whose turn it is, None before the first move"""
+        return self.get_player_name_of_number(self._current_turn)
+
+    def get_captured(self, playername):
+        """Returns the reds captured by the passed playername"""
+        if playername == self._player1_name:
+            return self._player1_red_captured
+        if playername == self._player2_name:
+            return self._player2_red_captured
+
+    def get_marble(self, coordinates):
+        """Returns the contents of a given board space, either B/W/R for a marble, or X for empty space"""
+        space = self._board[coordinates[0] * 7 + coordinates[1]]
+        return "X" if space == EMPTY else chr(space)
+
+    def get_marble_count(self):
+        """Returns a tuple with the count of the marbles still on the board, in W/B/R order"""
+        board = self._board
+        return board.count(WHITE), board.count(BLACK), board.count(RED)
+
+    def get_current_board(self):
+        """Returns the current board as a 7x7 board list of " "/W/B/R strings, built from the board bytes"""
+        text = self._board.decode("ascii")
+        return [list(text[row * 7:row * 7 + 7]) for row in range(7)]
+
+    def get_past_board(self):
+        """Returns the past board as a 7x7 board list, the current board with the last move's changes taken back"""
+        past_board = bytearray(self._board)
+        for space, value in zip(self._past_spaces, self._past_values):
+            past_board[space] = value
+        text = past_board.decode("ascii")
+        return [list(text[row * 7:row * 7 + 7]) for row in range(7)]
+
+    def get_line(self, coordinates, direction):
+        """Returns the list of board indexes from the 'current piece' to the edge in the direction of the push"""
+        row_index = coordinates[0]
+        col_index = coordinates[1]
+        start = row_index * 7 + col_index
+        if direction == "R":
+            return list(range(start, row_index * 7 + 7))
+        if direction == "L":
+            return list(range(start, row_index * 7 - 1, -1))
+        if direction == "B":
+            return list(range(start, 49, 7))
+        return list(range(start, col_index - 1, -7))  # F
+
+    def push_repeats_past_board(self, shifted_spaces, after):
+        """
+        Returns True if writing after into shifted_spaces would make the past board. The post move board and
+        the past board each differ from the current board only in their own few spaces, so only those are
+        compared.
+        """
+        board = self._board
+        post_values = dict(zip(shifted_spaces, after))
+        past_values = dict(zip(self._past_spaces, self._past_values))
+        for space in post_values.keys() | past_values.keys():
+            if post_values.get(space, board[space]) != past_values.get(space, board[space]):
+                return False
+        return True
+
+    def make_move(self, playername, coordinates, direction):
+        """
+        Validates and makes a move with the same checks, in the same order and with the same results as
+        KubaGame.make_move: player, coordinates, direction, winner, turn (the first mover sets it), the 'current
+        piece' color, the proceeding space, pushing an own marble off, and returning to the past board. Returns
+        True if the move was made, otherwise False.
+        """
+        player_number = self.get_player_number(playername)
+        if not player_number or not (0 <= coordinates[0] <= 6 and 0 <= coordinates[1] <= 6):
+            return False
+        if direction not in ("L", "R", "F", "B"):
+            return False
+        if self._winner:
+            return False
+        if not self._current_turn:  # for the inital move of the game as either player can start
+            self._current_turn = player_number
+        if self._current_turn != player_number:
+            return False
+        board = self._board
+        player_color = ord(self.get_player_color(playername))
+        if board[coordinates[0] * 7 + coordinates[1]] != player_color:
+            return False
+        line = self.get_line(coordinates, direction)
+        if len(line) == 1:
+            return False  # single pieces on the edge can't be pushed "outward"
+        if len(line) < 7 and board[2 * line[0] - line[1]] != EMPTY:
+            return False  # space "before" the current piece is taken, a full length line starts on the edge
+
+        end_of_line = len(line)  # position along the line of the first empty space, len(line) if none
+        for position in range(1, len(line)):
+            if board[line[position]] == EMPTY:
+                end_of_line = position
+                break
+        ejected = end_of_line == len(line)
+        if ejected:
+            shifted_spaces = line
+            if board[line[-1]] == player_color:
+                return False  # can't push your own piece off the board
+        else:
+            shifted_spaces = line[:end_of_line + 1]
+        before = bytes(board[space] for space in shifted_spaces)
+        after = bytes([EMPTY]) + before[:-1]
+        if not ejected and self.push_repeats_past_board(shifted_spaces, after):
+            return False
+
+        for space, value in zip(shifted_spaces, after):
+            board[space] = value
+        self._past_spaces = bytes(shifted_spaces)
+        self._past_values = before
+        if ejected and before[-1] == RED:
+            if player_number == 1:
+                self._player1_red_captured += 1
+            else:
+                self._player2_red_captured += 1
+        self._current_turn = 3 - player_number
+        opponent_color = BLACK if player_color == WHITE else WHITE
+        if self.get_captured(playername) == 13 or board.count(opponent_color) == 0:
+            self._winner = player_number
+        return True
+
+    def to_bytes(self):
+        """Returns a snapshot of the whole game as bytes, restored by from_bytes"""
+        names = bytearray()
+        for name, color in ((self._player1_name, self._player1_color), (self._player2_name, self._player2_color)):
+            name_bytes = name.encode("utf-8")
+            names.append(len(name_bytes))
+            names += name_bytes
+            names += color.encode("ascii")
+        return (SNAPSHOT_HEADER.pack(SNAPSHOT_VERSION, bytes(self._board), self._current_turn, self._winner,
+                                     self._player1_red_captured, self._player2_red_captured, len(self._past_spaces))
+                + self._past_spaces + self._past_values + bytes(names))
+
+    @classmethod
+    def from_bytes(cls, snapshot):
+        """Returns the game of a to_bytes snapshot"""
+        (version, board, current_turn, winner, player1_red_captured, player2_red_captured,
+         past_length) = SNAPSHOT_HEADER.unpack_from(snapshot)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError("unknown snapshot version %d" % version)
+        offset = SNAPSHOT_HEADER.size
+        past_spaces = bytes(snapshot[offset:offset + past_length])
+        past_values = bytes(snapshot[offset + past_length:offset + 2 * past_length])
+        offset += 2 * past_length
+        players = []
+        for _ in range(2):
+            name_length = snapshot[offset]
+            players.append((bytes(snapshot[offset + 1:offset + 1 + name_length]).decode("utf-8"),
+                            chr(snapshot[offset + 1 + name_length])))
+            offset += name_length + 2
+        game = cls(players[0], players[1])
+        game._board = bytearray(board)
+        game._past_spaces = past_spaces
+        game._past_values = past_values
+        game._current_turn = current_turn
+        game._winner = winner
+        game._player1_red_captured = player1_red_captured
+        game._player2_red_captured = player2_red_captured
+        return game
+
+
+def differential_check(games=200, attempts=400, seed=0):
+    """
+    Makes the same random attempted moves, biased toward the last move's line so board state reversals come
+    up, on KubaGame and CompactKubaGame, and checks every result and the state after it, including a
+    to_bytes / from_bytes round trip.
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+        compact_game = CompactKubaGame(("playerA", "W"), ("playerB", "B"))
+        last_move = None
+        for _ in range(attempts):
+            playername = rng.choice(("playerA", "playerB"))
+            coordinates = (rng.randrange(7), rng.randrange(7))
+            if last_move is not None and rng.random() < 0.5:
+                (last_row, last_col), last_direction = last_move
+                coordinates = (last_row, rng.randrange(7)) if last_direction in "LR" else (rng.randrange(7), last_col)
+            direction = rng.choice("LRFB")
+            result = game.make_move(playername, coordinates, direction)
+            if compact_game.make_move(playername, coordinates, direction) != result:
+                raise AssertionError("make_move results differ for %r" % ((playername, coordinates, direction),))
+            if result:
+                last_move = (coordinates, direction)
+            if (compact_game.get_current_board() != game.get_current_board()
+                    or compact_game.get_current_turn() != game.get_current_turn()
+                    or compact_game.get_winner() != game.get_winner()
+                    or compact_game.get_marble_count() != game.get_marble_count()
+                    or compact_game.get_captured("playerA") != game.get_captured("playerA")
+                    or compact_game.get_captured("playerB") != game.get_captured("playerB")):
+                raise AssertionError("game state differs after %r" % ((playername, coordinates, direction),))
+            if result and compact_game.get_past_board() != game.get_past_board():
+                raise AssertionError("past board differs after %r" % ((playername, coordinates, direction),))
+            compact_game = CompactKubaGame.from_bytes(compact_game.to_bytes())
+    print("CompactKubaGame matches KubaGame in", games, "games")
+
+
+def measure_footprint(game_class, instances=2000, moves=20, seed=0):
+    """Returns the average bytes allocated per game of game_class after moves random legal moves each"""
+    rng = random.Random(seed)
+    scripts = []  # moves chosen ahead of time so only the games are measured
+    for _ in range(instances):
+        game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+        script = []
+        playername = "playerA"
+        for _ in range(moves):
+            legal_moves = game.legal_moves(playername)
+            if not legal_moves or game.get_winner() is not None:
+                break
+            move = rng.choice(legal_moves)
+            game.make_move(playername, move[0], move[1])
+            script.append((playername, move[0], move[1]))
+            playername = game.get_current_turn()
+        scripts.append(script)
+    tracemalloc.start()
+    start_size = tracemalloc.get_traced_memory()[0]
+    games = []
+    for script in scripts:
+        game = game_class(("playerA", "W"), ("playerB", "B")) if game_class is CompactKubaGame else \
+            game_class(("playerA", "W"), ("playerB", "B"), quiet=True)
+        for move in script:
+            game.make_move(*move)
+        games.append(game)
+    size = tracemalloc.get_traced_memory()[0] - start_size
+    tracemalloc.stop()
+    return size / instances
+
+
+if __name__ == '__main__':
+    differential_check()
+    for moves in (20, 200):
+        for label, game_class in (("KubaGame", KubaGame), ("CompactKubaGame", CompactKubaGame)):
+            print("%-16s %6.0f bytes per game after %d moves" % (label, measure_footprint(game_class, moves=moves),
+                                                                  moves))
+    print("to_bytes snapshot: %d bytes" % len(CompactKubaGame(("playerA", "W"), ("playerB", "B")).to_bytes()))
@@ -0,0 +1,291 @@
+# Date: 10-18-2026
+# Description: This file contains incrementally maintained evaluation features for search. Every push is along
+#       one row or col, and whether a push is possible, and what it pushes off, only depends on that line, so
+#       each feature is a sum (or, for sets of spaces, a union) of per line values looked up by the 14 bit line
+#       state of KubaLineTable. KubaFeatureGame keeps the per line values of all 14 lines and, when a push or an
+#       undo changes a row or col, only recomputes the lines whose state changed. The features, per color, are:
+#
+#           mobility          pushes the color could make, every rule but the previous board state ban
+#           edge_exposed      marbles on the edge spaces, where they can be pushed off
+#           reachable_reds    reds on the edge the color could push off the board with one push
+#           threatened        marbles of the color the opponent could push off the board with one push
+#
+#       With check_features True every update is checked against compute_features, the from scratch version
+#       that walks the board. Running this file checks both on random games and times them.
+
+import random
+import time
+
+from KubaGame import KubaGame
+from KubaLineTable import (KubaLineTableGame, LINE_STATES, BLOCKED_FLAG, SELF_EJECTION_FLAG, WRONG_COLOR_FLAG,
+                           END_OF_LINE_SHIFT, EJECTED_SHIFT, load_line_table, table_index)
+from KubaSearch import MATERIAL_WEIGHT, RED_CAPTURE_WEIGHT, EDGE_EXPOSURE_WEIGHT
+
+FEATURES = ("mobility", "edge_exposed", "reachable_reds", "threatened")
+COLORS = ("W", "B")
+LINE_COLOR_CODES = (1, 2)  # 2 bit line state codes of W and B
+RED_LINE_CODE = 3
+ILLEGAL_FLAGS = BLOCKED_FLAG | SELF_EJECTION_FLAG | WRONG_COLOR_FLAG
+COL_SPREAD = [sum(1 << (7 * row) for row in range(7) if mask >> row & 1) for mask in range(128)]  # col mask -> board
+FEATURE_WEIGHTS = {"mobility": 1, "reachable_reds": 4, "threatened": 6}  # on top of KubaSearch's weights
+
+_line_features = None  # per line state feature values once built in this process
+
+
+def compute_line_features(line_state, table):
+    """
+    Returns the feature values of one line state: (W pushes, B pushes, mask of the reds W can push off, same for
+    B, mask of the W marbles B can push off, mask of the B marbles W can push off, W marbles, B marbles, W
+    marbles on the two end spaces, B marbles on the two end spaces). Masks have bit i for space i of the line.
+    """
+    pushes = [0, 0]
+    red_masks = [0, 0]
+    threatened_masks = [0, 0]  # by the color threatened
+    for start_index in range(7):
+        for forward in (0, 1):
+            for mover_index in (0, 1):
+                entry = table[table_index(line_state, start_index, forward, mover_index)]
+                if entry & ILLEGAL_FLAGS:
+                    continue
+                pushes[mover_index] += 1
+                end_of_line_index = (entry >> END_OF_LINE_SHIFT & 15) - 1
+                if 0 <= end_of_line_index <= 6:
+                    continue
+                edge_bit = 1 << (6 if forward else 0)
+                ejected_code = entry >> EJECTED_SHIFT & 3
+                if ejected_code == RED_LINE_CODE:
+                    red_masks[mover_index] |= edge_bit
+                elif ejected_code == LINE_COLOR_CODES[1 - mover_index]:
+                    threatened_masks[1 - mover_index] |= edge_bit
+    codes = [(line_state >> (2 * index)) & 3 for index in range(7)]
+    counts = [codes.count(code) for code in LINE_COLOR_CODES]
+    end_counts = [(codes[0] == code) + (codes[6] == code) for code in LINE_COLOR_CODES]
+    return (pushes[0], pushes[1], red_masks[0], red_masks[1], threatened_masks[0], threatened_masks[1],
+            counts[0], counts[1], end_counts[0], end_counts[1])
+
+
+def load_line_features():
+    """Returns the feature values of every line state, built from the line push table on first use"""
+    global _line_features
+    if _line_features is None:
+        table = load_line_table()
+        _line_features = [compute_line_features(line_state, table) for line_state in range(LINE_STATES)]
+    return _line_features
+
+
+def compute_features(game):
+    """
+    From scratch features of any KubaGame, walking the board with the KubaGame push checks for every marble and
+    direction. Returns {feature: (W value, B value)}, the same as KubaFeatureGame.get_features.
+    """
+    board = game.get_current_board()
+    playernames = {game.get_player_color(name): name for name in (game.get_player1_name(), game.get_player2_name())}
+    mobility = [0, 0]
+    reachable_reds = [set(), set()]
+    threatened = [set(), set()]
+    for color_index, color in enumerate(COLORS):
+        playername = playernames[color]
+        for row in range(7):
+            for col in range(7):
+                if board[row][col] != color:
+                    continue
+                for direction in ("L", "R", "F", "B"):
+                    if not KubaGame.check_proceeding_space(game, (row, col), direction) or \
+                            not KubaGame.check_end_of_line_of_contig_pieces(game, playername, (row, col), direction):
+                        continue
+                    mobility[color_index] += 1
+                    end_of_line_index = KubaGame.find_index_of_EOL_of_contig_pieces(game, (row, col), direction)
+                    if 0 <= end_of_line_index <= 6:
+                        continue
+                    edge_index = 0 if end_of_line_index < 0 else 6
+                    edge_space = (row, edge_index) if direction in ("L", "R") else (edge_index, col)
+                    marble = board[edge_space[0]][edge_space[1]]
+                    if marble == "R":
+                        reachable_reds[color_index].add(edge_space)
+                    elif marble == COLORS[1 - color_index]:
+                        threatened[1 - color_index].add(edge_space)
+    edge_exposed = [0, 0]
+    for row in range(7):
+        for col in range(7):
+            if (row in (0, 6) or col in (0, 6)) and board[row][col] in COLORS:
+                edge_exposed[COLORS.index(board[row][col])] += 1
+    return {"mobility": tuple(mobility), "edge_exposed": tuple(edge_exposed),
+            "reachable_reds": (len(reachable_reds[0]), len(reachable_reds[1])),
+            "threatened": (len(threatened[0]), len(threatened[1]))}
+
+
+class KubaFeatureGame(KubaLineTableGame):
+    """
+    A KubaLineTableGame that keeps the evaluation features up to date as moves are applied and undone. Line
+    index 0-6 is rows 0-6 and 7-13 is cols 0-6. Sums are kept as running totals, and the masks of each line
+    are kept as board bit masks that get_features ORs together, so a space reachable along both its row and
+    col counts once. With check_features True every update is checked against compute_features.
+    """
+    def __init__(self, player1, player2, superko=False, quiet=False, renderer=None, check_counters=False,
+                 recorder=None, instrumentation=None, check_features=False):
+        self._check_features = check_features  # set first, the parent __init__ builds the line states
+        super().__init__(player1, player2, superko, quiet, renderer, check_counters, recorder, instrumentation)
+
+    def __setstate__(self, state):
+        """Unpickles a game, building the line feature values first in a process that has not used them yet"""
+        load_line_features()
+        super().__setstate__(state)
+
+    def rebuild_occupancy(self):
+        """Rebuilds the line states and every line's feature values"""
+        super().rebuild_occupancy()
+        self._line_feature_states = [None] * 14  # line state each line's feature values were computed for
+        self._line_feature_values = [None] * 14  # (W pushes, B pushes, masks..., W edge, B edge) of each line
+        self._feature_totals = [0, 0, 0, 0]  # W pushes, B pushes, W edge, B edge
+        self.update_features(range(14))
+
+    def unshare_state(self):
+        """Called before the first change after a fork, copies the per line feature values and the totals too"""
+        super().unshare_state()
+        self._line_feature_states = self._line_feature_states[:]
+        self._line_feature_values = self._line_feature_values[:]
+        self._feature_totals = self._feature_totals[:]
+
+    def update_line_occupancy(self, coordinates, direction):
+        """Updates the line states after a push or undo, then the features of the lines that changed"""
+        super().update_line_occupancy(coordinates, direction)
+        if direction == "R" or direction == "L":
+            self.update_features([coordinates[0]] + list(range(7, 14)))  # the row and the cols crossing it
+        else:
+            self.update_features([7 + coordinates[1]] + list(range(7)))  # the col and the rows crossing it
+
+    def update_features(self, line_indexes):
+        """Replaces the feature values of the passed lines whose state changed, adjusting the running totals"""
+        line_features = load_line_features()
+        states = self._line_feature_states
+        values = self._line_feature_values
+        totals = self._feature_totals
+        for line_index in line_indexes:
+            if line_index < 7:
+                line_state = self._row_states[line_index]
+            else:
+                line_state = self._col_states[line_index - 7]
+            if states[line_index] == line_state:
+                continue
+            features = line_features[line_state]
+            if line_index < 7:
+                shift = 7 * line_index
+                masks = tuple(mask << shift for mask in features[2:6])
+                if line_index in (0, 6):  # every space of the top and bottom rows is on the edge
+                    edge = features[6:8]
+                else:
+                    edge = features[8:10]
+            else:
+                masks = tuple(COL_SPREAD[mask] << (line_index - 7) for mask in features[2:6])
+                edge = (0, 0)  # the rows count every edge space once
+            old_values = values[line_index]
+            if old_values is not None:
+                totals[0] -= old_values[0]
+                totals[1] -= old_values[1]
+                totals[2] -= old_values[6]
+                totals[3] -= old_values[7]
+            new_values = (features[0], features[1]) + masks + edge
+            totals[0] += new_values[0]
+            totals[1] += new_values[1]
+            totals[2] += new_values[6]
+            totals[3] += new_values[7]
+            values[line_index] = new_values
+            states[line_index] = line_state
+        if self._check_features and None not in values:
+            self.check_features()
+
+    def get_features(self):
+        """Returns {feature: (W value, B value)} of the current board"""
+        totals = self._feature_totals
+        red_masks = [0, 0]
+        threatened_masks = [0, 0]
+        for values in self._line_feature_values:
+            red_masks[0] |= values[2]
+            red_masks[1] |= values[3]
+            threatened_masks[0] |= values[4]
+            threatened_masks[1] |= values[5]
+        return {"mobility": (totals[0], totals[1]), "edge_exposed": (totals[2], totals[3]),
+                "reachable_reds": (red_masks[0].bit_count(), red_masks[1].bit_count()),
+                "threatened": (threatened_masks[0].bit_count(), threatened_masks[1].bit_count())}
+
+    def check_features(self):
+        """Debug self check, raises AssertionError if the incremental features differ from compute_features"""
+        features = self.get_features()
+        scanned_features = compute_features(self)
+        if features != scanned_features:
+            raise AssertionError("incremental features %s differ from board scan %s" % (features, scanned_features))
+
+
+def evaluate_features(game, playername, features=None):
+    """
+    Returns a static score for the passed player like KubaSearch.evaluate, material, captured reds and edge
+    exposure, plus mobility, reachable reds and threatened marbles, all more than the opponent. features
+    defaults to the game's incremental features for a KubaFeatureGame, otherwise compute_features.
+    """
+    if features is None:
+        features = game.get_features() if isinstance(game, KubaFeatureGame) else compute_features(game)
+    opponent = game.get_player2_name() if playername == game.get_player1_name() else game.get_player1_name()
+    own_index = 0 if game.get_player_color(playername) == "W" else 1
+    marble_count = game.get_marble_count()
+    score = MATERIAL_WEIGHT * (marble_count[own_index] - marble_count[1 - own_index])
+    score += RED_CAPTURE_WEIGHT * (game.get_captured(playername) - game.get_captured(opponent))
+    edge_exposed = features["edge_exposed"]
+    score -= EDGE_EXPOSURE_WEIGHT * (edge_exposed[own_index] - edge_exposed[1 - own_index])
+    for feature, weight in FEATURE_WEIGHTS.items():
+        sign = -1 if feature == "threatened" else 1
+        score += sign * weight * (features[feature][own_index] - features[feature][1 - own_index])
+    return score
+
+
+def check_and_time(games=20, max_moves=200, seed=0):
+    """
+    Plays random games with apply_move and undo_move on a check_features KubaFeatureGame, so every update is
+    checked, then times the incremental features against compute_features over the positions of the games.
+    """
+    start = time.perf_counter()
+    load_line_features()
+    print("line features ready in %.2f s" % (time.perf_counter() - start))
+    rng = random.Random(seed)
+    positions = 0
+    for _ in range(games):
+        game = KubaFeatureGame(("playerA", "W"), ("playerB", "B"), quiet=True, check_features=True)
+        playername = rng.choice(("playerA", "playerB"))
+        for _ in range(max_moves):
+            moves = game.legal_moves(playername)
+            if not moves or game.get_winner() is not None:
+                break
+            if rng.random() < 0.2:  # try a move and take it back, as a search does
+                game.undo_move(game.apply_move(playername, *rng.choice(moves)))
+            game.apply_move(playername, *rng.choice(moves))
+            playername = game.get_current_turn()
+            positions += 1
+    print("incremental features checked after %d moves and undos" % positions)
+
+    rng = random.Random(seed)
+    incremental_seconds = scratch_seconds = 0.0
+    evaluations = 0
+    for _ in range(games):
+        game = KubaFeatureGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+        list_game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+        playername = rng.choice(("playerA", "playerB"))
+        for _ in range(max_moves):
+            moves = game.legal_moves(playername)
+            if not moves or game.get_winner() is not None:
+                break
+            move = rng.choice(moves)
+            start = time.perf_counter()
+            game.apply_move(playername, *move)  # the features are updated inside the move
+            game.get_features()
+            incremental_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            list_game.apply_move(playername, *move)
+            compute_features(list_game)
+            scratch_seconds += time.perf_counter() - start
+            playername = game.get_current_turn()
+            evaluations += 1
+    print("apply_move + features: %.1f us incremental, %.1f us from scratch on KubaGame" % (
+        incremental_seconds / evaluations * 1e6, scratch_seconds / evaluations * 1e6))
+
+
+if __name__ == '__main__':
+    check_and_time()
@@ -8,6 +8,80 @@
 #       An example video can be found here: https://www.youtube.com/watch?v=XglqkfzsXYc
 
 import copy  # imported to create deep copy of boards (lists) to check past board states
+import random  # imported to generate the Zobrist hash keys
+import time  # imported to rate limit rendered boards
+
+# Zobrist hash keys, one random 64 bit key per marble color per board space, plus one per color to move. The
+# generator is seeded with a constant so the keys, and so every position hash, are the same in every process.
+_zobrist_random = random.Random(6092021)
+ZOBRIST_SPACE_KEYS = {color: [[_zobrist_random.getrandbits(64) for col in range(7)] for row in range(7)]
+                      for color in ("W", "B", "R")}
+ZOBRIST_TURN_KEYS = {"W": _zobrist_random.getrandbits(64), "B": _zobrist_random.getrandbits(64)}
+MARBLE_COUNT_INDEX = {"W": 0, "B": 1, "R": 2}  # index of each color in get_marble_count
+
+# Reasons returned by get_move_rejection for a move make_move would reject
+INVALID_MOVE = "invalid move"  # unknown playername or direction, or coordinates that are not on the board
+GAME_OVER = "game over"  # the game already has a winner
+WRONG_TURN = "wrong turn"
+WRONG_COLOR = "wrong color"  # the 'current piece' space does not hold the player's marble
+BLOCKED_PROCEEDING_SPACE = "blocked proceeding space"  # space "before" the piece is taken, or an outward edge push
+SELF_EJECTION = "self-ejection"  # the push would push the player's own marble off the board
+REPETITION = "repetition"  # the push would recreate the past board, or with superko any earlier board
+
+
+class MoveRecord:
+    """
+    Small undo record returned by KubaGame.apply_move. Holds the spaces the push changed with their contents
+    before and after, the ejected marble, the captured red delta, the turn and winner before the move, and what
+    is needed to restore the past board when the record of the move before it is not known.
+    """
+    __slots__ = ("playername", "coordinates", "direction", "shifted_spaces", "before", "after", "ejected_marble",
+                 "captured_delta", "turn_before", "winner_before", "past_board_before", "hashes_before")
+
+    def __init__(self, playername, coordinates, direction, shifted_spaces, before, after, ejected_marble,
+                 captured_delta, turn_before, winner_before, past_board_before, hashes_before):
+        self.playername = playername
+        self.coordinates = coordinates
+        self.direction = direction
+        self.shifted_spaces = shifted_spaces  # (row, col) spaces from the 'current piece' along the push
+        self.before = before  # space contents before the push, in shifted_spaces order
+        self.after = after  # space contents after the push, in shifted_spaces order
+        self.ejected_marble = ejected_marble  # W/B/R pushed off the board, or None
+        self.captured_delta = captured_delta  # 1 if the mover captured a red, otherwise 0
+        self.turn_before = turn_before
+        self.winner_before = winner_before
+        self.past_board_before = past_board_before  # past board replaced when there was no record of the last move
+        self.hashes_before = hashes_before  # (board hash, past board hash) before the move
+
+
+class RateLimitedRenderer:
+    """
+    Renderer for streaming spectator views. Called with each rendered board string, it passes at most one
+    board every min_interval seconds on to write. A board arriving sooner is held, replacing any board already
+    held, and is written by the first call after the interval has passed or by flush.
+    """
+    def __init__(self, write, min_interval):
+        self._write = write  # callable that receives each board string, like a socket or file write
+        self._min_interval = min_interval
+        self._last_write_time = None
+        self._held_board_string = None
+
+    def __call__(self, board_string):
+        now = time.monotonic()
+        if self._last_write_time is None or now - self._last_write_time >= self._min_interval:
+            self._write(board_string)
+            self._last_write_time = now
+            self._held_board_string = None
+        else:
+            self._held_board_string = board_string  # only the newest board is kept for spectators
+
+    def flush(self):
+        """Writes the held board, if any, for example when the game ends"""
+        if self._held_board_string is not None:
+            self._write(self._held_board_string)
+            self._last_write_time = time.monotonic()
+            self._held_board_string = None
+
 
 class KubaGame:
     """
@@ -15,8 +89,21 @@ class KubaGame:
     each with a player name and B/W for game piece color. All variables are private and have
     appropriate getters and setter methods as needed. All methods for a game of Kuba are included
     within this class.
+    With superko True, a move may not return the board to any board state from earlier in the game,
+    checked in a set of the Zobrist hashes of every board state, instead of only the board before the last move.
+    With quiet True, make_move does not render the board at all. Otherwise each board is built as one string
+    and printed with a single write, or passed to renderer, a callable that receives the board string.
+    With check_counters True, the running marble counters are checked against a full board scan after every
+    applied or undone move, for debugging and tests. recorder, when passed, is a callable that receives the
+    (playername, coordinates, direction) of every move make_move accepts, like KubaRecord's GameRecorder.
+    instrumentation, when passed, is a KubaInstrument MoveInstrumentation that make_move hands every move to
+    so each stage is timed, otherwise the class wide default set by set_default_instrumentation is used.
+    fork returns a child game for what-if lines that shares the boards with this game until either one moves.
    """
-    def __init__(self, player1, player2):
+    _default_instrumentation = None  # instrumentation of new games, set by KubaInstrument.profile_games
+
+    def __init__(self, player1, player2, superko=False, quiet=False, renderer=None, check_counters=False,
+                 recorder=None, instrumentation=None):
         self._player1_name = player1[0]  # Paring the user name and color from each tuple
         self._player1_color = player1[1]
         self._player2_name = player2[0]
@@ -33,6 +120,30 @@ class KubaGame:
                        ["B", "B", " ", " ", " ", "W", "W"]]  # the main, current working board
         self._current_turn = None  # Because either player can start the game initializes to "None"
         self._winner = None  # No winner set at the beginning of game
+        self._row_occupancy = [0] * 7  # bit col of row_occupancy[row] is set when the space is not empty
+        self._col_occupancy = [0] * 7  # bit row of col_occupancy[col] is set when the space is not empty
+        self._move_records = []  # MoveRecords applied since the boards were replaced, make_move keeps the last
+        self.rebuild_occupancy()
+        self._superko = superko
+        self._board_hash = self.compute_board_hash(self._starting_board)  # Zobrist hash of the current board
+        self._past_board_hash = self.compute_board_hash(self._past_board)
+        self._position_history = None  # board hash -> times seen this game, only kept for superko
+        self.reset_position_history()
+        self._quiet = quiet  # no rendering after moves, for servers and batch simulations
+        self._renderer = renderer  # None prints to stdout
+        self._marble_counts = [8, 8, 13]  # running W/B/R counts of the starting board, updated on ejections
+        self._check_counters = check_counters
+        self._recorder = recorder  # None records nothing
+        if instrumentation is None:
+            instrumentation = self._default_instrumentation
+        self._instrumentation = instrumentation  # None times nothing, make_move then pays one attribute check
+        self._shared_state = False  # set by fork, the shared boards and counters are copied before the next change
+
+    def __getstate__(self):
+        """Pickles and deep copies own every board, so the copy never needs to copy the shared state"""
+        state = self.__dict__.copy()
+        state["_shared_state"] = False
+        return state
 
     def get_player1_name(self):
         """Returns private player 1 name variable"""
@@ -68,20 +179,31 @@ class KubaGame:
             return self.get_player2_name()
 
     def get_current_board(self):
-        """Getter method for private variable starting_board"""
-        return self._starting_board  # starting board is the main board, used in shallow/deep copies throughout
+        """
+        Getter method for private variable starting_board. Moves change the board in place, so a copy is
+        returned, like KubaBitboardGame's, that later moves do not change.
+        """
+        return [row[:] for row in self._starting_board]
 
     def replace_current_board(self, replacement_board):
-        """'Setter' method to replace the current 'starting' board with a passed board list"""
-        self._starting_board = replacement_board
+        """'Setter' method to replace the current 'starting' board with a copy of a passed board list"""
+        self._starting_board = [row[:] for row in replacement_board]  # moves change it in place, not the caller's
+        self._move_records = []  # the passed board may differ from the past board anywhere
+        self.rebuild_occupancy()
+        self._board_hash = self.compute_board_hash(replacement_board)
+        self.reset_position_history()
+        self._marble_counts = list(self.count_marbles_on_board())
 
     def get_past_board(self):
-        """Getter method for private variable past_board"""
-        return self._past_board
+        """Getter method for private variable past_board, a copy that later moves do not change"""
+        return [row[:] for row in self._past_board]
 
     def replace_past_board(self, replacement_board):
-        """'Setter' method to replace the past board with a passed board list"""
-        self._past_board = replacement_board
+        """'Setter' method to replace the past board with a copy of a passed board list"""
+        self._past_board = [row[:] for row in replacement_board]
+        self._move_records = []  # the passed board may differ from the current board anywhere
+        self._past_board_hash = self.compute_board_hash(replacement_board)
+        self.reset_position_history()
 
     def get_captured(self, playername):
         """Getter method for private variable 'red_captured' for the passed playername"""
@@ -119,18 +241,22 @@ class KubaGame:
         """Returns the contents of a given board space, either B/W/R for a marble, or X for empty space"""
         row = coordinates[0]
         col = coordinates[1]
-        temp_board = self.get_current_board()  # shallow copy of current board
+        temp_board = self._starting_board  # the current board itself, not a copy
         if temp_board[row][col] == " ":
             return "X"  # returns "X" for a board space that is empty
         else:
             return temp_board[row][col]  # Otherwise returns the marble color in the space
 
     def get_marble_count(self):
-        """Returns a tuple with the count of the marbles still on the board, in W/B/R order"""
+        """Returns a tuple with the count of the marbles still on the board, in W/B/R order, from the counters"""
+        return tuple(self._marble_counts)
+
+    def count_marbles_on_board(self):
+        """Scans every board space and returns a tuple with the count of the marbles on the board, in W/B/R order"""
         white_count = 0
         black_count = 0
         red_count = 0
-        temp_board = self.get_current_board()  # shallow copy of current board
+        temp_board = self._starting_board  # the current board itself, not a copy
         for row in temp_board:  # iterates through rows in the board list
             for space in row:  # iterates through spaces in the current board list row
                 if "W" in space:
@@ -142,16 +268,68 @@ class KubaGame:
         marble_count = [white_count, black_count, red_count]
         return tuple(marble_count)
 
-    def print_board(self, board_to_print):
-        """Prints out a visual representation of the passing board list"""
+    def get_marble_spaces(self, color):
+        """Returns a list of the (row, col) coordinates of every marble of the passed W/B/R color, row by row"""
+        temp_board = self._starting_board  # the current board itself, not a copy
+        return [(row_index, col_index) for row_index in range(7) for col_index in range(7)
+                if temp_board[row_index][col_index] == color]
+
+    def is_quiet(self):
+        """Returns True if make_move does not render the board"""
+        return self._quiet
+
+    def set_quiet(self, quiet):
+        """'Setter' method to turn rendering after each move off (True) or back on (False)"""
+        self._quiet = quiet
+
+    def set_renderer(self, renderer):
+        """'Setter' method for the callable that receives each rendered board string, None prints to stdout"""
+        self._renderer = renderer
+
+    def get_recorder(self):
+        """Getter method for the callable that receives each accepted move, or None"""
+        return self._recorder
+
+    def set_recorder(self, recorder):
+        """'Setter' method for the callable that receives each accepted move, None records nothing"""
+        self._recorder = recorder
+
+    def get_instrumentation(self):
+        """Getter method for the instrumentation make_move hands moves to, or None"""
+        return self._instrumentation
+
+    def set_instrumentation(self, instrumentation):
+        """'Setter' method for the instrumentation make_move hands moves to, None turns instrumentation off"""
+        self._instrumentation = instrumentation
+
+    @classmethod
+    def get_default_instrumentation(cls):
+        """Getter method for the instrumentation games created from now on start with"""
+        return cls._default_instrumentation
+
+    @classmethod
+    def set_default_instrumentation(cls, instrumentation):
+        """'Setter' method for the instrumentation games created from now on start with, None for none"""
+        cls._default_instrumentation = instrumentation
+
+    def format_board(self, board_to_print):
+        """Returns the visual representation of the passing board list as one string"""
+        divider = "–––––––––––––––––––––––––––––\n"
+        rows = []
         for row in board_to_print:
-            print("–––––––––––––––––––––––––––––")
-            for space in row:
-                print("|", space, end="")
-                print(end=" ")
-            print("|", end="")
-            print("\r")
-        print("–––––––––––––––––––––––––––––", end="\n")
+            rows.append(divider + "".join(["| " + space + " " for space in row]) + "|\r\n")
+        return "".join(rows) + divider
+
+    def print_board(self, board_to_print):
+        """
+        Prints out a visual representation of the passing board list, built by format_board and written
+        with a single print, or passes the string to the renderer of this game.
+        """
+        board_string = self.format_board(board_to_print)
+        if self._renderer is None:
+            print(board_string, end="")
+        else:
+            self._renderer(board_string)
 
     def find_index_of_EOL_of_contig_pieces(self, coordinates, direction):
         """
@@ -162,7 +340,7 @@ class KubaGame:
         piece will be moved, including the 'current piece' and 'end of line' piece, which will be the same piece
         if only a single piece is being moved.
         """
-        temp_board = self.get_current_board()  # shallow copy of current board
+        temp_board = self._starting_board  # the current board itself, not a copy
         current_space_row_index = coordinates[0]
         current_space_col_index = coordinates[1]
 
@@ -196,7 +374,7 @@ class KubaGame:
         four allowed directions, and that the intergers in the coordinates are [0-6].
         """
         if playername == self.get_player_name(playername):
-            if direction == "R" or "L" or "F" or "B":
+            if direction in ("R", "L", "F", "B"):
                 if 0 <= coordinates[0] <= 6:  # checking row integer
                     if 0 <= coordinates[1] <= 6:  # checking col integer
                         return True
@@ -208,7 +386,7 @@ class KubaGame:
         Basic validation that the 'current piece' which is the piece "pushing" in the direction of the move,
         matches the color of the current player.
         """
-        temp_board = self.get_current_board()  # shallow copy of current board
+        temp_board = self._starting_board  # the current board itself, not a copy
         current_space_row_index = coordinates[0]
         current_space_col_index = coordinates[1]
 
@@ -222,7 +400,7 @@ class KubaGame:
         Checks that the space "before" the 'current piece', which is the piece "pushing" in the direction of the move,
         is either an empty space or is the edge of the board, otherwise returns false.
         """
-        temp_board = self.get_current_board()  # shallow copy of current board
+        temp_board = self._starting_board  # the current board itself, not a copy
         current_space_row_index = coordinates[0]
         current_space_col_index = coordinates[1]
 
@@ -260,7 +438,7 @@ class KubaGame:
         from the 'current piece' is NOT the same color as the current player, otherwise it is an invalid move
         ("False") in the rules of the game to push your own piece off the board.
         """
-        temp_board = self.get_current_board()  # shallow copy of current board
+        temp_board = self._starting_board  # the current board itself, not a copy
         current_space_row_index = coordinates[0]
         current_space_col_index = coordinates[1]
 
@@ -281,23 +459,87 @@ class KubaGame:
                 else:
                     return True
             elif direction == "F" or direction == "B":
-                if temp_board[end_of_line_of_contig_pieces_index][current_space_row_index] == self.get_player_color(
+                if temp_board[end_of_line_of_contig_pieces_index][current_space_col_index] == self.get_player_color(
                         playername) and (current_space_row_index != end_of_line_of_contig_pieces_index):
                     return False  # if the color at the "end of the line" on the edge of the board matches can't move
                 else:
                     return True
 
+    def get_move_rejection(self, playername, coordinates, direction):
+        """
+        Returns why make_move would reject the passed move, one of the rejection reasons at the top of this
+        file, or None if make_move would accept it. The rules are checked in the same order as make_move but the
+        game is not changed, and malformed moves from untrusted input are rejected as INVALID_MOVE.
+        """
+        if playername != self.get_player1_name() and playername != self.get_player2_name():
+            return INVALID_MOVE
+        if direction not in ("L", "R", "F", "B"):
+            return INVALID_MOVE
+        try:
+            row_index, col_index = coordinates
+        except (TypeError, ValueError):
+            return INVALID_MOVE
+        if type(row_index) is not int or type(col_index) is not int:
+            return INVALID_MOVE
+        if not (0 <= row_index <= 6 and 0 <= col_index <= 6):
+            return INVALID_MOVE
+        coordinates = (row_index, col_index)
+        if self.get_winner() is not None:
+            return GAME_OVER
+        if self.get_current_turn() is not None and self.get_current_turn() != playername:
+            return WRONG_TURN
+        if not self.check_piece_matches_player(playername, coordinates):
+            return WRONG_COLOR
+        if not self.check_proceeding_space(coordinates, direction):
+            return BLOCKED_PROCEEDING_SPACE
+        if not self.check_end_of_line_of_contig_pieces(playername, coordinates, direction):
+            return SELF_EJECTION
+        end_of_line_index, ejected = self.get_pushed_line(coordinates, direction)
+        if self.check_push_repeats_past_board(coordinates, direction, end_of_line_index, ejected):
+            return REPETITION
+        return None
+
     def check_and_record_captured_red(self, playername, coordinates_of_captured_piece):
         """
         Called by other methods to check whether the piece just moved off the board is R,
         if it is it updates the player 'captured_red' variable through setter method.
         """
-        temp_board = self.get_current_board()  # shallow copy of current board
+        temp_board = self._starting_board  # the current board itself, not a copy
         if temp_board[coordinates_of_captured_piece[0]][coordinates_of_captured_piece[1]] == "R":
             self.update_captured(playername)
         else:
             pass
 
+    def record_ejected_marble(self, playername, ejected_marble):
+        """
+        Called when a push ejects a marble (W/B/R, or None if none was ejected) to update the running marble
+        counters and the player's captured reds. Returns the captured red delta for the MoveRecord.
+        """
+        if ejected_marble is None:
+            return 0
+        self._marble_counts[MARBLE_COUNT_INDEX[ejected_marble]] -= 1
+        if ejected_marble == "R":
+            self.update_captured(playername)
+            return 1
+        return 0
+
+    def take_back_ejected_marble(self, record):
+        """Called when a move is undone to put its ejected marble back in the counters and captured reds"""
+        if record.ejected_marble is not None:
+            self._marble_counts[MARBLE_COUNT_INDEX[record.ejected_marble]] += 1
+        if record.captured_delta:
+            if record.playername == self.get_player1_name():
+                self._player1_red_captured -= record.captured_delta
+            elif record.playername == self.get_player2_name():
+                self._player2_red_captured -= record.captured_delta
+
+    def check_marble_counts(self):
+        """Debug self check, raises AssertionError if the running marble counters differ from a full board scan"""
+        scanned_count = self.count_marbles_on_board()
+        if tuple(self._marble_counts) != scanned_count:
+            raise AssertionError("marble counters %s differ from board scan %s"
+                                 % (tuple(self._marble_counts), scanned_count))
+
     def winner_check(self, playername):
         """
         Called after a move is recorded to see if the current player has won, either by 1) capturing all red
@@ -319,10 +561,11 @@ class KubaGame:
         """
         Calls to find the "end of line" index, then starting at the end of line, copies each piece over one space
         along the line of movement, then replaces the original piece/space with empty. Writes changes to a deep copy
-        of the current board, which is then passed back to make_move to be checked. All moves all valid because
-        the conditions have been checked by other methods.
+        of the current board, which is then passed back to be checked. All moves all valid because
+        the conditions have been checked by other methods. make_move uses apply_move instead, which moves the
+        pieces in place.
         """
-        temp_board = copy.deepcopy(self.get_current_board())  # deep copy of current board
+        temp_board = copy.deepcopy(self._starting_board)  # deep copy of current board
         current_space_row_index = coordinates[0]
         current_space_col_index = coordinates[1]
 
@@ -413,15 +656,386 @@ class KubaGame:
                 temp_board[current_space_row_index][current_space_col_index] = " "
         return temp_board  # returns deep copy of the post_move board to make_move
 
+    def rebuild_occupancy(self):
+        """Rebuilds the row and col occupancy bit masks from every space of the current board"""
+        temp_board = self._starting_board  # the current board itself, not a copy
+        self._row_occupancy = [0] * 7
+        self._col_occupancy = [0] * 7
+        for row_index in range(7):
+            for col_index in range(7):
+                if temp_board[row_index][col_index] != " ":
+                    self._row_occupancy[row_index] |= 1 << col_index
+                    self._col_occupancy[col_index] |= 1 << row_index
+
+    def update_line_occupancy(self, coordinates, direction):
+        """
+        Called after a push to update the row and col occupancy bit masks. A push only changes the spaces of
+        the row (R or L) or col (F or B) it was made along, so only those 7 spaces are rechecked.
+        """
+        temp_board = self._starting_board  # the current board itself, not a copy
+        row_index = coordinates[0]
+        col_index = coordinates[1]
+        if direction == "R" or direction == "L":
+            self._row_occupancy[row_index] = 0
+            for col in range(7):
+                if temp_board[row_index][col] != " ":
+                    self._row_occupancy[row_index] |= 1 << col
+                    self._col_occupancy[col] |= 1 << row_index
+                else:
+                    self._col_occupancy[col] &= ~(1 << row_index)
+        elif direction == "F" or direction == "B":
+            self._col_occupancy[col_index] = 0
+            for row in range(7):
+                if temp_board[row][col_index] != " ":
+                    self._col_occupancy[col_index] |= 1 << row
+                    self._row_occupancy[row] |= 1 << col_index
+                else:
+                    self._row_occupancy[row] &= ~(1 << col_index)
+
+    def get_pushed_line(self, coordinates, direction):
+        """
+        Uses the row or col occupancy bit mask to check a push without walking the board. Returns None if the
+        move breaks the proceeding space rule, otherwise a tuple of the index of the 'end of line' piece along
+        the line and whether that piece is pushed off the edge of the board.
+        """
+        row_index = coordinates[0]
+        col_index = coordinates[1]
+        if direction == "R" or direction == "L":
+            line_occupancy = self._row_occupancy[row_index]
+            current_index = col_index
+        else:
+            line_occupancy = self._col_occupancy[col_index]
+            current_index = row_index
+        change_amount = -1 if direction == "L" or direction == "F" else 1
+
+        if not 0 <= current_index + change_amount <= 6:
+            return None  # single pieces on the edge can't be pushed "outward"
+        proceeding_space_index = current_index - change_amount
+        if 0 <= proceeding_space_index <= 6 and line_occupancy & (1 << proceeding_space_index):
+            return None  # space "before" the current piece is not empty
+
+        if change_amount == 1:
+            empty_spaces_ahead = ~line_occupancy & 0b1111111 & ~((1 << (current_index + 1)) - 1)
+            if empty_spaces_ahead:
+                return ((empty_spaces_ahead & -empty_spaces_ahead).bit_length() - 2, False)
+            return (6, True)
+        empty_spaces_ahead = ~line_occupancy & ((1 << current_index) - 1)
+        if empty_spaces_ahead:
+            return (empty_spaces_ahead.bit_length(), False)
+        return (0, True)
+
+    def get_last_move_record(self):
+        """Returns the MoveRecord of the last move, or None if there is none since the boards were replaced"""
+        if self._move_records:
+            return self._move_records[-1]
+        return None
+
+    def get_move_line(self, coordinates, direction):
+        """Returns ("row", row) for R/L moves or ("col", col) for F/B moves, the only line a push changes"""
+        if direction == "R" or direction == "L":
+            return ("row", coordinates[0])
+        return ("col", coordinates[1])
+
+    def get_shifted_spaces(self, coordinates, direction, end_of_line_index, ejected):
+        """
+        Returns the list of (row, col) spaces a push changes, from the 'current piece' up to the empty space the
+        line moves into, or up to the edge space when the 'end of line' piece is pushed off the board.
+        """
+        row_index = coordinates[0]
+        col_index = coordinates[1]
+        change_amount = -1 if direction == "L" or direction == "F" else 1
+        last_index = end_of_line_index if ejected else end_of_line_index + change_amount
+        if direction == "R" or direction == "L":
+            return [(row_index, col) for col in range(col_index, last_index + change_amount, change_amount)]
+        return [(row, col_index) for row in range(row_index, last_index + change_amount, change_amount)]
+
+    def compute_board_hash(self, board):
+        """Returns the Zobrist hash of every marble on the passed board list, used when a board is replaced"""
+        board_hash = 0
+        for row_index in range(7):
+            for col_index in range(7):
+                space = board[row_index][col_index]
+                if space != " ":
+                    board_hash ^= ZOBRIST_SPACE_KEYS[space][row_index][col_index]
+        return board_hash
+
+    def get_hash_delta(self, shifted_spaces, before, after):
+        """Returns the value to XOR into the board hash for a push changing shifted_spaces from before to after"""
+        hash_delta = 0
+        for (row, col), space_before, space_after in zip(shifted_spaces, before, after):
+            if space_before != space_after:
+                if space_before != " ":
+                    hash_delta ^= ZOBRIST_SPACE_KEYS[space_before][row][col]
+                if space_after != " ":
+                    hash_delta ^= ZOBRIST_SPACE_KEYS[space_after][row][col]
+        return hash_delta
+
+    def get_board_hash(self):
+        """Getter method for the Zobrist hash of the current board, marbles only"""
+        return self._board_hash
+
+    def get_past_board_hash(self):
+        """Getter method for the Zobrist hash of the past board, marbles only"""
+        return self._past_board_hash
+
+    def get_position_hash(self):
+        """
+        Returns the Zobrist hash of the current position, the marbles plus the color to move. The keys are the
+        same in every process, so it can be used as a key for caches and transposition tables.
+        """
+        current_turn = self.get_current_turn()
+        if current_turn is None:
+            return self._board_hash
+        return self._board_hash ^ ZOBRIST_TURN_KEYS.get(self.get_player_color(current_turn), 0)
+
+    def is_superko(self):
+        """Returns True if moves may not repeat any board state from earlier in the game"""
+        return self._superko
+
+    def reset_position_history(self):
+        """Starts the superko board state history over from the past and current boards"""
+        if self._superko:
+            self._position_history = {self._past_board_hash: 1}
+            self._position_history[self._board_hash] = self._position_history.get(self._board_hash, 0) + 1
+
+    def update_position_hashes(self, hash_delta):
+        """
+        Called when a move is applied. The current board hash becomes the past board hash, the hash delta of the
+        push is XORed into the current board hash, and the new board state is added to the superko history.
+        Returns the (board hash, past board hash) from before, which restore_position_hashes takes back.
+        """
+        hashes_before = (self._board_hash, self._past_board_hash)
+        self._past_board_hash = self._board_hash
+        self._board_hash ^= hash_delta
+        if self._superko:
+            self._position_history[self._board_hash] = self._position_history.get(self._board_hash, 0) + 1
+        return hashes_before
+
+    def restore_position_hashes(self, hashes_before):
+        """Called when a move is taken back to remove its board state from the history and restore both hashes"""
+        if self._superko:
+            if self._position_history[self._board_hash] == 1:
+                del self._position_history[self._board_hash]
+            else:
+                self._position_history[self._board_hash] -= 1
+        self._board_hash, self._past_board_hash = hashes_before
+
+    def check_push_repeats_past_board(self, coordinates, direction, end_of_line_index, ejected):
+        """
+        Checks whether a push would return the board to the past board state, or with superko to any board
+        state from earlier in the game, without building the post move board. The board hash after the push
+        is found from the few spaces the push changes. With superko that hash is looked up in the history. If
+        it matches the past board hash, the pushed line is compared to the past board to rule out a collision:
+        a push only changes its own line, and the current and past board only differ along the line of the
+        last move, so only a push along that same line can recreate the past board.
+        """
+        temp_board = self._starting_board  # the current board itself, not a copy
+        past_board = self._past_board  # the past board itself, not a copy
+        row_index = coordinates[0]
+        col_index = coordinates[1]
+        if direction == "R" or direction == "L":
+            current_index = col_index
+            line_spaces = [(row_index, col) for col in range(7)]
+        else:
+            current_index = row_index
+            line_spaces = [(row, col_index) for row in range(7)]
+        if ejected:
+            return False  # a marble leaving the board can never return to it
+
+        shifted_spaces = self.get_shifted_spaces(coordinates, direction, end_of_line_index, ejected)
+        before = [temp_board[row][col] for row, col in shifted_spaces]
+        post_movement_hash = self._board_hash ^ self.get_hash_delta(shifted_spaces, before, [" "] + before[:-1])
+        if self._superko:
+            return post_movement_hash in self._position_history
+        if post_movement_hash != self._past_board_hash:
+            return False
+
+        last_move_record = self.get_last_move_record()
+        if last_move_record is not None and self.get_move_line(
+                last_move_record.coordinates, last_move_record.direction) != self.get_move_line(coordinates, direction):
+            return False
+
+        change_amount = -1 if direction == "L" or direction == "F" else 1
+        post_movement_line = [temp_board[row][col] for row, col in line_spaces]
+        # starting at the end of line, copies each piece over one space, then empties the original space
+        for index in range(end_of_line_index, current_index - change_amount, -change_amount):
+            post_movement_line[index + change_amount] = post_movement_line[index]
+        post_movement_line[current_index] = " "
+        for index, (row, col) in enumerate(line_spaces):
+            if post_movement_line[index] != past_board[row][col]:
+                return False
+        if last_move_record is None:  # unknown past board, the rest of the board has to match too
+            for row in range(7):
+                for col in range(7):
+                    if (row, col) not in line_spaces and temp_board[row][col] != past_board[row][col]:
+                        return False
+        return True
+
+    def iter_legal_moves(self, playername):
+        """
+        Lazily generates every (coordinates, direction) move that make_move would accept from the passed player,
+        including the previous board state rule. Only the occupied spaces from the row occupancy masks are
+        visited, and the game is not changed.
+        """
+        if self.get_winner() is not None:
+            return
+        if playername != self.get_player_name(playername):
+            return
+        if self.get_current_turn() is not None and self.get_current_turn() != playername:
+            return
+        temp_board = self._starting_board  # the current board itself, not a copy
+        player_color = self.get_player_color(playername)
+        for row_index in range(7):
+            occupied = self._row_occupancy[row_index]
+            while occupied:
+                col_index = (occupied & -occupied).bit_length() - 1
+                occupied &= occupied - 1  # clears the lowest set bit
+                if temp_board[row_index][col_index] != player_color:
+                    continue
+                coordinates = (row_index, col_index)
+                for direction in ("L", "R", "F", "B"):
+                    pushed_line = self.get_pushed_line(coordinates, direction)
+                    if pushed_line is None:
+                        continue
+                    end_of_line_index, ejected = pushed_line
+                    if ejected:
+                        if direction == "R" or direction == "L":
+                            edge_piece = temp_board[row_index][end_of_line_index]
+                        else:
+                            edge_piece = temp_board[end_of_line_index][col_index]
+                        if edge_piece == player_color:
+                            continue  # can't push your own piece off the board
+                    if self.check_push_repeats_past_board(coordinates, direction, end_of_line_index, ejected):
+                        continue
+                    yield coordinates, direction
+
+    def legal_moves(self, playername):
+        """Returns a list of every (coordinates, direction) move that make_move would accept from the passed player"""
+        return list(self.iter_legal_moves(playername))
+
+    def trim_move_records(self):
+        """
+        Called by make_move after each move it applies. The previous board state check and get_last_move_record
+        only read the last MoveRecord, the rest of the stack is only needed by apply_move callers holding records
+        for undo_move, so games played with make_move stay the same size however many moves they last.
+        """
+        del self._move_records[:-1]
+
+    def apply_move(self, playername, coordinates, direction):
+        """
+        Makes an already validated move in place, without copying either board, and returns a MoveRecord that
+        undo_move uses to take it back. The pushed spaces are written to the current board, a captured red is
+        recorded, the past board is brought up to the board before this move by writing in the spaces the last
+        move changed, and the current turn and winner are updated the same way as make_move.
+        """
+        if self._shared_state:
+            self.unshare_state()
+        temp_board = self._starting_board  # the current board itself, changed in place
+        end_of_line_index, ejected = self.get_pushed_line(coordinates, direction)
+        shifted_spaces = self.get_shifted_spaces(coordinates, direction, end_of_line_index, ejected)
+        before = [temp_board[row][col] for row, col in shifted_spaces]
+        after = [" "] + before[:-1]  # each piece moves over one space and the 'current piece' space is emptied
+        ejected_marble = before[-1] if ejected else None
+        hashes_before = self.update_position_hashes(self.get_hash_delta(shifted_spaces, before, after))
+
+        # the past board becomes the board before this move
+        last_move_record = self.get_last_move_record()
+        past_board_before = None
+        if last_move_record is not None:
+            past_board = self._past_board
+            for (row, col), space in zip(last_move_record.shifted_spaces, last_move_record.after):
+                past_board[row][col] = space
+        else:
+            past_board_before = self._past_board
+            self._past_board = [row[:] for row in temp_board]  # unknown past board, one row by row copy
+
+        for (row, col), space in zip(shifted_spaces, after):
+            temp_board[row][col] = space
+        self.update_line_occupancy(coordinates, direction)
+        captured_delta = self.record_ejected_marble(playername, ejected_marble)
+
+        record = MoveRecord(playername, coordinates, direction, shifted_spaces, before, after, ejected_marble,
+                            captured_delta, self.get_current_turn(), self.get_winner(), past_board_before,
+                            hashes_before)
+        self._move_records.append(record)
+        self.set_current_turn(playername)
+        self.set_next_turn()  # sets turn too next player
+        self.winner_check(playername)  # checks for winner, sets if winner
+        if self._check_counters:
+            self.check_marble_counts()
+        return record
+
+    def undo_move(self, record):
+        """
+        Takes back the move of the passed MoveRecord, which must be the last move applied, restoring the
+        current and past boards, captured reds, current turn and winner in place.
+        """
+        if self._shared_state:
+            self.unshare_state()
+        temp_board = self._starting_board  # the current board itself, changed in place
+        for (row, col), space in zip(record.shifted_spaces, record.before):
+            temp_board[row][col] = space
+        self.update_line_occupancy(record.coordinates, record.direction)
+        self.take_back_ejected_marble(record)
+
+        self._move_records.pop()
+        self.restore_position_hashes(record.hashes_before)
+        if record.past_board_before is not None:
+            self._past_board = record.past_board_before
+        else:
+            last_move_record = self.get_last_move_record()  # takes back the last move's spaces on the past board
+            past_board = self._past_board
+            for (row, col), space in zip(last_move_record.shifted_spaces, last_move_record.before):
+                past_board[row][col] = space
+        self._current_turn = record.turn_before
+        self._winner = record.winner_before
+        if self._check_counters:
+            self.check_marble_counts()
+
+    def fork(self):
+        """
+        Returns a child game in the same position for what-if lines, without copying either board. The child
+        shares the boards, occupancy masks, counters and superko history with this game, and whichever of the two
+        changes first copies them, one row by row copy, so a fork that is only looked at costs no copies at all.
+        The child only keeps the record of the last move, which the previous board state check needs, so it
+        pickles in about a kilobyte even while apply_move callers hold a stack of records. It can take back its
+        own moves, not the moves made before it was forked. The child is quiet, and does not pass its moves to
+        this game's renderer, recorder or instrumentation.
+        """
+        child = object.__new__(type(self))
+        child.__dict__.update(self.__dict__)  # every attribute shared, the mutable ones until unshare_state
+        child._move_records = self._move_records[-1:]
+        child._quiet = True
+        child._renderer = None
+        child._recorder = None
+        child._instrumentation = self._default_instrumentation
+        child._shared_state = True
+        self._shared_state = True
+        return child
+
+    def unshare_state(self):
+        """Called before the first change after a fork, copies the state shared with the parent or child games"""
+        self._starting_board = [row[:] for row in self._starting_board]
+        self._past_board = [row[:] for row in self._past_board]
+        self._row_occupancy = self._row_occupancy[:]
+        self._col_occupancy = self._col_occupancy[:]
+        self._marble_counts = self._marble_counts[:]
+        if self._position_history is not None:
+            self._position_history = dict(self._position_history)
+        self._shared_state = False
+
     def make_move(self, playername, coordinates, direction):
         """
         Main method that received passed playername, coordinate of the starting piece being "pushed", and
-        the direction of the movement. Calls multiple other functions to validate the move before calling
-        move_the_pieces to actually make the moves. It then checks the "proposed" move again a deep copy save
-        of the board state before the last player's turn. If they match, the move is not valid, and the move
-        is not recorded, False is returned. Otherwise the move is recorded, the past_board is updated with the
-        appropriate deep copy, and methods are called to check for a winner and update the current turn.
+        the direction of the movement. Calls multiple other functions to validate the move, then checks that
+        the push would not return the board to the board state before the last player's turn (or with superko
+        to any earlier board state) by its hash. If it would, the move is not valid, and the move is not
+        recorded, False is returned. Otherwise apply_move makes the move in place, updating the past_board,
+        the winner and the current turn. With instrumentation set, the move is made by its make_move instead,
+        with the same checks and results, so every stage is timed.
         """
+        if self._instrumentation is not None:
+            return self._instrumentation.make_move(self, playername, coordinates, direction)
         if self.check_valid_player_name_direction_coordinates(playername, coordinates, direction):
             if self.get_winner() is None:
                 if self.get_current_turn() is None:  # for the inital move of the game as either player can start
@@ -430,17 +1044,18 @@ class KubaGame:
                     if self.check_piece_matches_player(playername, coordinates):  # checks piece is player's
                         if self.check_proceeding_space(coordinates, direction):  # checks for edge/space "before" piece
                             if self.check_end_of_line_of_contig_pieces(playername, coordinates, direction):
-                                # move is validates at this point, so move_the_pieces is called
-                                post_movement_board = self.move_the_pieces(playername, coordinates, direction)
-                                past_board = self.get_past_board()  # shallow copy of past board for checking
-                                if post_movement_board == past_board:  # previous board state check
+                                # move is validates at this point, so the pushed line is found
+                                end_of_line_index, ejected = self.get_pushed_line(coordinates, direction)
+                                if self.check_push_repeats_past_board(coordinates, direction, end_of_line_index,
+                                                                      ejected):  # previous board state check
                                     return False
                                 else:
-                                    self.replace_past_board(copy.deepcopy(self.get_current_board()))  # deepcopy 2 past
-                                    self.replace_current_board(copy.deepcopy(post_movement_board))  # deepcopy 2 current
-                                    self.set_next_turn()  # sets turn too next player
-                                    self.winner_check(playername)  # checks for winner, sets if winner
-                                    self.print_board(post_movement_board)
+                                    self.apply_move(playername, coordinates, direction)  # no board copies
+                                    self.trim_move_records()
+                                    if self._recorder is not None:
+                                        self._recorder(playername, coordinates, direction)
+                                    if not self._quiet:
+                                        self.print_board(self._starting_board)
                                     return True
                         return False
                     return False
@@ -0,0 +1,290 @@
+# Date: 10-18-2026
+# Description: This file contains the opt-in instrumentation for the make_move pipeline. A MoveInstrumentation set
+#       on a game (KubaGame(..., instrumentation=...), set_instrumentation, or profile_games for every game made
+#       in a block) makes each move with the same checks and results as make_move, timing every stage:
+#
+#           validation     player, coordinates, winner, turn, 'current piece' color and proceeding space checks
+#           end_of_line    check_end_of_line_of_contig_pieces, which walks the line with
+#                          find_index_of_EOL_of_contig_pieces
+#           pushed_line    get_pushed_line
+#           repetition     check_push_repeats_past_board, the previous board state compare
+#           apply_move     the push, captured reds, turn and winner_check
+#           recorder       the game's recorder, when set
+#           render         print_board, when the game is not quiet
+#
+#       and counting accepted moves and rejections by get_move_rejection reason. Timings and counts go to sinks,
+#       HistogramSink keeps them in memory and PrometheusTextSink also writes them to a Prometheus text file.
+#       Without instrumentation make_move only pays one attribute check.
+#       Example:
+#           with profile_games(sinks=[PrometheusTextSink("kuba.prom")]) as instrumentation:
+#               ... play games ...
+#           print(instrumentation.get_sinks()[0].format_summary())
+
+import bisect
+import contextlib
+import os
+import time
+
+from KubaGame import (KubaGame, INVALID_MOVE, GAME_OVER, WRONG_TURN, WRONG_COLOR, BLOCKED_PROCEEDING_SPACE,
+                      SELF_EJECTION, REPETITION)
+
+STAGES = ("validation", "end_of_line", "pushed_line", "repetition", "apply_move", "recorder", "render")
+REJECTION_REASONS = (INVALID_MOVE, GAME_OVER, WRONG_TURN, WRONG_COLOR, BLOCKED_PROCEEDING_SPACE, SELF_EJECTION,
+                     REPETITION)
+DEFAULT_BUCKETS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 1e-2, 1e-1)  # upper bounds, seconds
+
+
+class HistogramSink:
+    """
+    In-memory sink, one histogram of stage times per stage with buckets upper bounds in seconds (the last
+    bucket counts everything slower), plus the count of accepted moves and of rejections by reason.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._bucket_counts = {stage: [0] * (len(self._buckets) + 1) for stage in STAGES}
+        self._stage_sums = {stage: 0.0 for stage in STAGES}
+        self._accepted = 0
+        self._rejections = {reason: 0 for reason in REJECTION_REASONS}
+
+    def get_buckets(self):
+        """Getter method for the bucket upper bounds in seconds"""
+        return self._buckets
+
+    def get_bucket_counts(self, stage):
+        """Returns the per bucket (not cumulative) counts of the stage, the last one for slower than every bound"""
+        return list(self._bucket_counts[stage])
+
+    def get_stage_count(self, stage):
+        """Returns the times the stage was timed"""
+        return sum(self._bucket_counts[stage])
+
+    def get_stage_sum(self, stage):
+        """Returns the total seconds spent in the stage"""
+        return self._stage_sums[stage]
+
+    def get_accepted(self):
+        """Getter method for the count of accepted moves"""
+        return self._accepted
+
+    def get_rejections(self):
+        """Returns {reason: count} of rejected moves"""
+        return dict(self._rejections)
+
+    def observe(self, stage, seconds):
+        """Adds one timing of the stage"""
+        self._bucket_counts[stage][bisect.bisect_left(self._buckets, seconds)] += 1
+        self._stage_sums[stage] += seconds
+
+    def count_move(self, reason):
+        """Counts one move, accepted when reason is None, otherwise rejected for reason"""
+        if reason is None:
+            self._accepted += 1
+        else:
+            self._rejections[reason] += 1
+
+    def get_quantile(self, stage, quantile):
+        """
+        Returns the upper bound of the bucket holding the quantile (0 to 1) of the stage's timings, infinity if
+        it is in the last bucket, None if the stage was never timed.
+        """
+        counts = self._bucket_counts[stage]
+        total = sum(counts)
+        if total == 0:
+            return None
+        running = 0
+        for bucket_index, count in enumerate(counts):
+            running += count
+            if running >= quantile * total:
+                return self._buckets[bucket_index] if bucket_index < len(self._buckets) else float("inf")
+
+    def format_summary(self):
+        """Returns a printable table of each timed stage and the move counts"""
+        lines = ["%-12s %9s %10s %10s %10s" % ("stage", "count", "mean us", "p50 us<=", "p99 us<=")]
+        for stage in STAGES:
+            count = self.get_stage_count(stage)
+            if count:
+                lines.append("%-12s %9d %10.2f %10.1f %10.1f" % (
+                    stage, count, self._stage_sums[stage] / count * 1e6, self.get_quantile(stage, 0.5) * 1e6,
+                    self.get_quantile(stage, 0.99) * 1e6))
+        lines.append("accepted moves: %d" % self._accepted)
+        for reason, count in self._rejections.items():
+            if count:
+                lines.append("rejected, %s: %d" % (reason, count))
+        return "\n".join(lines)
+
+    def flush(self):
+        """Nothing to write for the in-memory sink"""
+        pass
+
+
+class PrometheusTextSink(HistogramSink):
+    """
+    HistogramSink that flush writes to path in the Prometheus text exposition format, for the node exporter
+    textfile collector. The file is replaced atomically so a scrape never reads half a file.
+    """
+    def __init__(self, path, buckets=DEFAULT_BUCKETS):
+        super().__init__(buckets)
+        self._path = path
+
+    def format_text(self):
+        """Returns the metrics in the Prometheus text exposition format"""
+        lines = ["# HELP kuba_move_stage_seconds Time spent in each make_move stage.",
+                 "# TYPE kuba_move_stage_seconds histogram"]
+        for stage in STAGES:
+            running = 0
+            for bound, count in zip(self._buckets + (float("inf"),), self._bucket_counts[stage]):
+                running += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append('kuba_move_stage_seconds_bucket{stage="%s",le="%s"} %d' % (stage, le, running))
+            lines.append('kuba_move_stage_seconds_sum{stage="%s"} %r' % (stage, self._stage_sums[stage]))
+            lines.append('kuba_move_stage_seconds_count{stage="%s"} %d' % (stage, running))
+        lines += ["# HELP kuba_moves_accepted_total Moves make_move accepted.",
+                  "# TYPE kuba_moves_accepted_total counter",
+                  "kuba_moves_accepted_total %d" % self._accepted,
+                  "# HELP kuba_moves_rejected_total Moves make_move rejected, by reason.",
+                  "# TYPE kuba_moves_rejected_total counter"]
+        for reason, count in self._rejections.items():
+            lines.append('kuba_moves_rejected_total{reason="%s"} %d' % (reason, count))
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Writes the metrics file"""
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "w") as metrics_file:
+            metrics_file.write(self.format_text())
+        os.replace(temp_path, self._path)
+
+
+class MoveInstrumentation:
+    """
+    Makes moves for the games it is set on, with the same checks, order and results as make_move, and passes
+    the time of each stage and the accepted or rejection reason of each move to every sink.
+    """
+    def __init__(self, sinks=None):
+        self._sinks = list(sinks) if sinks is not None else [HistogramSink()]
+
+    def get_sinks(self):
+        """Getter method for the sinks"""
+        return self._sinks
+
+    def flush(self):
+        """Flushes every sink"""
+        for sink in self._sinks:
+            sink.flush()
+
+    def finish_move(self, timings, reason):
+        """Passes the (stage, seconds) timings of one move and its result to every sink"""
+        for sink in self._sinks:
+            for stage, seconds in timings:
+                sink.observe(stage, seconds)
+            sink.count_move(reason)
+
+    def make_move(self, game, playername, coordinates, direction):
+        """Makes the move on game like make_move, returns True if it was made, otherwise False"""
+        timings = []
+        clock = time.perf_counter
+        start = clock()
+        reason = self.check_move(game, playername, coordinates, direction)
+        stage_end = clock()
+        timings.append(("validation", stage_end - start))
+        if reason is None:
+            start = stage_end
+            if not game.check_end_of_line_of_contig_pieces(playername, coordinates, direction):
+                reason = SELF_EJECTION
+            stage_end = clock()
+            timings.append(("end_of_line", stage_end - start))
+        if reason is None:
+            start = stage_end
+            end_of_line_index, ejected = game.get_pushed_line(coordinates, direction)
+            stage_end = clock()
+            timings.append(("pushed_line", stage_end - start))
+            start = stage_end
+            if game.check_push_repeats_past_board(coordinates, direction, end_of_line_index, ejected):
+                reason = REPETITION
+            stage_end = clock()
+            timings.append(("repetition", stage_end - start))
+        if reason is None:
+            start = stage_end
+            game.apply_move(playername, coordinates, direction)
+            game.trim_move_records()
+            stage_end = clock()
+            timings.append(("apply_move", stage_end - start))
+            recorder = game.get_recorder()
+            if recorder is not None:
+                start = stage_end
+                recorder(playername, coordinates, direction)
+                stage_end = clock()
+                timings.append(("recorder", stage_end - start))
+            if not game.is_quiet():
+                start = stage_end
+                game.print_board(game.get_current_board())
+                timings.append(("render", clock() - start))
+        self.finish_move(timings, reason)
+        return reason is None
+
+    def check_move(self, game, playername, coordinates, direction):
+        """
+        The validation stage, make_move's checks up to and including the proceeding space, in its order and
+        with its side effect of the first mover setting the current turn. Returns the rejection reason or None.
+        """
+        if not game.check_valid_player_name_direction_coordinates(playername, coordinates, direction):
+            return INVALID_MOVE
+        if game.get_winner() is not None:
+            return GAME_OVER
+        if game.get_current_turn() is None:  # for the inital move of the game as either player can start
+            game.set_current_turn(playername)
+        if game.get_current_turn() != game.get_player_name(playername):
+            return WRONG_TURN
+        if not game.check_piece_matches_player(playername, coordinates):
+            return WRONG_COLOR
+        if not game.check_proceeding_space(coordinates, direction):
+            return BLOCKED_PROCEEDING_SPACE
+        return None
+
+
+@contextlib.contextmanager
+def profile_games(games=(), sinks=None, game_class=KubaGame):
+    """
+    Context manager that instruments the passed games and every game of game_class (or a subclass) created in
+    the block, and yields the MoveInstrumentation. On exit the previous instrumentation is put back and the
+    sinks are flushed.
+    """
+    instrumentation = MoveInstrumentation(sinks)
+    previous_default = game_class.get_default_instrumentation()
+    previous = [(game, game.get_instrumentation()) for game in games]
+    game_class.set_default_instrumentation(instrumentation)
+    for game in games:
+        game.set_instrumentation(instrumentation)
+    try:
+        yield instrumentation
+    finally:
+        game_class.set_default_instrumentation(previous_default)
+        for game, game_instrumentation in previous:
+            game.set_instrumentation(game_instrumentation)
+        instrumentation.flush()
+
+
+def check_and_time(games=20, max_moves=300):
+    """
+    Replays random move scripts with and without instrumentation on both board backends, checks the results
+    are the same, prints the time per attempted move both ways and the stage summary.
+    """
+    from KubaBitboard import KubaBitboardGame, random_move_script, time_backend
+    scripts = [random_move_script(seed, max_moves) for seed in range(games)]
+    attempted_moves = sum(len(script) for script in scripts)
+    for game_class in (KubaGame, KubaBitboardGame):
+        plain_seconds, plain_results = min(time_backend(game_class, scripts, render=False) for _ in range(5))
+        sink = HistogramSink()
+        with profile_games(sinks=[sink]):
+            instrumented_seconds, instrumented_results = time_backend(game_class, scripts, render=False)
+        if instrumented_results != plain_results:
+            raise AssertionError("instrumented make_move results differ on %s" % game_class.__name__)
+        if sink.get_accepted() + sum(sink.get_rejections().values()) != attempted_moves:
+            raise AssertionError("instrumented move count differs on %s" % game_class.__name__)
+        print("%s: %.2f us/move plain, %.2f us/move instrumented" % (
+            game_class.__name__, plain_seconds / attempted_moves * 1e6, instrumented_seconds / attempted_moves * 1e6))
+        print(sink.format_summary())
+
+
+if __name__ == '__main__':
+    check_and_time()
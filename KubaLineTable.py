@@ -0,0 +1,407 @@
+# Date: 10-18-2026
+# Description: This file contains the precomputed line push lookup table and KubaLineTableGame, a KubaGame that
+#       answers the push checks with single table lookups. Every push is along one 7 space row or col, and each
+#       space is empty, W, B or R, so a line is a 14 bit state (2 bits per space, space 0 in the low bits) with
+#       4^7 = 16,384 values. The table has one 32 bit entry for every (line state, start index, direction along
+#       the line, mover color), holding:
+#
+#           bits 0-13    the line state after the push
+#           bits 14-15   the code of the marble pushed off the board, 0 for none
+#           bits 16-19   find_index_of_EOL_of_contig_pieces of the push, plus 1 so -1..7 fits
+#           bit 20       the proceeding space is taken, or a single piece is pushed "outward" off the edge
+#           bit 21       the push would push the mover's own marble off the board
+#           bit 22       the start space does not hold the mover's marble
+#
+#       The table is built on first use and cached on disk, by default in ~/.cache/kuba or in $KUBA_CACHE_DIR,
+#       so later processes only read 1.8 MB. Running this file checks KubaLineTableGame against KubaGame and
+#       times each check both ways.
+#
+#       The table does not make the single checks faster. Finding the line state and the table index and decoding
+#       the entry costs more than KubaGame's few space board walk: check_proceeding_space is about 2x slower,
+#       find_index_of_EOL_of_contig_pieces and check_end_of_line_of_contig_pieces about 1.3-1.5x slower.
+#       make_move, which answers its checks with one entry, is within a few percent of KubaGame either way, as
+#       apply_move spends the saving keeping the line states up to date. Only move_the_pieces is faster, about
+#       7x, and make_move does not call it since apply_move writes the push in place.
+
+import array
+import os
+import random
+import sys
+import time
+
+from KubaGame import KubaGame
+
+LINE_CODES = {" ": 0, "W": 1, "B": 2, "R": 3}  # 2 bit code of each space content
+LINE_STATES = 4 ** 7
+MOVER_INDEX = {"W": 0, "B": 1}
+RED_CODE = LINE_CODES["R"]
+RESULT_MASK = LINE_STATES - 1
+EJECTED_SHIFT = 14
+END_OF_LINE_SHIFT = 16
+BLOCKED_FLAG = 1 << 20
+SELF_EJECTION_FLAG = 1 << 21
+WRONG_COLOR_FLAG = 1 << 22
+TABLE_ENTRIES = LINE_STATES * 7 * 2 * 2
+TABLE_FILE_NAME = "line_table_v1.bin"  # entries are stored little endian
+
+_line_table = None  # array of the table entries once built or loaded in this process
+
+
+def table_index(line_state, start_index, forward, mover_index):
+    """Returns the table index of a push, forward 1 along increasing indexes (R or B) and 0 for L or F"""
+    return (((line_state * 7 + start_index) << 1 | forward) << 1) | mover_index
+
+
+def decode_line_state(line_state):
+    """Returns the list of 7 " "/W/B/R spaces of a line state"""
+    return [" WBR"[(line_state >> (2 * index)) & 3] for index in range(7)]
+
+
+def encode_line(line):
+    """Returns the line state of a list of 7 " "/W/B/R spaces"""
+    line_state = 0
+    for index, space in enumerate(line):
+        line_state |= LINE_CODES[space] << (2 * index)
+    return line_state
+
+
+def compute_line_entries(line_state, start_index, forward):
+    """
+    Returns the (W mover, B mover) table entries of one push along a line, following check_proceeding_space,
+    find_index_of_EOL_of_contig_pieces, check_end_of_line_of_contig_pieces and move_the_pieces.
+    """
+    line = decode_line_state(line_state)
+    change_amount = 1 if forward else -1
+
+    # proceeding space, pieces on the edge can be pushed "into" the board, but not "outward" as single pieces
+    if not 0 <= start_index + change_amount <= 6:
+        blocked = True
+    elif not 0 <= start_index - change_amount <= 6:
+        blocked = False
+    else:
+        blocked = line[start_index - change_amount] != " "
+
+    end_of_line_index = start_index
+    while 0 <= end_of_line_index <= 6 and line[end_of_line_index] != " ":
+        end_of_line_index += change_amount
+    if 0 <= end_of_line_index <= 6:
+        end_of_line_index -= change_amount
+    edge_index = min(max(end_of_line_index, 0), 6)
+    ejected = not 0 <= end_of_line_index <= 6
+
+    result = line_state
+    ejected_code = 0
+    if not blocked and line[start_index] != " ":
+        post_movement_line = line[:]
+        last_index = edge_index if ejected else end_of_line_index + change_amount
+        for index in range(last_index, start_index, -change_amount):
+            post_movement_line[index] = line[index - change_amount]
+        post_movement_line[start_index] = " "
+        result = encode_line(post_movement_line)
+        if ejected:
+            ejected_code = LINE_CODES[line[edge_index]]
+
+    entry = result | ejected_code << EJECTED_SHIFT | (end_of_line_index + 1) << END_OF_LINE_SHIFT
+    if blocked:
+        entry |= BLOCKED_FLAG
+    entries = []
+    for color in ("W", "B"):
+        color_entry = entry
+        if not 0 < end_of_line_index < 6 and line[edge_index] == color and edge_index != start_index:
+            color_entry |= SELF_EJECTION_FLAG
+        if line[start_index] != color:
+            color_entry |= WRONG_COLOR_FLAG
+        entries.append(color_entry)
+    return entries
+
+
+def build_line_table():
+    """Returns a new array of every table entry"""
+    table = array.array("I", bytes(4 * TABLE_ENTRIES))
+    for line_state in range(LINE_STATES):
+        for start_index in range(7):
+            for forward in (0, 1):
+                index = table_index(line_state, start_index, forward, 0)
+                table[index], table[index + 1] = compute_line_entries(line_state, start_index, forward)
+    return table
+
+
+def get_table_path():
+    """Returns the path of the cached table file"""
+    cache_dir = os.environ.get("KUBA_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "kuba")
+    return os.path.join(cache_dir, TABLE_FILE_NAME)
+
+
+def load_line_table(path=None):
+    """
+    Returns the table, reading the cached file or, when it is missing or the wrong size, building the table and
+    writing the file. The table is kept for the rest of the process.
+    """
+    global _line_table
+    if _line_table is not None:
+        return _line_table
+    path = path or get_table_path()
+    table = array.array("I")
+    try:
+        with open(path, "rb") as table_file:
+            if os.fstat(table_file.fileno()).st_size != table.itemsize * TABLE_ENTRIES:
+                raise EOFError("%s is not a line table" % path)  # wrong size, rebuilt below
+            table.fromfile(table_file, TABLE_ENTRIES)
+        if sys.byteorder == "big":
+            table.byteswap()
+    except (OSError, EOFError):
+        table = build_line_table()
+        save_line_table(table, path)
+    _line_table = table
+    return table
+
+
+def save_line_table(table, path):
+    """Writes the table to path, through a temporary file so other processes never read half a table"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    stored = array.array("I", table)
+    if sys.byteorder == "big":
+        stored.byteswap()
+    with open(temp_path, "wb") as table_file:
+        stored.tofile(table_file)
+    os.replace(temp_path, path)
+
+
+class KubaLineTableGame(KubaGame):
+    """
+    A KubaGame that keeps the line state of every row and col up to date alongside the occupancy masks, so
+    check_proceeding_space, find_index_of_EOL_of_contig_pieces, check_end_of_line_of_contig_pieces,
+    get_pushed_line and move_the_pieces are each one lookup in the line push table instead of a board walk.
+    Results are the same as KubaGame. Only move_the_pieces is faster, the single checks are slower (see above).
+    """
+    _line_table = None  # shared by every game, class attribute so copies and pickles do not carry the table
+
+    def __init__(self, player1, player2, superko=False, quiet=False, renderer=None, check_counters=False,
+                 recorder=None, instrumentation=None):
+        if KubaLineTableGame._line_table is None:
+            KubaLineTableGame._line_table = load_line_table()
+        super().__init__(player1, player2, superko, quiet, renderer, check_counters, recorder, instrumentation)
+
+    def __setstate__(self, state):
+        """Unpickles a game, loading the table first in a process that has not made a game yet"""
+        if KubaLineTableGame._line_table is None:
+            KubaLineTableGame._line_table = load_line_table()
+        self.__dict__.update(state)
+
+    def rebuild_occupancy(self):
+        """Rebuilds the occupancy masks and the line state of every row and col from the current board"""
+        super().rebuild_occupancy()
+        temp_board = self._starting_board  # the current board itself, not a copy
+        self._row_states = [encode_line(row) for row in temp_board]
+        self._col_states = [encode_line([row[col] for row in temp_board]) for col in range(7)]
+
+    def unshare_state(self):
+        """Called before the first change after a fork, copies the line states along with the shared boards"""
+        super().unshare_state()
+        self._row_states = self._row_states[:]
+        self._col_states = self._col_states[:]
+
+    def update_line_occupancy(self, coordinates, direction):
+        """
+        Updates the occupancy masks and line states after a push. Only its row (R or L) or col (F or B) changed,
+        so those 7 spaces are read once for both.
+        """
+        temp_board = self._starting_board  # the current board itself, not a copy
+        row_occupancy = self._row_occupancy
+        col_occupancy = self._col_occupancy
+        row_states = self._row_states
+        col_states = self._col_states
+        if direction == "R" or direction == "L":
+            row_index = coordinates[0]
+            row_bit = 1 << row_index
+            shift = 2 * row_index
+            clear_mask = ~(3 << shift)
+            line_state = occupancy = 0
+            for col, space in enumerate(temp_board[row_index]):
+                code = LINE_CODES[space]
+                if code:
+                    line_state |= code << (2 * col)
+                    occupancy |= 1 << col
+                    col_occupancy[col] |= row_bit
+                else:
+                    col_occupancy[col] &= ~row_bit
+                col_states[col] = col_states[col] & clear_mask | code << shift
+            row_states[row_index] = line_state
+            row_occupancy[row_index] = occupancy
+        else:
+            col_index = coordinates[1]
+            col_bit = 1 << col_index
+            shift = 2 * col_index
+            clear_mask = ~(3 << shift)
+            line_state = occupancy = 0
+            for row in range(7):
+                code = LINE_CODES[temp_board[row][col_index]]
+                if code:
+                    line_state |= code << (2 * row)
+                    occupancy |= 1 << row
+                    row_occupancy[row] |= col_bit
+                else:
+                    row_occupancy[row] &= ~col_bit
+                row_states[row] = row_states[row] & clear_mask | code << shift
+            col_states[col_index] = line_state
+            col_occupancy[col_index] = occupancy
+
+    def get_line_entry(self, coordinates, direction, color="W"):
+        """Returns the table entry of the push of coordinates in direction by a mover of color"""
+        if direction == "R" or direction == "L":
+            line_state = self._row_states[coordinates[0]]
+            start_index = coordinates[1]
+        else:
+            line_state = self._col_states[coordinates[1]]
+            start_index = coordinates[0]
+        forward = 1 if direction == "R" or direction == "B" else 0
+        return self._line_table[(((line_state * 7 + start_index) << 1 | forward) << 1) | MOVER_INDEX.get(color, 0)]
+
+    def check_proceeding_space(self, coordinates, direction):
+        """Same result as KubaGame.check_proceeding_space, from the table"""
+        if direction not in ("L", "R", "F", "B"):
+            return False
+        return not self.get_line_entry(coordinates, direction) & BLOCKED_FLAG
+
+    def find_index_of_EOL_of_contig_pieces(self, coordinates, direction):
+        """Same result as KubaGame.find_index_of_EOL_of_contig_pieces, -1 or 7 past the edge, from the table"""
+        return (self.get_line_entry(coordinates, direction) >> END_OF_LINE_SHIFT & 15) - 1
+
+    def check_end_of_line_of_contig_pieces(self, playername, coordinates, direction):
+        """Same result as KubaGame.check_end_of_line_of_contig_pieces, from the table"""
+        return not self.get_line_entry(coordinates, direction, self.get_player_color(playername)) & SELF_EJECTION_FLAG
+
+    def get_pushed_line(self, coordinates, direction):
+        """Same result as KubaGame.get_pushed_line for a 'current piece' space that is not empty, from the table"""
+        entry = self.get_line_entry(coordinates, direction)
+        if entry & BLOCKED_FLAG:
+            return None
+        end_of_line_index = (entry >> END_OF_LINE_SHIFT & 15) - 1
+        if end_of_line_index < 0:
+            return (0, True)
+        if end_of_line_index > 6:
+            return (6, True)
+        return (end_of_line_index, False)
+
+    def move_the_pieces(self, playername, coordinates, direction):
+        """
+        Same result as KubaGame.move_the_pieces: returns a copy of the current board with the push made, after
+        recording a captured red. The pushed line is written from the table entry.
+        """
+        entry = self.get_line_entry(coordinates, direction, self.get_player_color(playername))
+        temp_board = self.get_current_board()  # copy of current board
+        post_movement_line = decode_line_state(entry & RESULT_MASK)
+        if direction == "R" or direction == "L":
+            temp_board[coordinates[0]] = post_movement_line
+        else:
+            for row in range(7):
+                temp_board[row][coordinates[1]] = post_movement_line[row]
+        if entry >> EJECTED_SHIFT & 3 == RED_CODE:
+            self.update_captured(playername)
+        return temp_board
+
+    def make_move(self, playername, coordinates, direction):
+        """
+        Same validation chain and results as KubaGame.make_move, with the 'current piece' color, proceeding space
+        and own marble ejection checks all answered by one table entry, through its WRONG_COLOR_FLAG,
+        BLOCKED_FLAG and SELF_EJECTION_FLAG.
+        """
+        if self._instrumentation is not None:
+            return self._instrumentation.make_move(self, playername, coordinates, direction)
+        if not self.check_valid_player_name_direction_coordinates(playername, coordinates, direction):
+            return False
+        if self.get_winner() is not None:
+            return False
+        if self.get_current_turn() is None:  # for the inital move of the game as either player can start
+            self.set_current_turn(playername)
+        if self.get_current_turn() != self.get_player_name(playername):  # check it is player's turn
+            return False
+        entry = self.get_line_entry(coordinates, direction, self.get_player_color(playername))
+        if entry & (WRONG_COLOR_FLAG | BLOCKED_FLAG | SELF_EJECTION_FLAG):
+            return False
+        end_of_line_index = (entry >> END_OF_LINE_SHIFT & 15) - 1
+        ejected = not 0 <= end_of_line_index <= 6
+        if ejected:
+            end_of_line_index = 0 if end_of_line_index < 0 else 6
+        if self.check_push_repeats_past_board(coordinates, direction, end_of_line_index, ejected):
+            return False  # previous board state check
+        self.apply_move(playername, coordinates, direction)
+        self.trim_move_records()
+        if self._recorder is not None:
+            self._recorder(playername, coordinates, direction)
+        if not self._quiet:
+            self.print_board(self._starting_board)
+        return True
+
+
+def check_and_time(games=20, max_moves=300, calls=20000):
+    """
+    Checks every table backed check against KubaGame for every own marble push of positions from random games,
+    checks whole games give the same make_move results, and prints the per call times both ways.
+    """
+    from KubaBitboard import random_move_script, time_backend
+    start = time.perf_counter()
+    load_line_table()
+    print("line table ready in %.2f s (%s)" % (time.perf_counter() - start, get_table_path()))
+
+    rng = random.Random(0)
+    pushes = 0
+    for seed in range(games):
+        game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+        table_game = KubaLineTableGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+        for move in random_move_script(seed, max_moves):
+            for playername in ("playerA", "playerB"):
+                for coordinates in game.get_marble_spaces(game.get_player_color(playername)):
+                    for direction in ("L", "R", "F", "B"):
+                        pushes += 1
+                        for method in ("check_proceeding_space", "find_index_of_EOL_of_contig_pieces"):
+                            if getattr(game, method)(coordinates, direction) != \
+                                    getattr(table_game, method)(coordinates, direction):
+                                raise AssertionError("%s differs for %r" % (method, (coordinates, direction)))
+                        if not game.check_proceeding_space(coordinates, direction):
+                            continue
+                        if game.get_pushed_line(coordinates, direction) != \
+                                table_game.get_pushed_line(coordinates, direction):
+                            raise AssertionError("get_pushed_line differs for %r" % ((coordinates, direction),))
+                        if game.check_end_of_line_of_contig_pieces(playername, coordinates, direction) != \
+                                table_game.check_end_of_line_of_contig_pieces(playername, coordinates, direction):
+                            raise AssertionError("check_end_of_line differs for %r" % ((coordinates, direction),))
+                        if game.move_the_pieces(playername, coordinates, direction) != \
+                                table_game.move_the_pieces(playername, coordinates, direction) or \
+                                game.get_captured(playername) != table_game.get_captured(playername):
+                            raise AssertionError("move_the_pieces differs for %r" % ((coordinates, direction),))
+            if game.make_move(*move) != table_game.make_move(*move):
+                raise AssertionError("make_move differs for %r" % (move,))
+            if rng.random() < 0.1:
+                table_game.rebuild_occupancy()  # the incremental line states must equal rebuilt ones
+    print("%d pushes checked against KubaGame" % pushes)
+
+    scripts = [random_move_script(seed, max_moves) for seed in range(games)]
+    attempted_moves = sum(len(script) for script in scripts)
+    list_seconds, list_results = min(time_backend(KubaGame, scripts, render=False) for _ in range(3))
+    table_seconds, table_results = min(time_backend(KubaLineTableGame, scripts, render=False) for _ in range(3))
+    if list_results != table_results:
+        raise AssertionError("KubaLineTableGame games differ from KubaGame")
+    print("make_move per attempted move: %.2f us list, %.2f us line table" % (
+        list_seconds / attempted_moves * 1e6, table_seconds / attempted_moves * 1e6))
+
+    game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+    table_game = KubaLineTableGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+    checks = (("check_proceeding_space", ((1, 1), "R")),
+              ("find_index_of_EOL_of_contig_pieces", ((1, 0), "R")),
+              ("check_end_of_line_of_contig_pieces", ("playerA", (1, 0), "R")),
+              ("move_the_pieces", ("playerA", (1, 0), "R")))
+    for method, arguments in checks:
+        timings = []
+        for timed_game in (game, table_game):
+            function = getattr(timed_game, method)
+            start = time.perf_counter()
+            for _ in range(calls):
+                function(*arguments)
+            timings.append((time.perf_counter() - start) / calls * 1e6)
+        print("%-36s %6.2f us list, %6.2f us line table" % (method, timings[0], timings[1]))
+
+
+if __name__ == '__main__':
+    check_and_time()
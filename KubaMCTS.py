@@ -0,0 +1,343 @@
+# Date: 10-18-2026
+# Description: This file contains KubaMCTS, a Monte Carlo tree search player for KubaGame. It selects moves with
+#       UCT and scores leaves with rollouts from a configurable policy. Rollouts play on the game in place with
+#       apply_move and undo_move, without board copies, validation or rendering. With more than one worker the
+#       search runs across a process pool, either as independent trees merged at the root (root parallelism)
+#       or as one tree whose leaf rollouts are farmed out in batches, kept apart by virtual loss (leaf
+#       parallelism). Each search stops at a wall-clock deadline, and the tree is kept between moves.
+#       Example: python KubaMCTS.py --time 1.0 --workers 4 --mode leaf
+
+import argparse
+import math
+import os
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from KubaGame import KubaGame
+from KubaSearch import evaluate, search_key
+from KubaSelfPlay import resolve_policy
+
+ROLLOUT_SCALE = 30.0  # evaluate score at which an unfinished rollout counts as a 73% win
+
+
+class MCTSNode:
+    """
+    One position in the search tree, reached by move from the parent. wins holds the rewards of the player
+    who made the move, so a parent picks the child with the best wins / visits for its player to move.
+    """
+    __slots__ = ("move", "parent", "mover", "children", "untried", "visits", "wins", "virtual_losses", "key")
+
+    def __init__(self, move, parent, mover, key=None):
+        self.move = move  # (coordinates, direction), None for the root
+        self.parent = parent
+        self.mover = mover  # playername that made move
+        self.children = []
+        self.untried = None  # legal moves not expanded yet, generated the first time the node is reached
+        self.visits = 0
+        self.wins = 0.0
+        self.virtual_losses = 0  # pending leaf rollouts through this node, each counted as a lost visit
+        self.key = key  # search_key of the position, to find it again when the tree is reused
+
+
+def opponent_of(game, playername):
+    """Returns the other player's name"""
+    return game.get_player2_name() if playername == game.get_player1_name() else game.get_player1_name()
+
+
+def rollout(game, playername, policy, rng, max_moves):
+    """
+    Plays the policy for both players from the game, with playername to move, for up to max_moves moves and
+    takes every move back. Returns the reward of player1: 1 or 0 for a win or loss, otherwise the evaluation
+    of the final position squashed between 0 and 1.
+    """
+    records = []
+    player1 = game.get_player1_name()
+    try:
+        while game.get_winner() is None and len(records) < max_moves:
+            move = policy(game, playername, rng)
+            if move is None:
+                break
+            records.append(game.apply_move(playername, move[0], move[1]))
+            playername = opponent_of(game, playername)
+        winner = game.get_winner()
+        if winner is not None:
+            return 1.0 if winner == player1 else 0.0
+        return 1.0 / (1.0 + math.exp(-evaluate(game, player1) / ROLLOUT_SCALE))
+    finally:
+        for record in reversed(records):
+            game.undo_move(record)
+
+
+def rollout_paths(task):
+    """
+    Worker entry point for leaf parallelism. Unpickles the root game once, then for each path of moves from the
+    root plays the moves, runs a rollout and takes the moves back. Returns the player1 rewards in path order.
+    """
+    game_bytes, playername, paths, policy_name, seed, max_moves = task
+    game = pickle.loads(game_bytes)
+    policy = resolve_policy(policy_name)
+    rng = random.Random(seed)
+    rewards = []
+    for path in paths:
+        records = []
+        to_move = playername
+        for move in path:
+            records.append(game.apply_move(to_move, move[0], move[1]))
+            to_move = opponent_of(game, to_move)
+        rewards.append(rollout(game, to_move, policy, rng, max_moves))
+        for record in reversed(records):
+            game.undo_move(record)
+    return rewards
+
+
+def search_root(task):
+    """Worker entry point for root parallelism, searches its own tree and returns {move: (visits, wins)}"""
+    game_bytes, playername, time_limit, settings, seed = task
+    game = pickle.loads(game_bytes)
+    player = KubaMCTS(time_limit=time_limit, workers=1, seed=seed, **settings)
+    player.choose_move(game, playername)
+    return {child.move: (child.visits, child.wins) for child in player.get_root().children}
+
+
+class KubaMCTS:
+    """
+    Monte Carlo tree search player. choose_move searches the passed game in place and leaves it as it was,
+    play_move also makes the chosen move with make_move. When the next search's position is in the last tree,
+    up to two moves below its root, that subtree is reused; root parallel trees live in the workers and are
+    not. mode is "root" or "leaf" when workers > 1, and rollout_policy is a KubaSelfPlay policy name.
+    """
+    def __init__(self, time_limit=1.0, workers=1, mode="leaf", rollout_policy="fast_random", exploration=1.4,
+                 max_rollout_moves=60, batch_size=None, seed=0):
+        if mode not in ("root", "leaf"):
+            raise ValueError("mode must be 'root' or 'leaf'")
+        self._time_limit = time_limit
+        self._workers = workers
+        self._mode = mode
+        self._rollout_policy_name = rollout_policy
+        self._rollout_policy = resolve_policy(rollout_policy)
+        self._exploration = exploration
+        self._max_rollout_moves = max_rollout_moves
+        self._batch_size = batch_size if batch_size is not None else 4 * workers  # leaves per leaf parallel batch
+        self._rng = random.Random(seed)
+        self._root = None
+        self._executor = None
+        self._iterations = 0
+
+    def get_root(self):
+        """Getter method for the root node of the last search"""
+        return self._root
+
+    def get_iterations(self):
+        """Getter method for the rollouts of the last search"""
+        return self._iterations
+
+    def get_executor(self):
+        """Returns the process pool, started the first time it is needed"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._workers)
+        return self._executor
+
+    def close(self):
+        """Shuts the process pool down"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def settings(self):
+        """Returns the keyword arguments root parallel workers build their KubaMCTS with"""
+        return {"rollout_policy": self._rollout_policy_name, "exploration": self._exploration,
+                "max_rollout_moves": self._max_rollout_moves}
+
+    def find_root(self, game, playername):
+        """
+        Returns the root node for the game: the last root, or one of its children or grandchildren, whose position
+        matches the game, so the visits below it are reused. Otherwise a new node.
+        """
+        key = search_key(game)
+        if self._root is not None:
+            nodes = [self._root]
+            for depth in range(3):
+                for node in nodes:
+                    if node.key == key and (node.untried is not None or node.children):
+                        node.parent = None
+                        return node
+                nodes = [child for node in nodes for child in node.children]
+        return MCTSNode(None, None, opponent_of(game, playername), key)
+
+    def find_child(self, node, move):
+        """Returns the child of the node reached by the move, or None"""
+        for child in node.children:
+            if child.move == move:
+                return child
+        return None
+
+    def select_child(self, node):
+        """Returns the child with the highest UCT score, counting virtual losses as lost visits"""
+        log_visits = math.log(node.visits + node.virtual_losses + 1)
+        best_child = None
+        best_score = -1.0
+        for child in node.children:
+            visits = child.visits + child.virtual_losses
+            if visits == 0:
+                return child
+            score = child.wins / visits + self._exploration * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best_score = score
+                best_child = child
+        return best_child
+
+    def select_leaf(self, game, playername):
+        """
+        Walks from the root down the UCT children and expands one untried move, applying the moves on the game.
+        Adds a virtual loss along the way. Returns (leaf node, player to move at the leaf, move records).
+        """
+        node = self._root
+        records = []
+        node.virtual_losses += 1
+        while game.get_winner() is None:
+            if node.untried is None:
+                node.untried = game.legal_moves(playername)
+                self._rng.shuffle(node.untried)
+            if node.untried:
+                move = node.untried.pop()
+                records.append(game.apply_move(playername, move[0], move[1]))
+                child = MCTSNode(move, node, playername, search_key(game))
+                node.children.append(child)
+                child.virtual_losses += 1
+                return child, opponent_of(game, playername), records
+            if not node.children:
+                break  # no legal move
+            node = self.select_child(node)
+            records.append(game.apply_move(playername, node.move[0], node.move[1]))
+            node.virtual_losses += 1
+            playername = opponent_of(game, playername)
+        return node, playername, records
+
+    def backpropagate(self, node, player1_reward, player1):
+        """Adds the rollout reward to every node from the leaf up to the root and removes the virtual losses"""
+        while node is not None:
+            node.visits += 1
+            node.virtual_losses -= 1
+            node.wins += player1_reward if node.mover == player1 else 1.0 - player1_reward
+            node = node.parent
+
+    def choose_move(self, game, playername):
+        """Searches until the deadline and returns the most visited (coordinates, direction) move, or None"""
+        deadline = time.perf_counter() + self._time_limit
+        self._root = self.find_root(game, playername)
+        self._iterations = 0
+        if self._workers > 1 and self._mode == "root":
+            return self.search_root_parallel(game, playername)
+        player1 = game.get_player1_name()
+        game_bytes = pickle.dumps(game.fork()) if self._workers > 1 else None
+        while True:
+            if self._workers > 1:
+                self.search_leaf_batch(game, playername, game_bytes, player1)
+            else:
+                leaf, to_move, records = self.select_leaf(game, playername)
+                try:
+                    reward = rollout(game, to_move, self._rollout_policy, self._rng, self._max_rollout_moves)
+                finally:
+                    for record in reversed(records):
+                        game.undo_move(record)
+                self.backpropagate(leaf, reward, player1)
+                self._iterations += 1
+            if time.perf_counter() >= deadline:
+                break
+        return self.best_move(self._root)
+
+    def search_leaf_batch(self, game, playername, game_bytes, player1):
+        """Selects a batch of leaves with virtual loss, runs their rollouts across the pool and backpropagates"""
+        leaves = []
+        paths = []
+        for _ in range(self._batch_size):
+            leaf, to_move, records = self.select_leaf(game, playername)
+            paths.append([(record.coordinates, record.direction) for record in records])
+            for record in reversed(records):
+                game.undo_move(record)
+            leaves.append(leaf)
+        chunk_size = max(1, -(-len(paths) // self._workers))
+        tasks = [(game_bytes, playername, paths[start:start + chunk_size], self._rollout_policy_name,
+                  self._rng.getrandbits(32), self._max_rollout_moves) for start in range(0, len(paths), chunk_size)]
+        rewards = [reward for chunk in self.get_executor().map(rollout_paths, tasks) for reward in chunk]
+        for leaf, reward in zip(leaves, rewards):
+            self.backpropagate(leaf, reward, player1)
+        self._iterations += len(leaves)
+
+    def search_root_parallel(self, game, playername):
+        """Searches one tree per worker until the deadline and picks the move with the most visits over all trees"""
+        game_bytes = pickle.dumps(game.fork())
+        tasks = [(game_bytes, playername, self._time_limit, self.settings(), self._rng.getrandbits(32))
+                 for _ in range(self._workers)]
+        root = self._root
+        root.children = []
+        for child_stats in self.get_executor().map(search_root, tasks):
+            for move, (visits, wins) in child_stats.items():
+                child = self.find_child(root, move)
+                if child is None:
+                    child = MCTSNode(move, root, playername)
+                    root.children.append(child)
+                child.visits += visits
+                child.wins += wins
+                root.visits += visits
+                self._iterations += visits
+        root.untried = []
+        return self.best_move(root)
+
+    def best_move(self, node):
+        """Returns the move of the most visited child, or None if the node has no children"""
+        if not node.children:
+            return None
+        return max(node.children, key=lambda child: child.visits).move
+
+    def play_move(self, game, playername):
+        """Chooses a move, makes it with make_move and moves the root to it, returns the move"""
+        move = self.choose_move(game, playername)
+        if move is not None:
+            game.make_move(playername, move[0], move[1])
+            child = self.find_child(self._root, move)
+            if child is not None:
+                child.parent = None
+                self._root = child
+        return move
+
+
+def main(argv=None):
+    """Plays KubaMCTS against itself from the starting board and prints the rollouts of each search"""
+    parser = argparse.ArgumentParser(description="Plays KubaMCTS against itself and reports rollouts per second.")
+    parser.add_argument("--time", type=float, default=1.0, help="seconds per move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, 1 searches in-process")
+    parser.add_argument("--mode", choices=("root", "leaf"), default="leaf", help="parallelism when workers > 1")
+    parser.add_argument("--policy", default="fast_random", help="rollout policy, a KubaSelfPlay policy name")
+    parser.add_argument("--rollout-moves", type=int, default=60, help="moves before a rollout is evaluated")
+    parser.add_argument("--moves", type=int, default=6, help="moves to play")
+    args = parser.parse_args(argv)
+
+    game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+    playername = "playerA"
+    with KubaMCTS(args.time, args.workers, args.mode, args.policy, max_rollout_moves=args.rollout_moves) as player:
+        for move_number in range(args.moves):
+            if game.get_winner() is not None:
+                break
+            reused_visits = 0
+            if player.get_root() is not None:
+                reused_visits = player.get_root().visits
+            move = player.play_move(game, playername)
+            print("%s %s, %d rollouts (%.0f/s), %d reused visits" % (
+                playername, move, player.get_iterations(), player.get_iterations() / args.time, reused_visits))
+            if move is None:
+                break
+            playername = game.get_current_turn()
+    game.print_board(game.get_current_board())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Date: 10-18-2026
+# Description: This file contains perft for Kuba positions: the count of leaf nodes of the full move tree to a
+#       given depth under the complete rules, including the previous board state ban. divide breaks the count
+#       down by root move, and the root moves can be counted in parallel worker processes. Counts are a
+#       correctness oracle for any faster engine (every backend must give the same counts, and perft_reference
+#       counts with make_move on copies as an independent check), and nodes per second is a throughput benchmark
+#       of the move generator and push logic. Before the first move either player may start, so the root moves
+#       of the starting position are both players' moves.
+#       Example: python KubaPerft.py --depth 3 --divide --workers 4 --backend bitboard
+
+import argparse
+import copy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from KubaBenchmark import POSITIONS, load_position
+from KubaSelfPlay import BACKENDS, PLAYERS
+
+DIRECTIONS = ("L", "R", "F", "B")
+
+
+def root_moves(game):
+    """Returns every legal (playername, coordinates, direction) move of the player to move, both before a first move"""
+    playername = game.get_current_turn()
+    movers = [playername] if playername is not None else [game.get_player1_name(), game.get_player2_name()]
+    return [(mover, coordinates, direction) for mover in movers
+            for coordinates, direction in game.iter_legal_moves(mover)]
+
+
+def perft(game, depth):
+    """
+    Returns the number of leaf nodes depth moves below the game's position. The moves are applied and undone in
+    place, so the game is left as it was. Nodes without moves above depth 0, such as won games, count nothing.
+    """
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return len(root_moves(game))  # the leaves are only counted, not visited
+    nodes = 0
+    for playername, coordinates, direction in root_moves(game):
+        record = game.apply_move(playername, coordinates, direction)
+        try:
+            nodes += perft(game, depth - 1)
+        finally:
+            game.undo_move(record)
+    return nodes
+
+
+def divide(game, depth):
+    """Returns {(playername, coordinates, direction): leaf nodes below that root move} of perft(game, depth)"""
+    counts = {}
+    for move in root_moves(game):
+        record = game.apply_move(*move)
+        try:
+            counts[move] = perft(game, depth - 1)
+        finally:
+            game.undo_move(record)
+    return counts
+
+
+def perft_subtree(task):
+    """Worker entry point, counts the leaf nodes below one (game, root move, depth) task"""
+    game, move, depth = task
+    game.apply_move(*move)
+    return perft(game, depth - 1)
+
+
+def parallel_divide(game, depth, workers=None):
+    """
+    Same result as divide, with each root move's subtree counted in a pool of workers processes (all cores when
+    None). Each task pickles the game once, small next to the subtree it counts.
+    """
+    moves = root_moves(game)
+    tasks = [(game, move, depth) for move in moves]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(moves, executor.map(perft_subtree, tasks)))
+
+
+def perft_reference(game, depth):
+    """
+    Independent slow oracle for perft: every player, space and direction is tried with make_move on a deep
+    copy, without iter_legal_moves, apply_move or undo_move.
+    """
+    if depth == 0:
+        return 1
+    playername = game.get_current_turn()
+    movers = [playername] if playername is not None else [game.get_player1_name(), game.get_player2_name()]
+    nodes = 0
+    for mover in movers:
+        for row in range(7):
+            for col in range(7):
+                for direction in DIRECTIONS:
+                    game_copy = copy.deepcopy(game)
+                    if game_copy.make_move(mover, (row, col), direction):
+                        nodes += perft_reference(game_copy, depth - 1)
+    return nodes
+
+
+def make_position(backend, position_name):
+    """Returns a quiet game of the backend in a KubaBenchmark position, or the starting position for "start\""""
+    game_class = BACKENDS[backend]
+    if position_name == "start":
+        return game_class(PLAYERS[0], PLAYERS[1], quiet=True)
+    return load_position(game_class, position_name)
+
+
+def main(argv=None):
+    """Command line entry point, prints perft counts with nodes per second, by root move with --divide"""
+    parser = argparse.ArgumentParser(description="Counts the Kuba move tree to a depth.")
+    parser.add_argument("--depth", type=int, default=3, help="moves to count below the position")
+    parser.add_argument("--position", choices=["start"] + sorted(POSITIONS), default="start",
+                        help="starting position or a KubaBenchmark position")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="list", help="KubaGame board backend")
+    parser.add_argument("--divide", action="store_true", help="print the count below each root move")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the root moves, 1 in-process")
+    parser.add_argument("--check", action="store_true",
+                        help="check the count against every backend and, to depth 2, perft_reference")
+    args = parser.parse_args(argv)
+
+    game = make_position(args.backend, args.position)
+    start = time.perf_counter()
+    if args.workers == 1:
+        counts = divide(game, args.depth) if args.depth > 0 else None
+    else:
+        counts = parallel_divide(game, args.depth, args.workers) if args.depth > 0 else None
+    elapsed = time.perf_counter() - start
+    nodes = sum(counts.values()) if counts is not None else 1
+    if args.divide and counts is not None:
+        for (playername, coordinates, direction), count in sorted(counts.items()):
+            print("%s %s %s: %d" % (playername, coordinates, direction, count))
+    print("perft(%d) %s %s: %d nodes, %.2f s, %.0f nodes/s" % (args.depth, args.position, args.backend, nodes,
+                                                               elapsed, nodes / elapsed if elapsed else 0.0))
+
+    if args.check:
+        for backend in sorted(BACKENDS):
+            backend_nodes = perft(make_position(backend, args.position), args.depth)
+            print("%s: %d %s" % (backend, backend_nodes, "ok" if backend_nodes == nodes else "MISMATCH"))
+            if backend_nodes != nodes:
+                return 1
+        if args.depth <= 2:
+            reference_nodes = perft_reference(make_position(args.backend, args.position), args.depth)
+            print("perft_reference: %d %s" % (reference_nodes, "ok" if reference_nodes == nodes else "MISMATCH"))
+            if reference_nodes != nodes:
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
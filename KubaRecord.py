@@ -0,0 +1,275 @@
+# Date: 10-18-2026
+# Description: This file contains the compact binary game record format for archiving Kuba games. A record file
+#       starts with the magic bytes b"KUBR" and a version byte, followed by one length-prefixed record per game:
+#
+#           uint32 little endian   length of the rest of the record in bytes
+#           uint8                  index of the player who moved first, 0 or 1
+#           2 x (uint8 length, UTF-8 name bytes, 1 byte W/B color)   player1, then player2
+#           one byte per accepted move: (row * 7 + col) << 2 | direction index in L/R/F/B order
+#
+#       GameRecordWriter appends records, fed by a GameRecorder set as a KubaGame's recorder so every move
+#       make_move accepts is recorded. read_game_records reads a file through mmap one record at a time, and
+#       replay_games replays each record on a fresh game, either validated with make_move or, for trusted
+#       records, with apply_move. Memory use does not grow with the number of games in the file.
+#       iter_record_chunks splits a file into byte ranges of whole records for parallel readers.
+
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+
+from KubaGame import KubaGame
+from KubaSelfPlay import fast_random_policy
+
+MAGIC = b"KUBR"
+VERSION = 1
+FILE_HEADER_SIZE = len(MAGIC) + 1
+RECORD_LENGTH = struct.Struct("<I")
+DIRECTIONS = ("L", "R", "F", "B")
+DIRECTION_INDEX = {direction: index for index, direction in enumerate(DIRECTIONS)}
+DECODED_MOVES = [((move_byte >> 2) // 7, (move_byte >> 2) % 7) if move_byte >> 2 < 49 else None
+                 for move_byte in range(256)]  # move byte -> coordinates, None for the unused values
+
+
+def encode_move(coordinates, direction):
+    """Returns the one byte code of a (coordinates, direction) move"""
+    return (coordinates[0] * 7 + coordinates[1]) << 2 | DIRECTION_INDEX[direction]
+
+
+def decode_move(move_byte):
+    """Returns the (coordinates, direction) move of a one byte code, raises ValueError for an unused code"""
+    coordinates = DECODED_MOVES[move_byte]
+    if coordinates is None:
+        raise ValueError("invalid move byte %d" % move_byte)
+    return coordinates, DIRECTIONS[move_byte & 3]
+
+
+class GameRecord:
+    """One decoded game record: the two (name, color) player tuples, the first mover's index and the move bytes"""
+    __slots__ = ("player1", "player2", "first_mover", "moves")
+
+    def __init__(self, player1, player2, first_mover, moves):
+        self.player1 = player1
+        self.player2 = player2
+        self.first_mover = first_mover  # 0 for player1, 1 for player2
+        self.moves = moves  # bytes, one encode_move code per accepted move
+
+    def iter_moves(self):
+        """Generates the (playername, coordinates, direction) of each move, the players taking turns"""
+        playernames = (self.player1[0], self.player2[0])
+        player_index = self.first_mover
+        for move_byte in self.moves:
+            coordinates, direction = decode_move(move_byte)
+            yield playernames[player_index], coordinates, direction
+            player_index = 1 - player_index
+
+    def to_bytes(self):
+        """Returns the length-prefixed binary record"""
+        body = bytearray([self.first_mover])
+        for name, color in (self.player1, self.player2):
+            name_bytes = name.encode("utf-8")
+            if len(name_bytes) > 255:
+                raise ValueError("player name longer than 255 bytes: %r" % name)
+            body.append(len(name_bytes))
+            body += name_bytes
+            body += color.encode("ascii")
+        body += self.moves
+        return RECORD_LENGTH.pack(len(body)) + bytes(body)
+
+    @classmethod
+    def from_bytes(cls, body):
+        """Returns the GameRecord of a record body, the bytes after the length prefix"""
+        first_mover = body[0]
+        offset = 1
+        players = []
+        for _ in range(2):
+            name_length = body[offset]
+            name = bytes(body[offset + 1:offset + 1 + name_length]).decode("utf-8")
+            color = chr(body[offset + 1 + name_length])
+            players.append((name, color))
+            offset += name_length + 2
+        return cls(players[0], players[1], first_mover, bytes(body[offset:]))
+
+
+class GameRecorder:
+    """
+    Recorder callable for KubaGame(recorder=...) or set_recorder, collects the accepted moves of one game.
+    finish writes the game's record to the writer, and the game stops being recorded.
+    """
+    def __init__(self, writer, game):
+        self._writer = writer
+        self._game = game
+        self._first_mover = None
+        self._moves = bytearray()
+
+    def __call__(self, playername, coordinates, direction):
+        if self._first_mover is None:
+            self._first_mover = 0 if playername == self._game.get_player1_name() else 1
+        self._moves.append(encode_move(coordinates, direction))
+
+    def finish(self):
+        """Writes the record of the game so far and detaches from the game"""
+        game = self._game
+        player1 = (game.get_player1_name(), game.get_player_color(game.get_player1_name()))
+        player2 = (game.get_player2_name(), game.get_player_color(game.get_player2_name()))
+        self._writer.write_record(GameRecord(player1, player2, self._first_mover or 0, bytes(self._moves)))
+        game.set_recorder(None)
+
+
+class GameRecordWriter:
+    """Appends game records to a record file, writing the file header first if the file is new or empty"""
+    def __init__(self, path):
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC + bytes([VERSION]))
+        self._games_written = 0
+
+    def get_games_written(self):
+        """Getter method for the records written by this writer"""
+        return self._games_written
+
+    def record(self, game):
+        """Returns a GameRecorder set as the passed game's recorder"""
+        recorder = GameRecorder(self, game)
+        game.set_recorder(recorder)
+        return recorder
+
+    def write_record(self, record):
+        """Appends a GameRecord to the file"""
+        self._file.write(record.to_bytes())
+        self._games_written += 1
+
+    def close(self):
+        """Closes the file"""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_game_records(path, start=None, end=None):
+    """
+    Generates the GameRecords of a record file in order. The file is memory-mapped and only the current record
+    is copied out of it, so memory use stays flat however many games the file holds. start and end, byte
+    offsets of record boundaries like those from iter_record_chunks, limit it to the records between them.
+    """
+    with open(path, "rb") as record_file:
+        if os.fstat(record_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(record_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(MAGIC)] != MAGIC or mapped[len(MAGIC)] != VERSION:
+                raise ValueError("%s is not a version %d Kuba record file" % (path, VERSION))
+            offset = FILE_HEADER_SIZE if start is None else start
+            end = len(mapped) if end is None else end
+            while offset < end:
+                (length,) = RECORD_LENGTH.unpack_from(mapped, offset)
+                offset += RECORD_LENGTH.size
+                if offset + length > end:
+                    raise ValueError("truncated record at byte %d of %s" % (offset, path))
+                yield GameRecord.from_bytes(mapped[offset:offset + length])
+                offset += length
+
+
+def iter_record_chunks(path, chunk_games):
+    """
+    Generates (start offset, end offset, games) for consecutive chunks of chunk_games records of a record file,
+    the last chunk holding the rest, for read_game_records. Only the length prefixes are read.
+    """
+    with open(path, "rb") as record_file:
+        if os.fstat(record_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(record_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(MAGIC)] != MAGIC or mapped[len(MAGIC)] != VERSION:
+                raise ValueError("%s is not a version %d Kuba record file" % (path, VERSION))
+            chunk_start = offset = FILE_HEADER_SIZE
+            end = len(mapped)
+            games = 0
+            while offset < end:
+                (length,) = RECORD_LENGTH.unpack_from(mapped, offset)
+                offset += RECORD_LENGTH.size + length
+                if offset > end:
+                    raise ValueError("truncated record at byte %d of %s" % (offset - length, path))
+                games += 1
+                if games == chunk_games:
+                    yield chunk_start, offset, games
+                    chunk_start = offset
+                    games = 0
+            if games:
+                yield chunk_start, offset, games
+
+
+def replay_record(record, trusted=False, game_class=KubaGame, render=False):
+    """
+    Returns a game of game_class with the record's moves replayed. Untrusted records are replayed with
+    make_move and ValueError is raised for a move it rejects. Trusted records skip the validation with
+    apply_move. The board is only rendered after each move with render True, which also means validation.
+    """
+    game = game_class(record.player1, record.player2, quiet=not render)
+    if trusted and not render:
+        for playername, coordinates, direction in record.iter_moves():
+            game.apply_move(playername, coordinates, direction)
+    else:
+        for move_number, (playername, coordinates, direction) in enumerate(record.iter_moves()):
+            if not game.make_move(playername, coordinates, direction):
+                raise ValueError("move %d %r rejected" % (move_number, (playername, coordinates, direction)))
+    return game
+
+
+def replay_games(path, trusted=False, game_class=KubaGame, render=False):
+    """Generates a (GameRecord, replayed game) pair for each record of a record file, one game at a time"""
+    for record in read_game_records(path):
+        yield record, replay_record(record, trusted, game_class, render)
+
+
+def write_random_games(path, games, seed=0, max_moves=300):
+    """
+    Plays games random games, quiet, each recorded through its GameRecorder, and returns a list of each game's
+    (current board, winner, captured reds) for checking the replays.
+    """
+    rng = random.Random(seed)
+    final_states = []
+    with GameRecordWriter(path) as writer:
+        for _ in range(games):
+            game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+            recorder = writer.record(game)
+            playername = rng.choice(("playerA", "playerB"))
+            for _ in range(max_moves):
+                move = fast_random_policy(game, playername, rng)
+                if move is None or game.get_winner() is not None:
+                    break
+                game.make_move(playername, move[0], move[1])
+                playername = game.get_current_turn()
+            recorder.finish()
+            final_states.append((game.get_current_board(), game.get_winner(), game.get_captured("playerA"),
+                                 game.get_captured("playerB")))
+    return final_states
+
+
+def check_and_time(games=500, seed=0):
+    """
+    Writes random games to a temporary directory, checks both replay modes reproduce them, and prints the size
+    and replay speeds. Nothing outside the temporary directory is written or removed.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "kuba_records.bin")
+        final_states = write_random_games(path, games, seed)
+        moves = sum(len(record.moves) for record in read_game_records(path))
+        print("%d games, %d moves, %d bytes, %.1f bytes/game" % (games, moves, os.path.getsize(path),
+                                                                os.path.getsize(path) / games))
+        for trusted in (False, True):
+            start = time.perf_counter()
+            replayed_states = [(game.get_current_board(), game.get_winner(), game.get_captured("playerA"),
+                                game.get_captured("playerB")) for record, game in replay_games(path, trusted)]
+            elapsed = time.perf_counter() - start
+            if replayed_states != final_states:
+                raise AssertionError("replayed games differ from the recorded games")
+            print("%s replay: %.0f moves/s" % ("trusted" if trusted else "validated", moves / elapsed))
+
+
+if __name__ == '__main__':
+    check_and_time()
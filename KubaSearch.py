@@ -0,0 +1,399 @@
+# Date: 10-18-2026
+# Description: This file contains KubaSearch, a computer opponent for KubaGame. It picks moves with iterative
+#       deepening alpha-beta search in negamax form, ordering moves by the transposition table move, captures
+#       and killer moves, within a time and/or node budget. Positions are cached in TranspositionTable, a
+#       dictionary keyed by the game's Zobrist position hash with a memory cap and a configurable replacement
+#       and eviction policy. Each search reports the depth reached, nodes per second and table hit rate.
+#       Example: python KubaSearch.py --time 1.0 --moves 10
+
+import argparse
+import random
+import time
+
+from KubaGame import KubaGame
+
+WIN_SCORE = 1000000  # score of a won position, less the plies it takes so faster wins score higher
+MATERIAL_WEIGHT = 10  # per own marble on the board more than the opponent has
+RED_CAPTURE_WEIGHT = 15  # per red captured more than the opponent has
+EDGE_EXPOSURE_WEIGHT = 3  # per own marble on the edge spaces less than the opponent has
+EDGE_SPACES = tuple((row, col) for row in range(7) for col in range(7) if row in (0, 6) or col in (0, 6))
+TT_ENTRY_BYTES = 250  # approximate memory of one table entry: dict slot, key int and entry tuple with a move
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2  # kinds of stored scores
+
+# Extra Zobrist keys so a search key also covers what the position hash leaves out but the search depends on:
+# the reds each player has captured and, through the previous board state rule, the past board.
+_search_random = random.Random(10182026)
+CAPTURED_KEYS = [[_search_random.getrandbits(64) for count in range(14)] for player_index in range(2)]
+HASH_MASK = (1 << 64) - 1
+
+
+def search_key(game):
+    """Returns the transposition table key of the game's position, from get_position_hash and the keys above"""
+    past_board_hash = game.get_past_board_hash()
+    return (game.get_position_hash() ^ ((past_board_hash << 1 | past_board_hash >> 63) & HASH_MASK)
+            ^ CAPTURED_KEYS[0][game.get_captured(game.get_player1_name())]
+            ^ CAPTURED_KEYS[1][game.get_captured(game.get_player2_name())])
+
+
+def evaluate(game, playername):
+    """
+    Returns the static score of the game for the passed player: marbles on the board more than the opponent,
+    reds captured more than the opponent, and marbles on the edge spaces, where they can be pushed off, fewer
+    than the opponent.
+    """
+    opponent = game.get_player2_name() if playername == game.get_player1_name() else game.get_player1_name()
+    player_color = game.get_player_color(playername)
+    opponent_color = game.get_player_color(opponent)
+    marble_count = game.get_marble_count()
+    own_index = 0 if player_color == "W" else 1
+    score = MATERIAL_WEIGHT * (marble_count[own_index] - marble_count[1 - own_index])
+    score += RED_CAPTURE_WEIGHT * (game.get_captured(playername) - game.get_captured(opponent))
+    for coordinates in EDGE_SPACES:
+        marble = game.get_marble(coordinates)
+        if marble == player_color:
+            score -= EDGE_EXPOSURE_WEIGHT
+        elif marble == opponent_color:
+            score += EDGE_EXPOSURE_WEIGHT
+    return score
+
+
+def to_table_score(score, ply):
+    """Win and loss scores count plies from the root, the table stores them counted from the stored position"""
+    if score > WIN_SCORE - 1000:
+        return score + ply
+    if score < -WIN_SCORE + 1000:
+        return score - ply
+    return score
+
+
+def from_table_score(score, ply):
+    """Takes a win or loss score stored by to_table_score back to plies counted from the root"""
+    if score > WIN_SCORE - 1000:
+        return score - ply
+    if score < -WIN_SCORE + 1000:
+        return score + ply
+    return score
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+    pass
+
+
+class TranspositionTable:
+    """
+    Bounded cache of search results, key -> (depth, score, kind, best move, search generation). Holds at most
+    megabytes worth of entries. With the "depth" replacement policy an entry is only replaced by a search at
+    least as deep or from a newer search, with "always" it is always replaced. When the table is full the
+    "fifo" eviction policy drops the oldest stored entry and "lru" drops the least recently probed one.
+    """
+    def __init__(self, megabytes=64, replacement="depth", eviction="fifo"):
+        if replacement not in ("depth", "always"):
+            raise ValueError("replacement must be 'depth' or 'always'")
+        if eviction not in ("fifo", "lru"):
+            raise ValueError("eviction must be 'fifo' or 'lru'")
+        self._capacity = max(1, int(megabytes * 1024 * 1024 / TT_ENTRY_BYTES))
+        self._replacement = replacement
+        self._eviction = eviction
+        self._entries = {}  # insertion ordered, the first entry is the next one evicted
+        self._generation = 0
+        self._probes = 0
+        self._hits = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def get_capacity(self):
+        """Getter method for the most entries the table holds"""
+        return self._capacity
+
+    def __len__(self):
+        return len(self._entries)
+
+    def new_search(self):
+        """Called at the start of each search so entries from older searches are replaced first"""
+        self._generation += 1
+
+    def probe(self, key):
+        """Returns the entry stored for the key, or None"""
+        self._probes += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._hits += 1
+            if self._eviction == "lru":  # moves the entry to the end of the eviction order
+                del self._entries[key]
+                self._entries[key] = entry
+        return entry
+
+    def store(self, key, depth, score, kind, best_move):
+        """Stores a search result for the key, following the replacement policy and evicting when full"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._replacement == "depth" and entry[0] > depth and entry[4] == self._generation:
+                return
+            del self._entries[key]
+        elif len(self._entries) >= self._capacity:
+            del self._entries[next(iter(self._entries))]
+            self._evictions += 1
+        self._entries[key] = (depth, score, kind, best_move, self._generation)
+        self._stores += 1
+
+    def clear(self):
+        """Removes every entry"""
+        self._entries.clear()
+
+    def get_stats(self):
+        """Returns a dictionary of the probes, hits, hit rate, stores, evictions and entries of the table"""
+        return {"probes": self._probes, "hits": self._hits,
+                "hit_rate": self._hits / self._probes if self._probes else 0.0,
+                "stores": self._stores, "evictions": self._evictions, "entries": len(self._entries)}
+
+    def reset_stats(self):
+        """Starts the probe, hit, store and eviction counts over"""
+        self._probes = 0
+        self._hits = 0
+        self._stores = 0
+        self._evictions = 0
+
+
+class SearchResult:
+    """Best move found by KubaSearch.choose_move, with its score and the statistics of the search"""
+    __slots__ = ("move", "score", "depth", "nodes", "seconds", "tt_probes", "tt_hits")
+
+    def __init__(self, move, score, depth, nodes, seconds, tt_probes, tt_hits):
+        self.move = move  # (coordinates, direction), or None if the player has no legal move
+        self.score = score  # for the player to move, from the deepest completed iteration
+        self.depth = depth  # deepest completed iteration
+        self.nodes = nodes
+        self.seconds = seconds
+        self.tt_probes = tt_probes
+        self.tt_hits = tt_hits
+
+    def get_nodes_per_second(self):
+        """Returns the nodes searched per second"""
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def get_tt_hit_rate(self):
+        """Returns the share of transposition table probes that found an entry"""
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def __str__(self):
+        return ("move %s score %d depth %d nodes %d in %.3f s, %.0f nodes/s, TT hit rate %.1f%%"
+                % (self.move, self.score, self.depth, self.nodes, self.seconds, self.get_nodes_per_second(),
+                   100 * self.get_tt_hit_rate()))
+
+
+class KubaSearch:
+    """
+    Computer opponent. choose_move searches the passed game in place with apply_move and undo_move, so the
+    game is back in its original state when it returns, and play_move makes the chosen move with make_move.
+    The search stops at max_depth, after time_limit seconds or after node_limit nodes, whichever comes first,
+    and the transposition table is kept between moves.
+    """
+    def __init__(self, time_limit=1.0, node_limit=None, max_depth=64, tt_megabytes=64, replacement="depth",
+                 eviction="fifo"):
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._max_depth = max_depth
+        self._table = TranspositionTable(tt_megabytes, replacement, eviction)
+        self._killers = []  # up to two quiet moves per ply that caused a beta cutoff
+        self._nodes = 0
+        self._deadline = None
+        self._node_budget = None
+
+    def get_table(self):
+        """Getter method for the transposition table"""
+        return self._table
+
+    def order_moves(self, game, playername, moves, tt_move, ply):
+        """
+        Returns the moves sorted so the transposition table move comes first, then moves pushing off a red,
+        then moves pushing off an opponent marble, then killer moves, then the rest.
+        """
+        player_color = game.get_player_color(playername)
+        killers = self._killers[ply] if ply < len(self._killers) else ()
+        scored_moves = []
+        for move in moves:
+            if move == tt_move:
+                move_score = 4
+            else:
+                coordinates, direction = move
+                end_of_line_index, ejected = game.get_pushed_line(coordinates, direction)
+                move_score = 0
+                if ejected:
+                    if direction == "R" or direction == "L":
+                        edge_piece = game.get_marble((coordinates[0], end_of_line_index))
+                    else:
+                        edge_piece = game.get_marble((end_of_line_index, coordinates[1]))
+                    if edge_piece == "R":
+                        move_score = 3
+                    elif edge_piece != player_color:
+                        move_score = 2
+                if move_score == 0 and move in killers:
+                    move_score = 1
+            scored_moves.append((move_score, move))
+        scored_moves.sort(key=lambda scored_move: scored_move[0], reverse=True)  # stable, keeps generation order
+        return [move for move_score, move in scored_moves]
+
+    def store_killer(self, move, ply):
+        """Remembers a quiet move that caused a beta cutoff at the passed ply"""
+        while len(self._killers) <= ply:
+            self._killers.append([])
+        killers = self._killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+    def check_budget(self):
+        """Raises SearchTimeout once the deadline or the node budget is passed, called every 256 nodes"""
+        if self._node_budget is not None and self._nodes >= self._node_budget:
+            raise SearchTimeout()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+
+    def negamax(self, game, playername, opponent, depth, alpha, beta, ply):
+        """
+        Returns the alpha-beta score of the game for playername, the player to move, searching depth plies.
+        Every move is taken back with undo_move, also when the budget runs out part way.
+        """
+        self._nodes += 1
+        if self._nodes & 255 == 0:
+            self.check_budget()
+        if game.get_winner() is not None:
+            return -WIN_SCORE + ply  # the last mover, the opponent, has won
+        if depth == 0:
+            return evaluate(game, playername)
+
+        key = search_key(game)
+        entry = self._table.probe(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, entry_score, entry_kind, tt_move, generation = entry
+            if entry_depth >= depth:
+                entry_score = from_table_score(entry_score, ply)
+                if entry_kind == EXACT:
+                    return entry_score
+                if entry_kind == LOWER_BOUND and entry_score >= beta:
+                    return entry_score
+                if entry_kind == UPPER_BOUND and entry_score <= alpha:
+                    return entry_score
+
+        moves = game.legal_moves(playername)
+        if not moves:
+            return 0  # no legal move, the game can't go on and nobody wins
+        alpha_before = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for move in self.order_moves(game, playername, moves, tt_move, ply):
+            record = game.apply_move(playername, move[0], move[1])
+            try:
+                score = -self.negamax(game, opponent, playername, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.undo_move(record)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if record.ejected_marble is None:
+                    self.store_killer(move, ply)
+                break
+
+        if best_score <= alpha_before:
+            kind = UPPER_BOUND
+        elif best_score >= beta:
+            kind = LOWER_BOUND
+        else:
+            kind = EXACT
+        self._table.store(key, depth, to_table_score(best_score, ply), kind, best_move)
+        return best_score
+
+    def choose_move(self, game, playername):
+        """
+        Searches the game for the passed player with iterative deepening and returns a SearchResult with the
+        best move of the deepest completed iteration. If the budget runs out before the first iteration
+        completes, the best move found so far in it is returned. If the player has no legal move, nothing is
+        searched and the result has no move, a score of 0, the same as a node without moves in negamax, and a
+        depth of 0.
+        """
+        start = time.perf_counter()
+        self._deadline = start + self._time_limit if self._time_limit is not None else None
+        self._node_budget = self._node_limit
+        self._nodes = 0
+        self._killers = []
+        self._table.new_search()
+        self._table.reset_stats()
+        opponent = game.get_player2_name() if playername == game.get_player1_name() else game.get_player1_name()
+
+        moves = game.legal_moves(playername)
+        if not moves:
+            return SearchResult(None, 0, 0, 0, time.perf_counter() - start, 0, 0)
+        best_move = moves[0]
+        best_score = 0
+        completed_depth = 0
+        tt_move = None
+        try:
+            for depth in range(1, self._max_depth + 1):
+                alpha = -WIN_SCORE - 1
+                iteration_move = None
+                for move in self.order_moves(game, playername, moves, tt_move, 0):
+                    record = game.apply_move(playername, move[0], move[1])
+                    try:
+                        score = -self.negamax(game, opponent, playername, depth - 1, -WIN_SCORE - 1, -alpha, 1)
+                    finally:
+                        game.undo_move(record)
+                    if score > alpha:
+                        alpha = score
+                        iteration_move = move
+                        if completed_depth == 0:  # first iteration, keep the best move so far in case of timeout
+                            best_move = move
+                            best_score = score
+                best_move = iteration_move
+                best_score = alpha
+                tt_move = iteration_move
+                completed_depth = depth
+                if alpha >= WIN_SCORE - depth or alpha <= -WIN_SCORE + depth:
+                    break  # the game is decided within the searched depth
+        except SearchTimeout:
+            pass
+
+        stats = self._table.get_stats()
+        return SearchResult(best_move, best_score, completed_depth, self._nodes, time.perf_counter() - start,
+                            stats["probes"], stats["hits"])
+
+    def play_move(self, game, playername):
+        """Chooses a move for the passed player and makes it with make_move, returns the SearchResult"""
+        result = self.choose_move(game, playername)
+        if result.move is not None:
+            game.make_move(playername, result.move[0], result.move[1])
+        return result
+
+
+def main(argv=None):
+    """Plays the search against itself from the starting board and prints each search's statistics"""
+    parser = argparse.ArgumentParser(description="Plays KubaSearch against itself and reports search statistics.")
+    parser.add_argument("--time", type=float, default=1.0, help="seconds per move")
+    parser.add_argument("--nodes", type=int, default=None, help="node budget per move")
+    parser.add_argument("--depth", type=int, default=64, help="deepest iteration")
+    parser.add_argument("--moves", type=int, default=10, help="moves to play")
+    parser.add_argument("--tt-mb", type=float, default=64, help="transposition table memory cap in megabytes")
+    parser.add_argument("--replacement", choices=("depth", "always"), default="depth")
+    parser.add_argument("--eviction", choices=("fifo", "lru"), default="fifo")
+    args = parser.parse_args(argv)
+
+    game = KubaGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+    search = KubaSearch(args.time, args.nodes, args.depth, args.tt_mb, args.replacement, args.eviction)
+    playername = "playerA"
+    for move_number in range(args.moves):
+        if game.get_winner() is not None:
+            break
+        result = search.play_move(game, playername)
+        print(playername, result)
+        if result.move is None:
+            break
+        playername = game.get_current_turn()
+    game.print_board(game.get_current_board())
+
+
+if __name__ == '__main__':
+    main()
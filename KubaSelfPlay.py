@@ -0,0 +1,225 @@
+# Date: 10-18-2026
+# Description: This file contains a command line self-play runner for KubaGame. It plays large numbers of complete
+#       games between two policies across a pool of worker processes, gives every game its own seed so results
+#       do not depend on the number of workers or the chunk size, and prints the win rates, game lengths,
+#       captured reds and games per second.
+#       Example: python KubaSelfPlay.py --games 2000 --workers 4 --policy1 greedy --policy2 random
+
+import argparse
+import importlib
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from KubaGame import KubaGame
+from KubaBitboard import KubaBitboardGame
+from KubaLineTable import KubaLineTableGame
+
+BACKENDS = {"list": KubaGame, "bitboard": KubaBitboardGame, "linetable": KubaLineTableGame}
+PLAYERS = (("player1", "W"), ("player2", "B"))
+DIRECTIONS = ("L", "R", "F", "B")
+
+
+def random_policy(game, playername, rng):
+    """Returns a random legal (coordinates, direction) move for the passed player, or None if there is none"""
+    moves = game.legal_moves(playername)
+    if not moves:
+        return None
+    return rng.choice(moves)
+
+
+def greedy_policy(game, playername, rng):
+    """
+    Returns a random legal move that pushes a red or an opponent marble off the board if there is one,
+    otherwise a random legal move, or None if the player has no legal move.
+    """
+    moves = game.legal_moves(playername)
+    if not moves:
+        return None
+    player_color = game.get_player_color(playername)
+    captures = []
+    for coordinates, direction in moves:
+        end_of_line_index, ejected = game.get_pushed_line(coordinates, direction)
+        if not ejected:
+            continue
+        if direction == "R" or direction == "L":
+            edge_piece = game.get_marble((coordinates[0], end_of_line_index))
+        else:
+            edge_piece = game.get_marble((end_of_line_index, coordinates[1]))
+        if edge_piece != player_color:  # legal moves never push the player's own piece off
+            captures.append((coordinates, direction))
+    return rng.choice(captures or moves)
+
+
+def fast_random_policy(game, playername, rng):
+    """
+    Same choice as random_policy, a uniformly random legal move or None, for rollouts. Instead of generating
+    every legal move it draws the player's (space, direction) pairs in a random order without replacement and
+    stops at the first legal one.
+    """
+    player_color = game.get_player_color(playername)
+    spaces = game.get_marble_spaces(player_color)
+    candidates = list(range(4 * len(spaces)))
+    while candidates:
+        draw = rng.randrange(len(candidates))
+        candidate = candidates[draw]
+        candidates[draw] = candidates[-1]
+        candidates.pop()
+        coordinates = spaces[candidate >> 2]
+        direction = DIRECTIONS[candidate & 3]
+        pushed_line = game.get_pushed_line(coordinates, direction)
+        if pushed_line is None:
+            continue
+        end_of_line_index, ejected = pushed_line
+        if ejected:
+            if direction == "R" or direction == "L":
+                edge_piece = game.get_marble((coordinates[0], end_of_line_index))
+            else:
+                edge_piece = game.get_marble((end_of_line_index, coordinates[1]))
+            if edge_piece == player_color:
+                continue  # can't push your own piece off the board
+        if game.check_push_repeats_past_board(coordinates, direction, end_of_line_index, ejected):
+            continue
+        return coordinates, direction
+    return None
+
+
+POLICIES = {"random": random_policy, "greedy": greedy_policy, "fast_random": fast_random_policy}
+
+
+def resolve_policy(name):
+    """
+    Returns the policy function for a name from POLICIES, or for "module:function", any importable function
+    taking (game, playername, rng) and returning a (coordinates, direction) move or None. Policies are passed to
+    the workers by name so they don't need to be pickled.
+    """
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, separator, function_name = name.partition(":")
+    if not separator:
+        raise ValueError("unknown policy %r, expected one of %s or module:function" % (name, sorted(POLICIES)))
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def game_seed(base_seed, game_number):
+    """Returns the seed of one game, the same for a game number no matter which worker or chunk plays it"""
+    return "%s-%s" % (base_seed, game_number)
+
+
+def play_game(game_number, base_seed, policies, backend="list", max_moves=1000):
+    """
+    Plays one complete quiet game between the two passed policy functions and returns a tuple of
+    (game_number, index of the winning player or None, moves played, reds captured by each player, marble count).
+    The first mover is picked with the game's seed. A game stops without a winner after max_moves or when the
+    player to move has no legal move.
+    """
+    rng = random.Random(game_seed(base_seed, game_number))
+    game = BACKENDS[backend](PLAYERS[0], PLAYERS[1], quiet=True)
+    player_index = rng.randrange(2)
+    moves_played = 0
+    while game.get_winner() is None and moves_played < max_moves:
+        playername = PLAYERS[player_index][0]
+        move = policies[player_index](game, playername, rng)
+        if move is None:
+            break
+        if not game.make_move(playername, move[0], move[1]):
+            raise ValueError("game %d: policy returned a move make_move rejected: %r" % (game_number, move))
+        moves_played += 1
+        player_index = 1 - player_index
+    winner = game.get_winner()
+    winner_index = None if winner is None else (0 if winner == PLAYERS[0][0] else 1)
+    return (game_number, winner_index, moves_played,
+            (game.get_captured(PLAYERS[0][0]), game.get_captured(PLAYERS[1][0])), game.get_marble_count())
+
+
+def play_chunk(chunk):
+    """Worker entry point, plays the games of one (game_numbers, base_seed, policy_names, backend, max_moves) chunk"""
+    game_numbers, base_seed, policy_names, backend, max_moves = chunk
+    policies = [resolve_policy(name) for name in policy_names]
+    return [play_game(game_number, base_seed, policies, backend, max_moves) for game_number in game_numbers]
+
+
+def run_self_play(games, workers=None, chunk_size=50, seed=0, policy_names=("random", "random"), backend="list",
+                  max_moves=1000):
+    """
+    Plays games numbered 0 to games - 1 in chunks of chunk_size across a pool of workers processes (all cores
+    when None, in this process when 1) and returns (results in game order, seconds elapsed).
+    """
+    chunks = [(range(start, min(start + chunk_size, games)), seed, tuple(policy_names), backend, max_moves)
+              for start in range(0, games, chunk_size)]
+    start = time.perf_counter()
+    if workers == 1:
+        chunk_results = [play_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(play_chunk, chunks))
+    elapsed = time.perf_counter() - start
+    return [result for chunk_result in chunk_results for result in chunk_result], elapsed
+
+
+def summarize(results, elapsed):
+    """
+    Returns a dictionary of the win rates, game lengths, captured reds and games per second of the results.
+    With no results the rates and means are 0 and so are the game lengths.
+    """
+    games = len(results)
+    divisor = max(games, 1)  # with no games every count is 0, and so is every rate
+    wins = [0, 0]
+    captured = [0, 0]
+    lengths = []
+    for game_number, winner_index, moves_played, reds_captured, marble_count in results:
+        if winner_index is not None:
+            wins[winner_index] += 1
+        captured[0] += reds_captured[0]
+        captured[1] += reds_captured[1]
+        lengths.append(moves_played)
+    lengths.sort()
+    if not lengths:
+        lengths = [0]
+    return {
+        "games": games,
+        "player1_win_rate": wins[0] / divisor,
+        "player2_win_rate": wins[1] / divisor,
+        "no_winner_rate": (games - wins[0] - wins[1]) / divisor,
+        "mean_moves": sum(lengths) / divisor,
+        "median_moves": lengths[games // 2],
+        "min_moves": lengths[0],
+        "max_moves": lengths[-1],
+        "player1_mean_reds_captured": captured[0] / divisor,
+        "player2_mean_reds_captured": captured[1] / divisor,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    """Command line entry point, plays the requested games and prints the summary"""
+    parser = argparse.ArgumentParser(description="Plays Kuba games between two policies across worker processes.")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, 1 plays in-process")
+    parser.add_argument("--chunk-size", type=int, default=50, help="games handed to a worker at a time")
+    parser.add_argument("--seed", type=int, default=0, help="base seed, each game's seed is derived from it")
+    policy_names = ", ".join(POLICIES)
+    parser.add_argument("--policy1", default="random", help="player1 (W) policy: %s or module:function" % policy_names)
+    parser.add_argument("--policy2", default="random", help="player2 (B) policy: %s or module:function" % policy_names)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="list", help="KubaGame board backend")
+    parser.add_argument("--max-moves", type=int, default=1000, help="moves before a game stops without a winner")
+    args = parser.parse_args(argv)
+
+    results, elapsed = run_self_play(args.games, args.workers, args.chunk_size, args.seed,
+                                     (args.policy1, args.policy2), args.backend, args.max_moves)
+    summary = summarize(results, elapsed)
+    print("%d games, %s vs %s, %d workers" % (summary["games"], args.policy1, args.policy2, args.workers))
+    print("player1 wins %.1f%%, player2 wins %.1f%%, no winner %.1f%%" % (
+        100 * summary["player1_win_rate"], 100 * summary["player2_win_rate"], 100 * summary["no_winner_rate"]))
+    print("moves per game: mean %.1f, median %d, min %d, max %d" % (
+        summary["mean_moves"], summary["median_moves"], summary["min_moves"], summary["max_moves"]))
+    print("mean reds captured: player1 %.2f, player2 %.2f" % (
+        summary["player1_mean_reds_captured"], summary["player2_mean_reds_captured"]))
+    print("%.2f s, %.1f games/s" % (summary["seconds"], summary["games_per_second"]))
+    return summary
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+# Date: 10-18-2026
+# Description: This file contains KubaServer, an asyncio server hosting many quiet Kuba games in one process,
+#       and a load generation client for it. Clients send one JSON request per line over TCP or a Unix socket
+#       and get one JSON response per line, in order:
+#           {"op": "new", "player1": ["alice", "W"], "player2": ["bob", "B"]}  -> {"ok": true, "session": "1"}
+#           {"op": "move", "session": "1", "player": "alice", "coordinates": [1, 0], "direction": "R"}
+#               -> {"ok": true, "accepted": true, "reason": null, "winner": null, "turn": "bob"}
+#           {"op": "state", "session": "1"}  -> board rows, turn, winner, captured reds and marble count
+#           {"op": "close", "session": "1"}
+#       A request "id" is echoed back. Each session has a lock so moves in one game never interleave, idle
+#       sessions are evicted, and each connection handles one request at a time and waits for its responses to
+#       drain, so a slow client only slows itself down.
+#       Example: python KubaServer.py serve --port 8765
+#                python KubaServer.py load --port 8765 --sessions 1000 --connections 50 --moves 40
+#                python KubaServer.py bench --sessions 200
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from KubaGame import KubaGame
+from KubaSelfPlay import fast_random_policy
+
+MAX_LINE_BYTES = 64 * 1024  # longest request line a connection accepts
+
+
+class Session:
+    """One hosted game with its lock and the monotonic time of its last request"""
+    __slots__ = ("game", "lock", "last_active")
+
+    def __init__(self, game):
+        self.game = game
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+
+
+class KubaServer:
+    """
+    Session registry and JSON lines protocol. Holds at most max_sessions games, "new" is refused past that,
+    and a session without requests for idle_timeout seconds is evicted.
+    """
+    def __init__(self, max_sessions=100000, idle_timeout=300.0):
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._sessions = {}
+        self._session_ids = itertools.count(1)
+        self._servers = []
+        self._eviction_task = None
+        self._moves = 0
+        self._evicted = 0
+
+    def get_session_count(self):
+        """Returns the number of hosted sessions"""
+        return len(self._sessions)
+
+    def get_stats(self):
+        """Returns a dictionary of the hosted sessions, moves handled and sessions evicted"""
+        return {"sessions": len(self._sessions), "moves": self._moves, "evicted": self._evicted}
+
+    def evict_idle_sessions(self, now=None):
+        """Removes the sessions idle for longer than idle_timeout and returns how many were removed"""
+        now = time.monotonic() if now is None else now
+        idle_ids = [session_id for session_id, session in self._sessions.items()
+                    if now - session.last_active > self._idle_timeout and not session.lock.locked()]
+        for session_id in idle_ids:
+            del self._sessions[session_id]
+        self._evicted += len(idle_ids)
+        return len(idle_ids)
+
+    async def evict_idle_sessions_forever(self):
+        """Background task that evicts idle sessions every quarter of the idle timeout"""
+        while True:
+            await asyncio.sleep(self._idle_timeout / 4)
+            self.evict_idle_sessions()
+
+    def new_session(self, request):
+        """Handles "new", creates a quiet game for the two players"""
+        if len(self._sessions) >= self._max_sessions:
+            return {"ok": False, "error": "server full"}
+        player1 = request.get("player1")
+        player2 = request.get("player2")
+        if (not isinstance(player1, list) or not isinstance(player2, list) or len(player1) != 2
+                or len(player2) != 2 or not all(isinstance(field, str) for field in player1 + player2)
+                or player1[0] == player2[0] or {player1[1], player2[1]} != {"W", "B"}):
+            return {"ok": False, "error": "players must be two [name, color] pairs with colors W and B"}
+        session_id = str(next(self._session_ids))
+        self._sessions[session_id] = Session(KubaGame(tuple(player1), tuple(player2), quiet=True))
+        return {"ok": True, "session": session_id}
+
+    async def move(self, session, request):
+        """Handles "move" under the session lock, with the rejection reason when make_move returns False"""
+        coordinates = request.get("coordinates")
+        if isinstance(coordinates, list):
+            coordinates = tuple(coordinates)
+        playername = request.get("player")
+        direction = request.get("direction")
+        async with session.lock:
+            game = session.game
+            reason = game.get_move_rejection(playername, coordinates, direction)
+            accepted = reason is None and game.make_move(playername, coordinates, direction)
+            self._moves += 1
+            return {"ok": True, "accepted": accepted, "reason": reason, "winner": game.get_winner(),
+                    "turn": game.get_current_turn()}
+
+    def state(self, session):
+        """Handles "state", returns the board as strings and the game status"""
+        game = session.game
+        return {"ok": True, "board": ["".join(row) for row in game.get_current_board()],
+                "turn": game.get_current_turn(), "winner": game.get_winner(),
+                "captured": [game.get_captured(game.get_player1_name()), game.get_captured(game.get_player2_name())],
+                "marble_count": list(game.get_marble_count())}
+
+    async def handle_request(self, request):
+        """Returns the response dictionary for one decoded request"""
+        op = request.get("op")
+        if op == "new":
+            return self.new_session(request)
+        session_id = request.get("session")
+        if not isinstance(session_id, str):  # an unhashable session id can't be looked up
+            return {"ok": False, "error": "unknown session"}
+        session = self._sessions.get(session_id)
+        if session is None:
+            return {"ok": False, "error": "unknown session"}
+        session.last_active = time.monotonic()
+        if op == "move":
+            return await self.move(session, request)
+        if op == "state":
+            return self.state(session)
+        if op == "close":
+            del self._sessions[session_id]
+            return {"ok": True}
+        return {"ok": False, "error": "unknown op"}
+
+    async def handle_connection(self, reader, writer):
+        """Reads requests one line at a time and writes each response before reading the next request"""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # line longer than MAX_LINE_BYTES
+                    writer.write(b'{"ok": false, "error": "request too long"}\n')
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request is not an object")
+                except ValueError:
+                    response = {"ok": False, "error": "invalid JSON request"}
+                else:
+                    response = await self.handle_request(request)
+                    if "id" in request:
+                        response["id"] = request["id"]
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()  # backpressure, waits while the client is not reading its responses
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=None, port=None, unix_path=None):
+        """Starts listening on a TCP host and port or on a Unix socket path, and the idle session eviction"""
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path, limit=MAX_LINE_BYTES)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE_BYTES)
+        self._servers.append(server)
+        if self._eviction_task is None:
+            self._eviction_task = asyncio.ensure_future(self.evict_idle_sessions_forever())
+        return server
+
+    async def close(self):
+        """Stops listening and stops the idle session eviction"""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+            self._eviction_task = None
+
+
+async def open_connection(host=None, port=None, unix_path=None):
+    """Returns the (reader, writer) of a client connection to a TCP host and port or a Unix socket path"""
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path, limit=MAX_LINE_BYTES)
+    return await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+
+
+async def request(reader, writer, message):
+    """Sends one request and returns the decoded response"""
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def play_connection(host, port, unix_path, games, moves, seed, latencies):
+    """
+    One load client connection. Starts games sessions and takes turns making a random legal move in each,
+    chosen on a local mirror of the game, until each has made moves moves or is over. Appends the latency of
+    every move request to latencies and returns the number of moves.
+    """
+    rng = random.Random(seed)
+    reader, writer = await open_connection(host, port, unix_path)
+    sessions = []
+    for game_number in range(games):
+        response = await request(reader, writer, {"op": "new", "player1": ["alice", "W"], "player2": ["bob", "B"]})
+        if not response["ok"]:
+            raise RuntimeError("new session refused: %s" % response["error"])
+        sessions.append([response["session"], KubaGame(("alice", "W"), ("bob", "B"), quiet=True),
+                         rng.choice(("alice", "bob"))])
+    move_count = 0
+    for _ in range(moves):
+        for session in sessions:
+            session_id, mirror, playername = session
+            if mirror.get_winner() is not None:
+                continue
+            move = fast_random_policy(mirror, playername, rng)
+            if move is None:
+                continue
+            start = time.perf_counter()
+            response = await request(reader, writer, {"op": "move", "session": session_id, "player": playername,
+                                                      "coordinates": move[0], "direction": move[1]})
+            latencies.append(time.perf_counter() - start)
+            if not response["accepted"]:
+                raise RuntimeError("server rejected a legal move: %s" % response["reason"])
+            mirror.make_move(playername, move[0], move[1])
+            session[2] = mirror.get_current_turn()
+            move_count += 1
+    for session in sessions:
+        await request(reader, writer, {"op": "close", "session": session[0]})
+    writer.close()
+    return move_count
+
+
+def percentile(sorted_values, fraction):
+    """Returns the value at the fraction (0 to 1) of the sorted values"""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load(host=None, port=None, unix_path=None, sessions=1000, connections=50, moves=40, seed=0):
+    """
+    Plays sessions games over connections concurrent connections, moves moves per game, and returns a
+    dictionary of the moves, seconds, moves per second and the p50 and p99 move latency in milliseconds.
+    """
+    latencies = []
+    games_per_connection = [sessions // connections + (index < sessions % connections)
+                            for index in range(connections)]
+    start = time.perf_counter()
+    move_counts = await asyncio.gather(*[
+        play_connection(host, port, unix_path, games, moves, seed * 100003 + index, latencies)
+        for index, games in enumerate(games_per_connection) if games])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    total_moves = sum(move_counts)
+    return {"sessions": sessions, "connections": connections, "moves": total_moves, "seconds": elapsed,
+            "moves_per_second": total_moves / elapsed,
+            "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else 0.0,
+            "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else 0.0}
+
+
+def print_load_report(report):
+    """Prints the result of run_load"""
+    print("%d sessions over %d connections: %d moves in %.2f s, %.0f moves/s, p50 %.3f ms, p99 %.3f ms" % (
+        report["sessions"], report["connections"], report["moves"], report["seconds"],
+        report["moves_per_second"], report["p50_ms"], report["p99_ms"]))
+
+
+async def bench(sessions, connections, moves):
+    """Runs a server and the load client in this process on a local port and prints the report"""
+    server = KubaServer()
+    listener = await server.start("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        print_load_report(await run_load("127.0.0.1", port, None, sessions, connections, moves))
+    finally:
+        await server.close()
+
+
+async def serve(args):
+    """Runs the server until interrupted"""
+    server = KubaServer(args.max_sessions, args.idle_timeout)
+    listener = await server.start(args.host, args.port, args.unix)
+    print("serving on", args.unix or listener.sockets[0].getsockname())
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    """Command line entry point for the serve, load and bench commands"""
+    parser = argparse.ArgumentParser(description="Hosts Kuba games over JSON lines, or generates load for them.")
+    parser.add_argument("command", choices=("serve", "load", "bench"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Unix socket path, used instead of TCP")
+    parser.add_argument("--max-sessions", type=int, default=100000)
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an idle game is evicted")
+    parser.add_argument("--sessions", type=int, default=1000, help="load: concurrent games")
+    parser.add_argument("--connections", type=int, default=50, help="load: concurrent client connections")
+    parser.add_argument("--moves", type=int, default=40, help="load: moves per game")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        asyncio.run(serve(args))
+    elif args.command == "load":
+        print_load_report(asyncio.run(run_load(args.host, args.port, args.unix, args.sessions, args.connections,
+                                               args.moves)))
+    else:
+        asyncio.run(bench(args.sessions, args.connections, args.moves))
+
+
+if __name__ == '__main__':
+    main()
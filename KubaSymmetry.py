@@ -0,0 +1,363 @@
+# Date: 10-18-2026
+# Description: This file contains symmetry canonical position keys for analysis caches. The rules of Kuba do not
+#       change under the 8 rotations and reflections of the square board, nor when W and B are swapped together
+#       with the players' colors, and the starting board is mapped onto itself by every rotation or reflection,
+#       swapping W and B for the quarter turns and the side to side and top to bottom flips. canonical_key maps a
+#       position, with its past board, reds captured and color to move, to the smallest key among its 16
+#       symmetric images, so every equivalent position shares one cache entry. It also returns the symmetry used,
+#       and to_canonical_move / from_canonical_move map moves between the real and canonical orientations.
+#       A board key packs the 2 bit " "/W/B/R code of every space, one 14 bit line state (as in KubaLineTable)
+#       in each 16 bits per row. Every symmetry only reorders the rows or the cols and reverses each line or not,
+#       so the 8 transformed board keys are packed from the row and col line states, reversed through one
+#       precomputed table, and the W/B swap exchanges the two bits of every space. Running this file checks the
+#       symmetries, measures the cache reduction on sampled games and times the keys inside KubaSearch.
+
+import random
+import struct
+import time
+
+from KubaBitboard import KubaBitboardGame, board_to_bitboards, bitboards_to_board, cell_index
+from KubaPerft import root_moves
+from KubaSearch import KubaSearch, search_key
+from KubaSelfPlay import fast_random_policy
+
+DIRECTION_VECTORS = {"L": (0, -1), "R": (0, 1), "F": (-1, 0), "B": (1, 0)}
+VECTOR_DIRECTIONS = {vector: direction for direction, vector in DIRECTION_VECTORS.items()}
+CELL_TRANSFORMS = (
+    lambda row, col: (row, col),  # identity
+    lambda row, col: (col, 6 - row),  # quarter turn clockwise
+    lambda row, col: (6 - row, 6 - col),  # half turn
+    lambda row, col: (6 - col, row),  # quarter turn counterclockwise
+    lambda row, col: (row, 6 - col),  # side to side flip
+    lambda row, col: (6 - row, col),  # top to bottom flip
+    lambda row, col: (col, row),  # flip over the W to W diagonal
+    lambda row, col: (6 - col, 6 - row),  # flip over the B to B diagonal
+)
+SYMMETRIES = tuple((transform, swap) for transform in range(8) for swap in (False, True))  # 16, index t * 2 + swap
+BOARD_BITS = 49
+
+
+def _build_tables():
+    """
+    Builds, for every transform, the cell permutation, the inverse transform, the direction mapping and the
+    row tables: ROW_TABLES[transform][row][7 bit row pattern] is the transformed bitboard of that row.
+    """
+    permutations = []
+    row_tables = []
+    direction_maps = []
+    for cell_transform in CELL_TRANSFORMS:
+        permutation = [cell_index(*cell_transform(cell // 7, cell % 7)) for cell in range(BOARD_BITS)]
+        permutations.append(permutation)
+        tables = []
+        for row in range(7):
+            table = []
+            for pattern in range(128):
+                bitboard = 0
+                for col in range(7):
+                    if pattern >> col & 1:
+                        bitboard |= 1 << permutation[row * 7 + col]
+                table.append(bitboard)
+            tables.append(table)
+        row_tables.append(tables)
+        direction_map = {}
+        for direction, (row_change, col_change) in DIRECTION_VECTORS.items():
+            row, col = cell_transform(3 + row_change, 3 + col_change)  # the transform is linear about the center
+            direction_map[direction] = VECTOR_DIRECTIONS[(row - 3, col - 3)]
+        direction_maps.append(direction_map)
+    inverses = [next(inverse for inverse in range(8) if all(permutations[inverse][permutations[transform][cell]]
+                                                           == cell for cell in range(BOARD_BITS)))
+                for transform in range(8)]
+    return permutations, inverses, row_tables, direction_maps
+
+
+CELL_PERMUTATIONS, INVERSE_TRANSFORMS, ROW_TABLES, DIRECTION_MAPS = _build_tables()
+BOARD_KEY_BITS = 7 * 16  # 7 lines of 16 bits
+pack_forward = struct.Struct("<7H").pack  # line 0 in the low bits of the board key
+pack_backward = struct.Struct(">7H").pack  # line 0 in the high bits, the lines read from the other end
+from_bytes = int.from_bytes
+SPREAD_LINES = [sum((pattern >> index & 1) << (2 * index) for index in range(7)) for pattern in range(128)]
+REVERSED_LINES = [sum((line_state >> (2 * index) & 3) << (2 * (6 - index)) for index in range(7))
+                  for line_state in range(4 ** 7)]  # the line state read from the other end
+LOW_CODE_BITS = int("01" * (BOARD_KEY_BITS // 2), 2)  # the W bit of every space, the B bit is the one above it
+DIAGONAL_TRANSFORM = 6  # CELL_TRANSFORMS index of (col, row), which turns cols into rows
+
+
+def transform_bitboard(bitboard, transform):
+    """Returns the bitboard moved by the transform, one row table lookup per row"""
+    tables = ROW_TABLES[transform]
+    return (tables[0][bitboard & 127] | tables[1][bitboard >> 7 & 127] | tables[2][bitboard >> 14 & 127]
+            | tables[3][bitboard >> 21 & 127] | tables[4][bitboard >> 28 & 127] | tables[5][bitboard >> 35 & 127]
+            | tables[6][bitboard >> 42])
+
+
+def position_bitboards(game):
+    """Returns the (W, B, R) bitboards of the game's current and past boards, without conversion for bitboard games"""
+    if isinstance(game, KubaBitboardGame):
+        return game.get_current_bitboards(), game.get_past_bitboards()
+    return board_to_bitboards(game.get_current_board()), board_to_bitboards(game.get_past_board())
+
+
+def position_state(game):
+    """
+    Returns the color independent parts of the game's position for canonical keys: (current bitboards, past
+    bitboards, color to move index, 0 W, 1 B, 2 before the first move, reds captured by the W and B players)
+    """
+    current, past = position_bitboards(game)
+    playername = game.get_current_turn()
+    side = 2 if playername is None else (0 if game.get_player_color(playername) == "W" else 1)
+    captured = [0, 0]
+    for player in (game.get_player1_name(), game.get_player2_name()):
+        captured[0 if game.get_player_color(player) == "W" else 1] = game.get_captured(player)
+    return current, past, side, captured[0], captured[1]
+
+
+def line_states(low, high):
+    """
+    Returns the 7 row line states of a board given as its low (W and R) and high (B and R) code bit bitboards,
+    2 bits a space with W 1, B 2 and R 3, space 0 in the low bits
+    """
+    return [SPREAD_LINES[low & 127] | SPREAD_LINES[high & 127] << 1,
+            SPREAD_LINES[low >> 7 & 127] | SPREAD_LINES[high >> 7 & 127] << 1,
+            SPREAD_LINES[low >> 14 & 127] | SPREAD_LINES[high >> 14 & 127] << 1,
+            SPREAD_LINES[low >> 21 & 127] | SPREAD_LINES[high >> 21 & 127] << 1,
+            SPREAD_LINES[low >> 28 & 127] | SPREAD_LINES[high >> 28 & 127] << 1,
+            SPREAD_LINES[low >> 35 & 127] | SPREAD_LINES[high >> 35 & 127] << 1,
+            SPREAD_LINES[low >> 42] | SPREAD_LINES[high >> 42] << 1]
+
+
+def row_and_col_line_states(bitboards, rows=True, cols=True):
+    """
+    Returns (row line states, col line states) of a (W, B, R) board, either None when not asked for. The cols
+    are the rows of the board flipped over the diagonal.
+    """
+    low = bitboards[0] | bitboards[2]  # W and R spaces
+    high = bitboards[1] | bitboards[2]  # B and R spaces
+    row_states = line_states(low, high) if rows else None
+    col_states = line_states(transform_bitboard(low, DIAGONAL_TRANSFORM),
+                             transform_bitboard(high, DIAGONAL_TRANSFORM)) if cols else None
+    return row_states, col_states
+
+
+def transformed_board_keys(rows, cols):
+    """
+    Returns the board keys of the 8 transforms, in CELL_TRANSFORMS order, from the row and col line states.
+    Each transform reads the rows or the cols, in order or from the other end, each line reversed or not. The
+    lines are packed 16 bits each, line 0 in the low bits, or in the high bits when read from the other end.
+    """
+    reversed_rows = [REVERSED_LINES[line_state] for line_state in rows]
+    reversed_cols = [REVERSED_LINES[line_state] for line_state in cols]
+    return (from_bytes(pack_forward(*rows), "little"), from_bytes(pack_forward(*reversed_cols), "little"),
+            from_bytes(pack_backward(*reversed_rows), "big"), from_bytes(pack_backward(*cols), "big"),
+            from_bytes(pack_forward(*reversed_rows), "little"), from_bytes(pack_backward(*rows), "big"),
+            from_bytes(pack_forward(*cols), "little"), from_bytes(pack_backward(*reversed_cols), "big"))
+
+
+def swap_colors(board_key):
+    """Returns the board key with W and B swapped, exchanging the two bits of every space, R stays 3"""
+    return board_key >> 1 & LOW_CODE_BITS | (board_key & LOW_CODE_BITS) << 1
+
+
+def board_key(bitboards, transform, swap):
+    """Returns the board key of one (W, B, R) board under a symmetry, reading only the rows or only the cols"""
+    rows_stay_rows = transform in (0, 2, 4, 5)
+    rows, cols = row_and_col_line_states(bitboards, rows_stay_rows, not rows_stay_rows)
+    lines = rows if rows_stay_rows else cols
+    if transform in (1, 2, 4, 7):
+        lines = [REVERSED_LINES[line_state] for line_state in lines]
+    if transform in (2, 3, 5, 7):
+        key = from_bytes(pack_backward(*lines), "big")
+    else:
+        key = from_bytes(pack_forward(*lines), "little")
+    return swap_colors(key) if swap else key
+
+
+def canonical_key(game):
+    """
+    Returns (key, symmetry index) of the game's position: the smallest key of the position under the 16
+    symmetries and the index in SYMMETRIES of the symmetry giving it. The current board's line states are read
+    once for all 16, and the past board is only keyed under the symmetries giving the smallest current key.
+    """
+    current, past, side, white_captured, black_captured = position_state(game)
+    suffix = (2 if side == 2 else side) << 8 | white_captured << 4 | black_captured  # color to move, captured
+    swapped_suffix = (2 if side == 2 else 1 - side) << 8 | black_captured << 4 | white_captured
+    keys = []
+    for moved in transformed_board_keys(*row_and_col_line_states(current)):
+        # index transform * 2 + swap, as SYMMETRIES, swap_colors written out
+        keys += (moved << 10 | suffix, (moved >> 1 & LOW_CODE_BITS | (moved & LOW_CODE_BITS) << 1) << 10
+                 | swapped_suffix)
+    best_board_key = min(keys)
+    if keys.count(best_board_key) == 1:
+        symmetry = keys.index(best_board_key)
+        transform, swap = SYMMETRIES[symmetry]
+        return best_board_key << BOARD_KEY_BITS | board_key(past, transform, swap), symmetry
+    best_symmetries = [symmetry for symmetry, key in enumerate(keys) if key == best_board_key]
+    past_keys = transformed_board_keys(*row_and_col_line_states(past))
+    best = None
+    for symmetry in best_symmetries:
+        transform, swap = SYMMETRIES[symmetry]
+        key = best_board_key << BOARD_KEY_BITS | (swap_colors(past_keys[transform]) if swap else past_keys[transform])
+        if best is None or key < best[0]:
+            best = (key, symmetry)
+    return best
+
+
+def to_canonical_move(coordinates, direction, symmetry):
+    """Returns the (coordinates, direction) move in the canonical orientation of a real orientation move"""
+    transform = SYMMETRIES[symmetry][0]
+    return CELL_TRANSFORMS[transform](coordinates[0], coordinates[1]), DIRECTION_MAPS[transform][direction]
+
+
+def from_canonical_move(coordinates, direction, symmetry):
+    """Returns the (coordinates, direction) move in the real orientation of a canonical orientation move"""
+    inverse = INVERSE_TRANSFORMS[SYMMETRIES[symmetry][0]]
+    return CELL_TRANSFORMS[inverse](coordinates[0], coordinates[1]), DIRECTION_MAPS[inverse][direction]
+
+
+def transform_game(game, symmetry):
+    """
+    Returns a quiet KubaBitboardGame of the game's position under the symmetry: both boards transformed, and with
+    a color swap the players keep their names and captured reds but play the other color.
+    """
+    transform, swap = SYMMETRIES[symmetry]
+    colors = {"W": "B", "B": "W"} if swap else {"W": "W", "B": "B"}
+    player1 = game.get_player1_name()
+    player2 = game.get_player2_name()
+    transformed = KubaBitboardGame((player1, colors[game.get_player_color(player1)]),
+                                   (player2, colors[game.get_player_color(player2)]), quiet=True)
+    current, past = position_bitboards(game)
+    for replace, bitboards in ((transformed.replace_past_board, past), (transformed.replace_current_board, current)):
+        moved = [transform_bitboard(bitboard, transform) for bitboard in bitboards]
+        if swap:
+            moved[0], moved[1] = moved[1], moved[0]
+        replace(bitboards_to_board(moved))
+    if game.get_current_turn() is not None:
+        transformed.set_current_turn(game.get_current_turn())
+    for playername in (player1, player2):
+        for _ in range(game.get_captured(playername)):
+            transformed.update_captured(playername)
+    return transformed
+
+
+def sample_positions(games, max_moves=150, seed=0):
+    """Plays fast_random games on KubaBitboardGame and generates every position reached, the game at each ply"""
+    rng = random.Random(seed)
+    for _ in range(games):
+        game = KubaBitboardGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+        playername = rng.choice(("playerA", "playerB"))
+        yield game
+        for _ in range(max_moves):
+            move = fast_random_policy(game, playername, rng)
+            if move is None or game.get_winner() is not None:
+                break
+            game.make_move(playername, move[0], move[1])
+            playername = game.get_current_turn()
+            yield game
+
+
+def check_symmetries(positions=300, seed=0):
+    """
+    Checks, for sampled positions under every symmetry, that the transformed position has the same canonical
+    key and that the legal moves map onto each other through to_canonical_move and from_canonical_move.
+    """
+    starting_game = KubaBitboardGame(("playerA", "W"), ("playerB", "B"), quiet=True)
+    for symmetry, (transform, swap) in enumerate(SYMMETRIES):
+        preserves_start = transform_game(starting_game, symmetry).get_current_board() == \
+            starting_game.get_current_board()
+        if preserves_start != (swap == (transform in (1, 3, 4, 5))):
+            raise AssertionError("symmetry %d does not map the starting board as expected" % symmetry)
+    checked = 0
+    for game in sample_positions(positions // 30 + 1, max_moves=30, seed=seed):
+        if checked >= positions:
+            break
+        checked += 1
+        key = canonical_key(game)[0]
+        playername = game.get_current_turn() or "playerA"
+        moves = sorted(game.legal_moves(playername))
+        for other_symmetry in range(len(SYMMETRIES)):
+            transformed = transform_game(game, other_symmetry)
+            if canonical_key(transformed)[0] != key:
+                raise AssertionError("canonical key differs under symmetry %d" % other_symmetry)
+            transformed_moves = sorted(transformed.legal_moves(playername))
+            if sorted(to_canonical_move(coordinates, direction, other_symmetry)
+                      for coordinates, direction in moves) != transformed_moves:
+                raise AssertionError("legal moves do not map under symmetry %d" % other_symmetry)
+            if sorted(from_canonical_move(coordinates, direction, other_symmetry)
+                      for coordinates, direction in transformed_moves) != moves:
+                raise AssertionError("legal moves do not map back under symmetry %d" % other_symmetry)
+    print("symmetries checked on %d positions" % checked)
+
+
+def tree_positions(game, depth):
+    """Generates the game at every node of its move tree to depth, moves applied and undone in place"""
+    yield game
+    if depth == 0:
+        return
+    for move in root_moves(game):
+        record = game.apply_move(*move)
+        try:
+            yield from tree_positions(game, depth - 1)
+        finally:
+            game.undo_move(record)
+
+
+def measure_cache_reduction(positions, label):
+    """
+    Prints, over the iterable of positions, the distinct positions and the hit rate of a cache that never
+    evicts, keyed by search_key and by canonical_key, and the time per key.
+    """
+    exact_keys = set()
+    canonical_keys = set()
+    exact_hits = canonical_hits = position_count = 0
+    exact_seconds = canonical_seconds = 0.0
+    for game in positions:
+        position_count += 1
+        start = time.perf_counter()
+        exact_key = search_key(game)
+        middle = time.perf_counter()
+        key = canonical_key(game)[0]
+        canonical_seconds += time.perf_counter() - middle
+        exact_seconds += middle - start
+        exact_hits += exact_key in exact_keys
+        canonical_hits += key in canonical_keys
+        exact_keys.add(exact_key)
+        canonical_keys.add(key)
+    print("%s: %d positions" % (label, position_count))
+    print("  distinct positions: %d exact, %d canonical, %.1f%% fewer cache entries" % (
+        len(exact_keys), len(canonical_keys), 100 * (1 - len(canonical_keys) / len(exact_keys))))
+    print("  cache hit rate: %.1f%% exact, %.1f%% canonical" % (100 * exact_hits / position_count,
+                                                                100 * canonical_hits / position_count))
+    print("  time per key: %.1f us search_key, %.1f us canonical_key" % (exact_seconds / position_count * 1e6,
+                                                                         canonical_seconds / position_count * 1e6))
+
+
+class CanonicalKeySearch(KubaSearch):
+    """A KubaSearch that also computes canonical_key at every node, to time what the keys cost per search node"""
+    def negamax(self, game, playername, opponent, depth, alpha, beta, ply):
+        canonical_key(game)
+        return super().negamax(game, playername, opponent, depth, alpha, beta, ply)
+
+
+def measure_search_overhead(positions=5, depth=3, seed=0):
+    """
+    Prints the time per node of fixed depth KubaSearch searches from sampled positions, without and with a
+    canonical_key at every node. The search still keys its table with search_key, so both search the same nodes.
+    """
+    games = [game.fork() for game in sample_positions(positions, max_moves=20, seed=seed)][20::21]
+    timings = []
+    for search_class in (KubaSearch, CanonicalKeySearch):
+        searches = [search_class(time_limit=None, max_depth=depth) for _ in games]  # tables allocated untimed
+        nodes = 0
+        start = time.perf_counter()
+        for search, game in zip(searches, games):
+            nodes += search.choose_move(game, game.get_current_turn()).nodes
+        timings.append((time.perf_counter() - start) / nodes * 1e6)
+    print("KubaSearch to depth %d from %d positions: %.1f us per node, %.1f us with a canonical_key per node "
+          "(+%.0f%%)" % (depth, len(games), timings[0], timings[1], 100 * (timings[1] / timings[0] - 1)))
+
+
+if __name__ == '__main__':
+    check_symmetries()
+    measure_cache_reduction(sample_positions(300), "300 sampled fast_random games")
+    measure_cache_reduction(tree_positions(KubaBitboardGame(("playerA", "W"), ("playerB", "B"), quiet=True), 4),
+                            "move tree of the starting position to depth 4")
+    measure_search_overhead()
@@ -0,0 +1,172 @@
+# Date: 10-18-2026
+# Description: This file contains the bulk validator for game logs from untrusted clients. Each game is replayed
+#       on a fresh quiet KubaGame and the first move make_move would reject is reported with its reason from
+#       get_move_rejection (wrong turn, wrong color, blocked proceeding space, self-ejection, repetition, ...).
+#       Games are sharded in chunks across worker processes and the results stream back in input order, with
+#       at most a fixed number of chunks in flight so memory stays bounded however long the input is.
+#
+#       Input is one JSON game log per line:
+#           {"id": "g1", "player1": ["alice", "W"], "player2": ["bob", "B"],
+#            "moves": [["alice", [1, 0], "R"], ["bob", [1, 6], "L"], ...]}
+#       Output is one JSON result per line, in the same order.
+#       Example: python KubaValidate.py games.jsonl --workers 4 > results.jsonl
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from KubaGame import KubaGame, INVALID_MOVE
+
+INVALID_GAME = "invalid game"  # the log itself is malformed: not JSON, or missing or bad players or moves
+
+
+class ValidationResult:
+    """
+    Result of validating one game log: its input index and id, whether every move was legal, the number of
+    legal moves before the first illegal one, the index, move and reason of the first illegal move, and the
+    winner after the legal moves.
+    """
+    __slots__ = ("index", "game_id", "valid", "legal_moves", "illegal_move_index", "illegal_move", "reason",
+                 "winner")
+
+    def __init__(self, index, game_id, valid, legal_moves, illegal_move_index=None, illegal_move=None, reason=None,
+                 winner=None):
+        self.index = index  # position of the game in the input
+        self.game_id = game_id  # "id" of the game log, or None
+        self.valid = valid
+        self.legal_moves = legal_moves
+        self.illegal_move_index = illegal_move_index
+        self.illegal_move = illegal_move
+        self.reason = reason  # a KubaGame rejection reason, INVALID_GAME, or None for a valid game
+        self.winner = winner
+
+    def to_dict(self):
+        """Returns the result as a dictionary for JSON output"""
+        return {"index": self.index, "id": self.game_id, "valid": self.valid, "legal_moves": self.legal_moves,
+                "illegal_move_index": self.illegal_move_index, "illegal_move": self.illegal_move,
+                "reason": self.reason, "winner": self.winner}
+
+
+def check_players(game_log):
+    """
+    Returns the (name, color) player tuples of a game log, or None if they are missing, not strings, or not W
+    and B. Both are checked to be strings first, an unhashable color from untrusted input can't be put in a set.
+    """
+    players = []
+    for key in ("player1", "player2"):
+        player = game_log.get(key)
+        if not isinstance(player, (list, tuple)) or len(player) != 2 or not isinstance(player[0], str) \
+                or not isinstance(player[1], str):
+            return None
+        players.append((player[0], player[1]))
+    if players[0][0] == players[1][0] or {players[0][1], players[1][1]} != {"W", "B"}:
+        return None
+    return players
+
+
+def validate_game(index, game_log):
+    """
+    Validates one game log, a dictionary or its JSON string, and returns its ValidationResult. Legal moves are
+    applied with apply_move since get_move_rejection has already checked them.
+    """
+    if isinstance(game_log, (str, bytes)):
+        try:
+            game_log = json.loads(game_log)
+        except ValueError:
+            return ValidationResult(index, None, False, 0, reason=INVALID_GAME)
+    if not isinstance(game_log, dict):
+        return ValidationResult(index, None, False, 0, reason=INVALID_GAME)
+    game_id = game_log.get("id")
+    players = check_players(game_log)
+    moves = game_log.get("moves")
+    if players is None or not isinstance(moves, list):
+        return ValidationResult(index, game_id, False, 0, reason=INVALID_GAME)
+
+    game = KubaGame(players[0], players[1], quiet=True)
+    for move_index, move in enumerate(moves):
+        if isinstance(move, list) and len(move) == 3:
+            playername, coordinates, direction = move
+            if isinstance(coordinates, list):
+                coordinates = tuple(coordinates)
+            reason = game.get_move_rejection(playername, coordinates, direction)
+        else:
+            reason = INVALID_MOVE
+        if reason is not None:
+            return ValidationResult(index, game_id, False, move_index, move_index, move, reason, game.get_winner())
+        game.apply_move(playername, coordinates, direction)
+    return ValidationResult(index, game_id, True, len(moves), winner=game.get_winner())
+
+
+def validate_chunk(chunk):
+    """Worker entry point, validates a list of (index, game log) pairs and returns their results in order"""
+    return [validate_game(index, game_log) for index, game_log in chunk]
+
+
+def iter_chunks(game_logs, chunk_size):
+    """Generates lists of up to chunk_size (index, game log) pairs from an iterable of game logs"""
+    chunk = []
+    for index, game_log in enumerate(game_logs):
+        chunk.append((index, game_log))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_games(game_logs, workers=None, chunk_size=200, max_pending_chunks=None):
+    """
+    Generates the ValidationResult of every game log in the iterable, dictionaries or JSON strings, in input
+    order. Chunks of chunk_size games are validated across workers processes (all cores when None, in this
+    process when 1), and input is only read while fewer than max_pending_chunks chunks (default twice the
+    workers) are in flight.
+    """
+    if workers == 1:
+        for chunk in iter_chunks(game_logs, chunk_size):
+            yield from validate_chunk(chunk)
+        return
+    workers = workers or os.cpu_count()
+    max_pending_chunks = max_pending_chunks or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in iter_chunks(game_logs, chunk_size):
+            pending.append(executor.submit(validate_chunk, chunk))
+            if len(pending) >= max_pending_chunks:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    """Command line entry point, validates a JSON lines file (or stdin) and writes JSON lines results"""
+    parser = argparse.ArgumentParser(description="Validates Kuba game logs and reports the first illegal move.")
+    parser.add_argument("input", nargs="?", default="-", help="JSON lines game logs, - for stdin")
+    parser.add_argument("--output", default="-", help="JSON lines results, - for stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, 1 validates in-process")
+    parser.add_argument("--chunk-size", type=int, default=200, help="games handed to a worker at a time")
+    parser.add_argument("--max-pending", type=int, default=None, help="chunks in flight, default twice the workers")
+    args = parser.parse_args(argv)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input)
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w")
+    games = valid_games = 0
+    try:
+        game_logs = (line for line in input_file if line.strip())
+        for result in validate_games(game_logs, args.workers, args.chunk_size, args.max_pending):
+            output_file.write(json.dumps(result.to_dict()) + "\n")
+            games += 1
+            valid_games += result.valid
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    print("%d games, %d valid, %d invalid" % (games, valid_games, games - valid_games), file=sys.stderr)
+    return 0 if games == valid_games else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())